@@ -0,0 +1,552 @@
+#!/usr/bin/env python3
+# This Python file uses the following encoding: utf-8
+"""Benchmarks of the LinOffice overhead, without a Windows VM.
+
+Every benchmark runs in a throwaway sandbox: a copy of linoffice.sh, lib/, apps/ and config/
+with its own HOME, XDG_RUNTIME_DIR and a PATH that starts with the stand-ins in fakes/ for
+podman, podman-compose, xfreerdp and gdbus. Their latencies (and the boot time of the fake Windows)
+are set with the options below, so results are comparable between machines and releases.
+
+    launch    end-to-end overhead of 'linoffice.sh excel' until FreeRDP is started, for a
+              running, a paused and a stopped container (with the per-phase trace of each run)
+    cleanup   'linoffice.sh cleanup --full' over synthetic home folders of several sizes
+    gui       start-up of gui/linoffice.py until the main window is shown (needs PySide6)
+    update    updater.download_and_update throughput against a local HTTP server
+    sleep     time from logind's resume signal until lib/sleepwatch.py created the sleep marker
+              (with a stand-in for 'gdbus monitor' on the system bus)
+
+Usage: python3 benchmarks/run.py [--only launch,cleanup,gui,update,sleep] [--repeat N] [--output FILE]
+       python3 benchmarks/run.py --compare BASELINE.json RESULTS.json
+
+The results are written as JSON (to stdout, or FILE), --compare lists the medians that changed
+by more than --threshold percent between two result files.
+
+Note: linoffice.sh prefers /usr/bin/podman-compose over the one on PATH. If it exists, the
+container scenarios use it and the results are flagged with "compose_isolated": false.
+"""
+import argparse
+import http.server
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+FAKES_DIR = os.path.join(BENCH_DIR, 'fakes')
+SANDBOX_PARTS = ('linoffice.sh', 'lib', 'apps', 'config')
+RESULT_VERSION = 1
+
+sys.path.insert(0, os.path.join(REPO_DIR, 'lib'))
+import tracing
+from common import RDP_IP, RDP_PORT
+
+def summarize(values):
+    """min/median/mean/max of a list of seconds (None if there are none)."""
+    if not values:
+        return None
+    return {
+        'min': round(min(values), 4),
+        'median': round(statistics.median(values), 4),
+        'mean': round(statistics.mean(values), 4),
+        'max': round(max(values), 4),
+        'runs': len(values),
+    }
+
+class Sandbox:
+    """A private copy of LinOffice with fake podman/FreeRDP on PATH."""
+
+    def __init__(self, options):
+        self.options = options
+        self.root = tempfile.mkdtemp(prefix='linoffice-bench-')
+        self.install = os.path.join(self.root, 'linoffice')
+        self.home = os.path.join(self.root, 'home')
+        self.state = os.path.join(self.root, 'state')
+        self.runtime = os.path.join(self.root, 'run')
+        for path in (self.install, self.home, self.state, self.runtime):
+            os.makedirs(path, exist_ok=True)
+        os.chmod(self.runtime, 0o700)
+        for part in SANDBOX_PARTS:
+            source = os.path.join(REPO_DIR, part)
+            target = os.path.join(self.install, part)
+            if os.path.isdir(source):
+                shutil.copytree(source, target, ignore=shutil.ignore_patterns('__pycache__', '*.cache'))
+            else:
+                shutil.copy2(source, target)
+        self.write_config()
+        self.appdata = os.path.join(self.home, '.local', 'share', 'linoffice')
+        os.makedirs(self.appdata, exist_ok=True)
+        self.trace_path = os.path.join(self.appdata, 'launch_trace.jsonl')
+
+    def write_config(self):
+        config_dir = os.path.join(self.install, 'config')
+        with open(os.path.join(config_dir, 'linoffice.conf.default'), 'r', encoding='utf-8') as f:
+            content = f.read()
+        # No autopause (linoffice.sh would wait for it) and always detect FreeRDP on PATH
+        overrides = {'AUTOPAUSE': 'off', 'FREERDP_COMMAND': '', 'DEBUG': 'true', 'PREWARM': 'off'}
+        lines = []
+        for line in content.splitlines():
+            key = line.split('=', 1)[0]
+            lines.append(f'{key}="{overrides[key]}"' if key in overrides else line)
+        with open(os.path.join(config_dir, 'linoffice.conf'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        compose = os.path.join(config_dir, 'compose.yaml')
+        if not os.path.exists(compose):
+            shutil.copy2(os.path.join(config_dir, 'compose.yaml.default'), compose)
+
+    def env(self, home=None):
+        options = self.options
+        env = dict(os.environ)
+        env.update({
+            'HOME': home or self.home,
+            'XDG_RUNTIME_DIR': self.runtime,
+            'XDG_CACHE_HOME': os.path.join(self.root, 'cache'),
+            'PATH': FAKES_DIR + os.pathsep + os.environ.get('PATH', ''),
+            'LINOFFICE_BENCH_STATE': self.state,
+            # No podman API socket: everything goes through the fake CLI
+            'LINOFFICE_PODMAN_SOCKET': os.path.join(self.runtime, 'no-podman.sock'),
+            'BENCH_PODMAN_LATENCY': str(options.podman_latency),
+            'BENCH_COMPOSE_LATENCY': str(options.compose_latency),
+            'BENCH_FREERDP_SESSION': str(options.session_time),
+            'LC_ALL': 'C',
+        })
+        env.pop('LINOFFICE_RUNID', None)
+        env.pop('CONTAINER_HOST', None)
+        return env
+
+    def set_container(self, state):
+        path = os.path.join(self.state, 'container')
+        if state == 'missing':
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        with open(path, 'w') as f:
+            f.write(state + '\n')
+
+    def freerdp_starts(self):
+        try:
+            with open(os.path.join(self.state, 'freerdp_started')) as f:
+                return [float(line) for line in f if line.strip()]
+        except OSError:
+            return []
+
+    def run_script(self, args, home=None, timeout=300):
+        script = os.path.join(self.install, 'linoffice.sh')
+        started = time.time()
+        result = subprocess.run([script, *args], env=self.env(home), cwd=self.root,
+                                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                timeout=timeout)
+        return started, time.time(), result
+
+    def remove(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+class FakeRDPServer(threading.Thread):
+    """Answers the readiness check of lib/readiness.py once the fake Windows has 'booted'."""
+
+    def __init__(self, sandbox, boot_time):
+        super().__init__(daemon=True)
+        self.sandbox = sandbox
+        self.boot_time = boot_time
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((RDP_IP, RDP_PORT))
+        self.sock.listen(16)
+
+    def booted(self):
+        path = os.path.join(self.sandbox.state, 'container')
+        try:
+            with open(path) as f:
+                state = f.read().strip()
+            return state == 'running' and time.time() - os.stat(path).st_mtime >= self.boot_time
+        except OSError:
+            return False
+
+    def run(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.settimeout(2)
+                    conn.recv(64)
+                    if self.booted():
+                        # TPKT header + X.224 Connection Confirm
+                        conn.sendall(struct.pack('>BBH', 3, 0, 11) + bytes([6, 0xd0, 0, 0, 0, 0, 0]))
+                except OSError:
+                    pass
+
+    def close(self):
+        self.sock.close()
+
+def bench_launch(options):
+    results = {}
+    sandbox = Sandbox(options)
+    rdp_server = None
+    try:
+        try:
+            rdp_server = FakeRDPServer(sandbox, options.boot_time)
+            rdp_server.start()
+        except OSError as e:
+            results['exited'] = {'skipped': f"cannot listen on {RDP_IP}:{RDP_PORT} for the fake RDP server ({e})"}
+
+        scenarios = ['running', 'paused'] + (['exited'] if rdp_server else [])
+        for scenario in scenarios:
+            overheads, walls, phases = [], [], {}
+            failures = 0
+            for _ in range(options.repeat):
+                sandbox.set_container(scenario)
+                known_starts = len(sandbox.freerdp_starts())
+                started, ended, result = sandbox.run_script(['excel'])
+                starts = sandbox.freerdp_starts()[known_starts:]
+                if result.returncode != 0 or not starts:
+                    failures += 1
+                    continue
+                overheads.append(starts[0] - started)
+                walls.append(ended - started)
+                launch = next((launch for launch in tracing.load_launches(1, path=sandbox.trace_path)), None)
+                for phase, seconds in (launch['phases'].items() if launch else ()):
+                    phases.setdefault(phase, []).append(seconds)
+            results[scenario] = {
+                'until_freerdp': summarize(overheads),
+                'wall': summarize(walls),
+                'phases': {phase: summarize(values) for phase, values in phases.items()},
+                'failures': failures,
+            }
+    finally:
+        if rdp_server:
+            rdp_server.close()
+        sandbox.remove()
+    return results
+
+def make_home(path, files, lock_ratio=0.02, seed=0):
+    """A synthetic home folder with `files` files in nested folders; returns the lock file paths."""
+    rng = random.Random(seed)
+    locks = []
+    per_dir = 25
+    for i in range(files):
+        directory = os.path.join(path, f"d{i // (per_dir * per_dir) % 50}", f"e{i // per_dir}")
+        if i % per_dir == 0:
+            os.makedirs(directory, exist_ok=True)
+        name = f"file{i}.{rng.choice(('docx', 'xlsx', 'pptx', 'txt', 'png', 'pdf'))}"
+        with open(os.path.join(directory, name), 'w') as f:
+            f.write('x')
+        # Only Office documents get lock files that the cleanup looks for
+        if name.endswith(('docx', 'xlsx', 'pptx')) and rng.random() < lock_ratio:
+            locks.append(os.path.join(directory, '~$' + name))
+    return locks
+
+def bench_cleanup(options):
+    results = []
+    sandbox = Sandbox(options)
+    try:
+        for size in options.sizes:
+            home = os.path.join(sandbox.root, f"home-{size}")
+            locks = make_home(home, size)
+            shutil.copytree(os.path.join(sandbox.home, '.local'), os.path.join(home, '.local'))
+            times = []
+            for _ in range(options.repeat):
+                for lock in locks:
+                    with open(lock, 'w') as f:
+                        f.write('lock')
+                started, ended, result = sandbox.run_script(['cleanup', '--full'], home=home)
+                if result.returncode == 0:
+                    times.append(ended - started)
+            remaining = sum(os.path.exists(lock) for lock in locks)
+            results.append({'files': size, 'lock_files': len(locks), 'not_removed': remaining, 'wall': summarize(times)})
+            shutil.rmtree(home, ignore_errors=True)
+    finally:
+        sandbox.remove()
+    return results
+
+GUI_PROBE = r'''
+import os, sys, time
+sys.path.insert(0, os.path.join(sys.argv[1], 'gui'))
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication
+import linoffice
+shown = linoffice.Launcher._show
+def _show(self, window):
+    shown(self, window)
+    print(f"SHOWN {time.time()} {type(window).__name__}", flush=True)
+    QTimer.singleShot(0, QApplication.instance().quit)
+linoffice.Launcher._show = _show
+linoffice.main()
+'''
+
+def bench_gui(options):
+    if importlib.util.find_spec('PySide6') is None:
+        return {'skipped': "PySide6 is not installed"}
+    sandbox = Sandbox(options)
+    try:
+        # A finished setup, so the launcher opens the main window
+        with open(os.path.join(sandbox.appdata, 'setup_progress.log'), 'w') as f:
+            f.write("office_installed\n")
+        sandbox.set_container('running')
+        env = sandbox.env()
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        cold, warm = [], []
+        windows = set()
+        for run in range(options.repeat + 1):
+            started = time.time()
+            try:
+                result = subprocess.run([sys.executable, '-c', GUI_PROBE, REPO_DIR], env=env, capture_output=True,
+                                        text=True, timeout=60)
+            except subprocess.TimeoutExpired:
+                continue
+            for line in result.stdout.splitlines():
+                if line.startswith('SHOWN '):
+                    _, shown_at, window = line.split()
+                    windows.add(window)
+                    # The first run also compiles the forms into the (sandbox) cache
+                    (cold if run == 0 else warm).append(float(shown_at) - started)
+        return {'cold': summarize(cold), 'warm': summarize(warm), 'windows': sorted(windows)}
+    finally:
+        sandbox.remove()
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+def make_release(path, size_mb, files=200):
+    """A release zip like GitHub's (one top-level folder) of about size_mb megabytes of incompressible data."""
+    per_file = max(int(size_mb * 1048576 / files), 1)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as archive:
+        for i in range(files):
+            archive.writestr(f"linoffice-9.9.9/data/file{i}.bin", os.urandom(per_file))
+        archive.writestr("linoffice-9.9.9/linoffice.sh", "#!/usr/bin/env bash\n")
+    return os.path.getsize(path)
+
+def bench_update(options):
+    import contextlib
+    import io
+    sys.path.insert(0, REPO_DIR)
+    import updater
+
+    root = tempfile.mkdtemp(prefix='linoffice-bench-update-')
+    serve_dir = os.path.join(root, 'serve')
+    os.makedirs(serve_dir)
+    size = make_release(os.path.join(serve_dir, 'linoffice.zip'), options.update_size_mb)
+    handler = lambda *args, **kwargs: QuietHandler(*args, directory=serve_dir, **kwargs)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/linoffice.zip"
+    saved = updater.DOWNLOAD_DIR, updater.ProgressPrinter
+    updater.DOWNLOAD_DIR = updater.Path(root) / 'downloads'
+    # The progress lines go to the real stdout, which is where the results are printed
+    updater.ProgressPrinter = lambda: None
+    downloads, updates = [], []
+    try:
+        for _ in range(options.repeat):
+            # Download only
+            updater.DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
+            target = updater.DOWNLOAD_DIR / 'download-only.zip'
+            downloader = updater.Downloader()
+            started = time.perf_counter()
+            try:
+                downloader.download(url, target)
+            finally:
+                downloader.close()
+            downloads.append(time.perf_counter() - started)
+            target.unlink()
+
+            # Download, compare, stage and swap in over a fresh installation
+            install = os.path.join(root, 'install')
+            for path in (install, install + updater.STAGING_SUFFIX, install + updater.PREVIOUS_SUFFIX):
+                shutil.rmtree(path, ignore_errors=True)
+            for part in SANDBOX_PARTS:
+                source = os.path.join(REPO_DIR, part)
+                target_path = os.path.join(install, part)
+                if os.path.isdir(source):
+                    shutil.copytree(source, target_path, ignore=shutil.ignore_patterns('__pycache__'))
+                else:
+                    os.makedirs(install, exist_ok=True)
+                    shutil.copy2(source, target_path)
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                ok = updater.download_and_update(url, install)
+            if ok:
+                updates.append(time.perf_counter() - started)
+    finally:
+        updater.DOWNLOAD_DIR, updater.ProgressPrinter = saved
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(root, ignore_errors=True)
+
+    def throughput(times):
+        return round(size / statistics.median(times) / 1048576, 1) if times else None
+
+    return {
+        'bytes': size,
+        'download': summarize(downloads),
+        'download_mb_per_s': throughput(downloads),
+        'update': summarize(updates),
+        'update_mb_per_s': throughput(updates),
+        'failures': options.repeat - len(updates),
+    }
+
+SLEEP_SIGNAL = "/org/freedesktop/login1: org.freedesktop.login1.Manager.PrepareForSleep ({},)\n"
+
+def wait_for(condition, timeout, interval=0.005):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if condition():
+            return True
+        time.sleep(interval)
+    return condition()
+
+def bench_sleep(options):
+    sandbox = Sandbox(options)
+    watcher = None
+    marker = os.path.join(sandbox.appdata, 'sleep_marker')
+    signals = os.path.join(sandbox.state, 'login1_signals')
+    try:
+        # The fake gdbus on PATH stands in for the system bus and replays what is written to `signals`
+        watcher = subprocess.Popen([sys.executable, os.path.join(sandbox.install, 'lib', 'sleepwatch.py')],
+                                   env=sandbox.env(), stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        pid_path = os.path.join(sandbox.appdata, 'sleepwatch.pid')
+        if not wait_for(lambda: os.path.exists(pid_path) and os.path.exists(signals), 10):
+            return {'skipped': "sleepwatch.py did not start listening"}
+        time.sleep(0.2)  # until tail follows the file
+        latencies = []
+        for _ in range(options.repeat):
+            with open(signals, 'a') as f:
+                f.write(SLEEP_SIGNAL.format('true'))
+            time.sleep(0.1)
+            started = time.perf_counter()
+            with open(signals, 'a') as f:
+                f.write(SLEEP_SIGNAL.format('false'))
+            if wait_for(lambda: os.path.exists(marker), 5):
+                latencies.append(time.perf_counter() - started)
+            if os.path.exists(marker):
+                os.remove(marker)
+        return {'resume_to_marker': summarize(latencies), 'failures': options.repeat - len(latencies)}
+    finally:
+        if watcher:
+            watcher.terminate()
+            try:
+                watcher.wait(5)
+            except subprocess.TimeoutExpired:
+                watcher.kill()
+        sandbox.remove()
+
+BENCHMARKS = {
+    'launch': bench_launch,
+    'cleanup': bench_cleanup,
+    'gui': bench_gui,
+    'update': bench_update,
+    'sleep': bench_sleep,
+}
+
+def git_revision():
+    try:
+        result = subprocess.run(['git', '-C', REPO_DIR, 'rev-parse', '--short', 'HEAD'],
+                                capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+def medians(node, prefix=''):
+    """Flatten a result tree into {'launch.paused.wall': median, ...}."""
+    found = {}
+    if isinstance(node, dict):
+        if 'median' in node and 'runs' in node:
+            found[prefix] = node['median']
+        for key, value in node.items():
+            found.update(medians(value, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(node, list):
+        for item in node:
+            label = f"files={item['files']}" if isinstance(item, dict) and 'files' in item else str(node.index(item))
+            found.update(medians(item, f"{prefix}[{label}]"))
+    return found
+
+def compare(baseline_path, results_path, threshold):
+    with open(baseline_path) as f:
+        baseline = medians(json.load(f)['results'])
+    with open(results_path) as f:
+        current = medians(json.load(f)['results'])
+    changes = []
+    for key in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[key], current[key]
+        if old and abs(new - old) / old * 100 >= threshold:
+            changes.append({'metric': key, 'baseline': old, 'current': new, 'change_percent': round((new - old) / old * 100, 1)})
+    print(json.dumps({'threshold_percent': threshold, 'changes': changes}, indent=2))
+    # Exit status 1 if anything got slower
+    return 1 if any(change['change_percent'] > 0 for change in changes) else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="LinOffice benchmarks with stubbed podman and FreeRDP")
+    parser.add_argument('--only', default=','.join(BENCHMARKS), help="comma-separated benchmarks to run")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per measurement")
+    parser.add_argument('--output', help="write the JSON results here instead of stdout")
+    parser.add_argument('--podman-latency', type=float, default=0.05, help="seconds per fake podman call")
+    parser.add_argument('--compose-latency', type=float, default=0.3, help="seconds per fake podman-compose call")
+    parser.add_argument('--boot-time', type=float, default=2.0, help="seconds until the fake Windows accepts RDP")
+    parser.add_argument('--session-time', type=float, default=0.5, help="seconds a fake FreeRDP session stays open")
+    parser.add_argument('--sizes', default='1000,10000,50000', help="files in the synthetic home folders")
+    parser.add_argument('--update-size-mb', type=float, default=20, help="size of the fake release")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'RESULTS'), help="compare two result files")
+    parser.add_argument('--threshold', type=float, default=10, help="percent change reported by --compare")
+    options = parser.parse_args()
+
+    if options.compare:
+        return compare(*options.compare, options.threshold)
+
+    options.sizes = [int(size) for size in options.sizes.split(',') if size.strip()]
+    selected = [name.strip() for name in options.only.split(',') if name.strip()]
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    results = {}
+    for name in selected:
+        print(f"Running {name} benchmark...", file=sys.stderr)
+        started = time.perf_counter()
+        results[name] = BENCHMARKS[name](options)
+        print(f"  done in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+
+    report = {
+        'version': RESULT_VERSION,
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'host': {
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'compose_isolated': not os.access('/usr/bin/podman-compose', os.X_OK),
+        },
+        'settings': {
+            'repeat': options.repeat,
+            'podman_latency': options.podman_latency,
+            'compose_latency': options.compose_latency,
+            'boot_time': options.boot_time,
+            'session_time': options.session_time,
+            'sizes': options.sizes,
+            'update_size_mb': options.update_size_mb,
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
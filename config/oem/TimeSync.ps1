@@ -23,8 +23,8 @@ function Monitor-File {
             # Network location not available, continue monitoring silently
         }
         
-        # Wait 60 seconds before next check
-        Start-Sleep -Seconds 60
+        # Wait 10 seconds before next check (the marker is created right after the host resumes)
+        Start-Sleep -Seconds 10
     }
 }
 
@@ -0,0 +1,212 @@
+# This Python file uses the following encoding: utf-8
+import json
+import os
+import sys
+
+from PySide6.QtCore import QObject, QProcess, QRunnable, QThreadPool, QTimer, Signal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lib')))
+import podman_api
+
+# Map 'podman events' statuses onto the container state they leave behind
+EVENT_STATES = {
+    'create': 'created',
+    'init': 'created',
+    'start': 'running',
+    'restart': 'running',
+    'unpause': 'running',
+    'pause': 'paused',
+    'died': 'exited',
+    'stop': 'exited',
+    'kill': 'exited',
+    'remove': 'missing',
+}
+
+class _QuerySignals(QObject):
+    result = Signal(str, str)  # state, status
+    unavailable = Signal()
+
+class ContainerQuery(QRunnable):
+    """Ask the podman API socket for the container state in a QThreadPool thread.
+
+    The request can take seconds (e.g. while podman.socket is being activated), so it must not
+    run on the GUI thread. The answer arrives via signals.result(state, status), or
+    signals.unavailable() if there is no API socket and the CLI has to be asked instead.
+    """
+
+    def __init__(self, container_name, max_age=0):
+        super().__init__()
+        self.container_name = container_name
+        self.max_age = max_age
+        # Created in the GUI thread, so the signals are delivered there
+        self.signals = _QuerySignals()
+
+    def start(self):
+        QThreadPool.globalInstance().start(self)
+
+    def run(self):
+        try:
+            state, status = podman_api.client().container(self.container_name, max_age=self.max_age)
+        except podman_api.PodmanUnavailable:
+            self.signals.unavailable.emit()
+        else:
+            self.signals.result.emit(state, status)
+
+class ContainerMonitor(QObject):
+    """Track the state of the LinOffice container without blocking the GUI thread.
+
+    Subscribes to 'podman events' for the container and emits state_changed(state, status)
+    as soon as an event arrives. If the event stream drops, it falls back to a timed poll
+    and keeps trying to re-subscribe in the background.
+    """
+    state_changed = Signal(str, str)  # state ('running', 'paused', 'exited', 'missing', ...), podman status text
+    error = Signal(str)
+
+    def __init__(self, container_name="LinOffice", poll_interval=30000, parent=None):
+        super().__init__(parent)
+        self.container_name = container_name
+        self.state = None
+        self.status = ''
+        self._stopped = False
+        self._events_buffer = b''
+        self._events_process = None
+        self._query_process = None
+        self._api_query = None
+        self._query_pending = False
+
+        # Fallback poll, only active while the event stream is down
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(poll_interval)
+        self._poll_timer.timeout.connect(self.query)
+
+        self._reconnect_timer = QTimer(self)
+        self._reconnect_timer.setSingleShot(True)
+        self._reconnect_timer.timeout.connect(self._start_events)
+        self._reconnect_delay = 1000
+
+    def start(self):
+        self._stopped = False
+        self.query()
+        self._start_events()
+
+    def stop(self):
+        self._stopped = True
+        self._poll_timer.stop()
+        self._reconnect_timer.stop()
+        for process in (self._events_process, self._query_process):
+            if process and process.state() != QProcess.NotRunning:
+                process.kill()
+                process.waitForFinished(1000)
+
+    def query(self):
+        """Ask podman for the current state; the result arrives via state_changed.
+
+        Uses the podman API socket if it is available (in a pool thread), otherwise runs
+        'podman ps' asynchronously.
+        """
+        if self._api_query is not None or (self._query_process and self._query_process.state() != QProcess.NotRunning):
+            self._query_pending = True
+            return
+        self._api_query = ContainerQuery(self.container_name)
+        self._api_query.signals.result.connect(self._on_api_result)
+        self._api_query.signals.unavailable.connect(self._query_cli)
+        self._api_query.start()
+
+    def _on_api_result(self, state, status):
+        self._api_query = None
+        if self._stopped:
+            return
+        self._set_state(state, status)
+        self._query_done()
+
+    def _query_cli(self):
+        self._api_query = None
+        if self._stopped:
+            return
+        self._query_process = QProcess(self)
+        self._query_process.finished.connect(self._on_query_finished)
+        self._query_process.errorOccurred.connect(self._on_query_error)
+        self._query_process.start('podman', [
+            'ps', '-a',
+            '--filter', f'name=^{self.container_name}$',
+            '--format', '{{.State}}\t{{.Status}}',
+        ])
+
+    def _on_query_finished(self, exit_code, exit_status):
+        process = self._query_process
+        if exit_status != QProcess.NormalExit or exit_code != 0:
+            self.error.emit(bytes(process.readAllStandardError()).decode(errors='replace').strip())
+        else:
+            output = bytes(process.readAllStandardOutput()).decode(errors='replace').strip()
+            if output:
+                state, _, status = output.splitlines()[0].partition('\t')
+                self._set_state(state.strip().lower(), status.strip())
+            else:
+                self._set_state('missing', '')
+        self._query_done()
+
+    def _query_done(self):
+        if self._query_pending:
+            self._query_pending = False
+            QTimer.singleShot(0, self.query)
+
+    def _on_query_error(self, error):
+        if error == QProcess.FailedToStart:
+            self.error.emit('podman could not be started')
+            self._query_done()
+
+    def _start_events(self):
+        if self._stopped:
+            return
+        self._events_buffer = b''
+        self._events_process = QProcess(self)
+        self._events_process.started.connect(self._on_events_started)
+        self._events_process.readyReadStandardOutput.connect(self._on_events_output)
+        self._events_process.finished.connect(self._on_events_dropped)
+        self._events_process.errorOccurred.connect(self._on_events_error)
+        self._events_process.start('podman', [
+            'events',
+            '--filter', 'type=container',
+            '--filter', f'container={self.container_name}',
+            '--format', 'json',
+        ])
+
+    def _on_events_started(self):
+        # The stream is up again, so the fallback poll is not needed
+        self._poll_timer.stop()
+        self._reconnect_delay = 1000
+
+    def _on_events_output(self):
+        self._events_buffer += bytes(self._events_process.readAllStandardOutput())
+        *lines, self._events_buffer = self._events_buffer.split(b'\n')
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            state = EVENT_STATES.get(str(event.get('Status', '')).lower())
+            if state:
+                self._set_state(state, self.status if state == self.state else '')
+                # Fetch the human readable status (e.g. 'Up 5 minutes') without waiting for it
+                self.query()
+
+    def _on_events_error(self, error):
+        if error == QProcess.FailedToStart:
+            self._on_events_dropped()
+
+    def _on_events_dropped(self, *args):
+        if self._stopped:
+            return
+        # Fall back to polling until the event stream can be re-established
+        if not self._poll_timer.isActive():
+            self._poll_timer.start()
+        self.query()
+        self._reconnect_timer.start(self._reconnect_delay)
+        self._reconnect_delay = min(self._reconnect_delay * 2, 60000)
+
+    def _set_state(self, state, status):
+        if state == self.state and status == self.status:
+            return
+        self.state = state
+        self.status = status
+        self.state_changed.emit(state, status)
@@ -4,53 +4,76 @@ import subprocess
 import os
 import signal
 import time
+import json
+import shutil
+import tempfile
 
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QDialog, QLabel,
     QPushButton, QStackedWidget, QProgressBar, QTextEdit, QMessageBox
 )
-from PySide6.QtUiTools import QUiLoader
 from PySide6.QtGui import QTextCursor, QDesktopServices
-from PySide6.QtCore import QFile, QTimer, QProcess, QIODevice, QUrl
+from PySide6.QtCore import QTimer, QProcess, QIODevice, QUrl, QProcessEnvironment, QSocketNotifier
+
+INSTALLER_DIR = os.path.dirname(os.path.abspath(__file__))
+GUI_DIR = os.path.dirname(INSTALLER_DIR)
+
+# Shared GUI modules (compiled form cache)
+if GUI_DIR not in sys.path:
+    sys.path.insert(0, GUI_DIR)
+import uicache
+
+# Installer output is rendered in batches: lines are collected and drawn every RENDER_INTERVAL_MS,
+# and only the last MAX_SCROLLBACK_LINES stay in the view. The complete output goes to OUTPUT_LOG_PATH.
+RENDER_INTERVAL_MS = 100
+MAX_SCROLLBACK_LINES = 2000
+OUTPUT_LOG_PATH = os.path.expanduser("~/.local/share/linoffice/installer_output.log")
+
+# setup.sh writes JSON-lines progress events (steps, download bytes and ETA, prompts, errors) to the
+# FIFO passed in LINOFFICE_EVENTS. They drive the progress bar and dialogs and are kept in
+# SETUP_EVENTS_PATH for timing analysis. Without the FIFO the console text is scraped instead.
+SETUP_EVENTS_PATH = os.path.expanduser("~/.local/share/linoffice/setup_events.jsonl")
+
+ANSI_ESCAPE_RE = re.compile(r'\x1b\[[0-9;]*m')
+ANSI_COLOR_RE = re.compile(r'\x1b\[(?P<code>[0-9;]+)m')
+HTML_TAG_RE = re.compile(r'<.*?>')
+STEP_RE = re.compile(r'^Step (\d+):')
+DOWNLOAD_RE = re.compile(r'Downloading Windows (10|11): (\d+)%')
+
+ANSI_COLOR_MAP = {
+    '31': 'red', '0;31': 'red',
+    '32': 'green', '0;32': 'green',
+    '33': 'gold', '1;33': 'gold', '0;33': 'gold',
+}
+BOLD_KEYWORDS = ('Step', 'INFO:', 'ERROR:', 'SUCCESS:')
 
 def strip_ansi_codes(text):
-    ansi_escape = re.compile(r'\x1b\[[0-9;]*m')
-    return ansi_escape.sub('', text)
+    return ANSI_ESCAPE_RE.sub('', text)
+
+def _ansi_color_repl(m):
+    code = m.group('code')
+    if code == '0':  # reset
+        return '</span>'
+    color = ANSI_COLOR_MAP.get(code)
+    if color:
+        return f'<span style="color:{color};">'
+    return ''
 
 def ansi_to_html(text):
     # Escape HTML special chars
     text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
 
-    # Regex to match ANSI color codes
-    ansi_escape = re.compile(r'\x1b\[(?P<code>[0-9;]+)m')
-
-    color_map = {
-        '31': 'red', '0;31': 'red',
-        '32': 'green', '0;32': 'green',
-        '33': 'gold', '1;33': 'gold', '0;33': 'gold',
-    }
-
-    def repl(m):
-        code = m.group('code')
-        if code == '0':  # reset
-            return '</span>'
-        color = color_map.get(code)
-        if color:
-            return f'<span style="color:{color};">'
-        return ''
-
-    text = ansi_escape.sub(repl, text)
+    text = ANSI_COLOR_RE.sub(_ansi_color_repl, text)
 
     # Remove trailing reset tags if any (optional)
     if text.endswith('</span>'):
-        text = text.rstrip('</span>')
+        text = text[:-len('</span>')]
 
     # Now check if text (ignoring leading spaces and color spans) starts with one of the keywords
     # Strip HTML tags to check the raw text start
-    raw_text = re.sub(r'<.*?>', '', text).lstrip()
+    raw_text = HTML_TAG_RE.sub('', text).lstrip()
 
-    keywords = ('Step', 'INFO:', 'ERROR:', 'SUCCESS:')
-    if any(raw_text.startswith(k) for k in keywords):
+    if raw_text.startswith(BOLD_KEYWORDS):
         text = f'<b>{text}</b>'
 
     return text
@@ -94,13 +117,25 @@ class Wizard(QWidget):
         self.process = None
         self.current_step = 0
 
+        # Output waiting to be rendered, and the file the complete output is written to
+        self.pending_lines = []
+        self.output_log = None
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(RENDER_INTERVAL_MS)
+        self.render_timer.timeout.connect(self.flush_output)
+
+        # Progress events from setup.sh
+        self.use_events = False
+        self.events_dir = None
+        self.events_fd = None
+        self.events_notifier = None
+        self.events_buffer = b''
+        self.events_log = None
+        self.step_total = 8
+
     def load_ui(self, path):
-        loader = QUiLoader()
-        file = QFile(path)
-        file.open(QFile.ReadOnly)
-        widget = loader.load(file, self)
-        file.close()
-        return widget
+        return uicache.load_ui(os.path.join(INSTALLER_DIR, path), self)
 
     def next_page(self):
         index = self.stack.currentIndex()
@@ -117,8 +152,10 @@ class Wizard(QWidget):
             self.back_btn.setEnabled(False)
 
         elif index == 2:
-            os.chdir(os.path.dirname(os.getcwd())) # Change working directory to the one above where the main GUI lives
-            subprocess.Popen([sys.executable, 'mainwindow.py']) # Load main GUI when the installer finishes
+            # Open the main GUI in this process when the installer finishes
+            from mainwindow import MainWindow
+            self.main_window = MainWindow()
+            self.main_window.show()
             self.close()
 
     def prev_page(self):
@@ -132,6 +169,9 @@ class Wizard(QWidget):
     def start_installation(self):
         self.progress_bar = self.install_page.findChild(QProgressBar, "progressBar")
         self.terminal_output = self.install_page.findChild(QTextEdit, "terminalOutput")
+        self.terminal_output.setUndoRedoEnabled(False)
+        self.terminal_output.document().setMaximumBlockCount(MAX_SCROLLBACK_LINES)
+        self.open_output_log()
 
         self.abort_button = self.install_page.findChild(QPushButton, "abortButton")
         if self.abort_button:
@@ -146,61 +186,225 @@ class Wizard(QWidget):
 
         self.process.setProgram("/bin/bash")
         self.process.setArguments([setup_script_path])
+        events_path = self.open_event_channel()
+        self.use_events = events_path is not None
+        if self.use_events:
+            env = QProcessEnvironment.systemEnvironment()
+            env.insert("LINOFFICE_EVENTS", events_path)
+            self.process.setProcessEnvironment(env)
         self.process.setProcessChannelMode(QProcess.MergedChannels)
         self.process.readyReadStandardOutput.connect(self.handle_output)
         self.process.finished.connect(self.installation_finished)
         self.process.start()
 
+    def open_output_log(self):
+        self.close_output_log()
+        try:
+            os.makedirs(os.path.dirname(OUTPUT_LOG_PATH), exist_ok=True)
+            self.output_log = open(OUTPUT_LOG_PATH, 'w', encoding='utf-8')
+        except OSError as e:
+            print(f"Could not open {OUTPUT_LOG_PATH}: {e}")
+            self.output_log = None
+
+    def close_output_log(self):
+        if self.output_log:
+            self.output_log.close()
+            self.output_log = None
+
+    def open_event_channel(self):
+        """Create the FIFO setup.sh writes its events to and start reading it. Returns its path or None."""
+        self.close_event_channel()
+        try:
+            self.events_dir = tempfile.mkdtemp(prefix="linoffice-setup-")
+            events_path = os.path.join(self.events_dir, "events")
+            os.mkfifo(events_path, 0o600)
+            # Non-blocking, so that opening does not wait for setup.sh to open the write end
+            self.events_fd = os.open(events_path, os.O_RDONLY | os.O_NONBLOCK)
+        except OSError as e:
+            print(f"Could not create the setup events FIFO, falling back to parsing the output: {e}")
+            self.close_event_channel()
+            return None
+        try:
+            self.events_log = open(SETUP_EVENTS_PATH, 'w', encoding='utf-8')
+        except OSError:
+            self.events_log = None
+        self.events_buffer = b''
+        self.events_notifier = QSocketNotifier(self.events_fd, QSocketNotifier.Read, self)
+        self.events_notifier.activated.connect(self.read_events)
+        return events_path
+
+    def close_event_channel(self):
+        if self.events_notifier:
+            self.events_notifier.setEnabled(False)
+            self.events_notifier.deleteLater()
+            self.events_notifier = None
+        if self.events_fd is not None:
+            os.close(self.events_fd)
+            self.events_fd = None
+        if self.events_dir:
+            shutil.rmtree(self.events_dir, ignore_errors=True)
+            self.events_dir = None
+        if self.events_log:
+            self.events_log.close()
+            self.events_log = None
+
+    def read_events(self):
+        if self.events_fd is None:
+            return
+        while True:
+            try:
+                data = os.read(self.events_fd, 65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                data = b''
+            if not data:
+                # All writers are gone; stop polling the FIFO until the next run
+                if self.events_notifier:
+                    self.events_notifier.setEnabled(False)
+                break
+            self.events_buffer += data
+        *lines, self.events_buffer = self.events_buffer.split(b'\n')
+        events = []
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(event, dict):
+                events.append(event)
+                if self.events_log:
+                    self.events_log.write(line.decode(errors="ignore") + '\n')
+        if self.events_log:
+            self.events_log.flush()
+        for event in events:
+            self.handle_event(event)
+
+    def step_percentage(self, step, fraction=0.0):
+        """Progress bar value for a step (1-based), plus the fraction of it that is done."""
+        return int(min(100, max(0, (step - 1 + fraction) / self.step_total * 100)))
+
+    def handle_event(self, event):
+        kind = event.get('event')
+        if kind == 'step':
+            self.current_step = int(event.get('step', self.current_step))
+            self.step_total = int(event.get('total', self.step_total)) or self.step_total
+            self.progress_bar.resetFormat()
+            self.progress_bar.setValue(self.step_percentage(self.current_step))
+        elif kind == 'step_end':
+            self.progress_bar.resetFormat()
+        elif kind == 'download':
+            percent = event.get('percent', 0)
+            self.progress_bar.setValue(self.step_percentage(self.current_step, percent / 100))
+            if event.get('eta'):
+                self.progress_bar.setFormat(f"%p% (download: {event['eta']} left)")
+        elif kind in ('error', 'failed'):
+            self.last_error_line = f"ERROR: {event.get('message', '')}"
+        elif kind == 'prompt':
+            if event.get('id') == 'vnc_sign_out_and_retry':
+                self.flush_output()
+                self.show_vnc_retry_dialog()
+        elif kind == 'complete':
+            self.progress_bar.resetFormat()
+            self.progress_bar.setValue(100)
+
+    def scrape_progress(self, clean_line):
+        """Progress from the console text, for when there is no event channel."""
+        # Track last ERROR line
+        if clean_line.startswith("ERROR:"):
+            self.last_error_line = clean_line
+
+        # Detect retry prompt marker from setup.sh and show GUI dialog
+        if "PROMPT:VNC_SIGN_OUT_AND_RETRY" in clean_line:
+            self.flush_output()
+            self.show_vnc_retry_dialog()
+
+        # increase progress bar
+        match = STEP_RE.search(clean_line)
+        if match:
+            step_num = int(match.group(1))
+            if step_num == 1:
+                percentage = 0
+            elif 2 <= step_num <= 8:
+                percentage = (step_num - 1) * 12.5
+            else:
+                percentage = min(87.5, self.progress_bar.value())  # Cap at 87.5% for steps > 8
+            self.progress_bar.setValue(int(percentage))
+
+        # Handle Windows download percentage
+        download_match = DOWNLOAD_RE.search(clean_line)
+        if download_match:
+            win_percent = int(download_match.group(2))
+            # Map to range 37–50%
+            mapped_percent = 37 + (win_percent / 100) * (50 - 37)
+            self.progress_bar.setValue(int(mapped_percent))
+
     def handle_output(self):
         while self.process.canReadLine():
             line = bytes(self.process.readLine()).decode(errors="ignore").rstrip()
 
-            # convert to HTML for display
-            html_line = ansi_to_html(line)
-            self.terminal_output.insertHtml(html_line + '<br>')
-
-            # Auto-scroll to the bottom
-            self.terminal_output.moveCursor(QTextCursor.End)
-
             # strip ANSI for regex matching
             clean_line = strip_ansi_codes(line)
-            
-            # Track last ERROR line
-            if clean_line.startswith("ERROR:"):
-                self.last_error_line = clean_line
 
-            # Detect retry prompt marker from setup.sh and show GUI dialog
-            if "PROMPT:VNC_SIGN_OUT_AND_RETRY" in clean_line:
-                self.show_vnc_retry_dialog()
+            # queue for display, the view is updated by flush_output
+            self.pending_lines.append(line)
+            if self.output_log:
+                self.output_log.write(clean_line + '\n')
 
-            # increase progress bar
-            match = re.search(r'^Step (\d+):', clean_line)
-            if match:
-                step_num = int(match.group(1))
-                if step_num == 1:
-                    percentage = 0
-                elif 2 <= step_num <= 8:
-                    percentage = (step_num - 1) * 12.5
-                else:
-                    percentage = min(87.5, self.progress_bar.value())  # Cap at 87.5% for steps > 8
-                self.progress_bar.setValue(int(percentage))
-
-            # Handle Windows download percentage
-            download_match = re.search(r'Downloading Windows (10|11): (\d+)%', clean_line)
-            if download_match:
-                win_percent = int(download_match.group(2))
-                # Map to range 37–50%
-                mapped_percent = 37 + (win_percent / 100) * (50 - 37)
-                self.progress_bar.setValue(int(mapped_percent))
+            if not self.use_events:
+                self.scrape_progress(clean_line)
+        if self.pending_lines and not self.render_timer.isActive():
+            self.render_timer.start()
         # Check if process has finished and exited successfully
         if self.process.state() == QProcess.NotRunning:
             if self.process.exitStatus() == QProcess.NormalExit and self.process.exitCode() == 0:
                 self.progress_bar.setValue(100)
 
+    def flush_output(self):
+        """Render the queued output lines in one edit and keep the view scrolled to the end."""
+        self.render_timer.stop()
+        if self.output_log:
+            self.output_log.flush()
+        if not self.pending_lines:
+            return
+        # Only the last lines of a large batch would survive the scrollback limit anyway
+        lines = self.pending_lines[-MAX_SCROLLBACK_LINES:]
+        self.pending_lines = []
+
+        scrollbar = self.terminal_output.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+
+        document = self.terminal_output.document()
+        cursor = QTextCursor(document)
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for line in lines:
+            # One block per line, so that the document's maximum block count bounds the scrollback
+            if not document.isEmpty():
+                cursor.insertBlock()
+            cursor.insertHtml(ansi_to_html(line))
+        cursor.endEditBlock()
+
+        # Auto-scroll to the bottom, unless the user has scrolled up to read earlier output
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
     def installation_finished(self):
         exit_code = self.process.exitCode()
         self.progress_bar.setValue(100)
 
+        self.handle_output()
+        if self.process.bytesAvailable():
+            # A last line without a trailing newline
+            line = bytes(self.process.readAll()).decode(errors="ignore").rstrip()
+            self.pending_lines.append(line)
+            if self.output_log:
+                self.output_log.write(strip_ansi_codes(line) + '\n')
+        self.read_events()
+        self.close_event_channel()
+        self.flush_output()
+        self.close_output_log()
+
         if exit_code == 0:
             self.terminal_output.append("\nInstallation finished.")
             self.next_btn.setEnabled(True)
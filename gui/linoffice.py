@@ -1,20 +1,13 @@
-import subprocess
 import sys
 import os
 from PySide6.QtWidgets import QApplication, QMessageBox
-from PySide6.QtCore import QFileInfo
+from PySide6.QtCore import QObject, QProcess, QTimer
 from pathlib import Path
 
-def container_exists(container_name="LinOffice"):
-    try:
-        result = subprocess.run(
-            ["podman", "ps", "-a", "--format", "{{.Names}}"],
-            capture_output=True,
-            text=True
-        )
-        return container_name in result.stdout.splitlines()
-    except Exception:
-        return False
+from container_monitor import ContainerQuery
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INSTALLER_DIR = os.path.join(BASE_DIR, "installer")
 
 def setup_successful(log_path="~/.local/share/linoffice/setup_progress.log"):
     try:
@@ -26,44 +19,95 @@ def setup_successful(log_path="~/.local/share/linoffice/setup_progress.log"):
     except Exception:
         return False
 
-def start_script(script_path, working_dir=None):
-    cwd = working_dir or os.path.dirname(script_path)
-    subprocess.Popen([sys.executable, script_path], cwd=cwd)
-    sys.exit(0)
-
 def ask_user(message):
     msg_box = QMessageBox()
     msg_box.setText(message)
     msg_box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
     return msg_box.exec() == QMessageBox.Yes
 
-def main():
-    app = QApplication(sys.argv)
+class Launcher(QObject):
+    """Opens the main window or the installer in this process.
 
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    mainwindow_path = os.path.join(base_dir, "mainwindow.py")
-    installer_path = os.path.join(base_dir, "installer", "installer.py")
-    log_path = "~/.local/share/linoffice/setup_progress.log"
+    The check whether the container exists is kept off the critical path: after a successful setup
+    the main window is shown right away and the installer is only offered once podman (its API
+    socket, or the CLI in the background) reports the container missing.
+    """
 
-    container_found = container_exists("LinOffice")
-    success = setup_successful(log_path)
+    def __init__(self, container_name="LinOffice", log_path="~/.local/share/linoffice/setup_progress.log"):
+        super().__init__()
+        self.container_name = container_name
+        self.success = setup_successful(log_path)
+        self.window = None
+        self.process = None
+        self.query = None
 
-    if container_found:
-        if success:
-            start_script(mainwindow_path)
+    def start(self):
+        if self.success:
+            self.open_main_window()
+            # Ask podman once the window is up
+            QTimer.singleShot(0, self.check_container)
         else:
-            if ask_user("Setup might be incomplete.\nDo you want to open the installer again?"):
-                start_script(installer_path, working_dir=os.path.dirname(installer_path))
-            else:
-                start_script(mainwindow_path)
-    else:
-        if success:
-            if ask_user("LinOffice container can't be found.\nIt could have been deleted.\nOpen the installer again?"):
-                start_script(installer_path, working_dir=os.path.dirname(installer_path))
-            else:
-                start_script(mainwindow_path)
+            self.check_container()
+
+    def check_container(self):
+        # The API request runs in a pool thread, the answer arrives in the event loop
+        self.query = ContainerQuery(self.container_name, max_age=None)
+        self.query.signals.result.connect(self._api_answered)
+        self.query.signals.unavailable.connect(self._check_with_cli)
+        self.query.start()
+
+    def _api_answered(self, state, _status):
+        self.container_checked(state != 'missing')
+
+    def _check_with_cli(self):
+        # No podman API socket: ask the CLI without blocking
+        self.process = QProcess(self)
+        self.process.finished.connect(lambda exit_code, _status: self.container_checked(exit_code == 0))
+        self.process.errorOccurred.connect(self._check_failed)
+        self.process.start("podman", ["container", "exists", self.container_name])
+
+    def _check_failed(self, error):
+        if error == QProcess.FailedToStart:
+            self.container_checked(False)
+
+    def container_checked(self, container_found):
+        if container_found:
+            if not self.success:
+                if ask_user("Setup might be incomplete.\nDo you want to open the installer again?"):
+                    self.open_installer()
+                else:
+                    self.open_main_window()
         else:
-            start_script(installer_path, working_dir=os.path.dirname(installer_path))
+            if self.success:
+                if ask_user("LinOffice container can't be found.\nIt could have been deleted.\nOpen the installer again?"):
+                    self.open_installer()
+            else:
+                self.open_installer()
+
+    def open_main_window(self):
+        from mainwindow import MainWindow
+        self._show(MainWindow())
+
+    def open_installer(self):
+        if INSTALLER_DIR not in sys.path:
+            sys.path.insert(0, INSTALLER_DIR)
+        from installer import Wizard
+        self._show(Wizard())
+
+    def _show(self, window):
+        previous, self.window = self.window, window
+        window.show()
+        # Until now the only windows were the questions, closing them must not end the application
+        QApplication.instance().setQuitOnLastWindowClosed(True)
+        if previous is not None:
+            previous.close()
+
+def main():
+    app = QApplication(sys.argv)
+    app.setQuitOnLastWindowClosed(False)
+
+    launcher = Launcher("LinOffice")
+    launcher.start()
 
     sys.exit(app.exec())
 
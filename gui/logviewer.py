@@ -0,0 +1,182 @@
+# This Python file uses the following encoding: utf-8
+import os
+import subprocess
+import sys
+
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QCheckBox, QPlainTextEdit
+from PySide6.QtCore import QTimer
+from PySide6.QtGui import QFontDatabase, QTextCursor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lib')))
+import logreader
+from common import LOG_PATH
+
+LEVEL_CHOICES = [("All levels", 'DEBUG'), ("Info and above", 'INFO'), ("Warnings and errors", 'WARN'), ("Errors only", 'ERROR')]
+ALL_RUNS = "All runs"
+
+class LogViewerWindow(QDialog):
+    """linoffice.log with filters for level and run id.
+
+    Only the end of the log is read when the window opens; older lines are loaded a page at a
+    time with "Load older", and lines appended by LinOffice show up while the window is open.
+    """
+
+    PAGE_LINES = 500  # matching lines loaded per "Load older"
+    MAX_SCAN_LINES = 50000  # lines looked at per "Load older", so a rare filter does not freeze the window
+    POLL_INTERVAL = 500
+
+    def __init__(self, parent=None, path=LOG_PATH):
+        super().__init__(parent)
+        self.setWindowTitle("LinOffice log")
+        self.resize(900, 600)
+        self.path = path
+        self.reader = logreader.LogReader(path)
+        self.matches = logreader.record_filter()
+        self.cursor = 0  # oldest line of the reader looked at for the current filter
+        self.shown = 0
+        self.runs = set()
+
+        layout = QVBoxLayout()
+        filters = QHBoxLayout()
+        self.level_box = QComboBox()
+        for label, _level in LEVEL_CHOICES:
+            self.level_box.addItem(label)
+        self.level_box.currentIndexChanged.connect(self.reload)
+        filters.addWidget(self.level_box)
+        self.run_box = QComboBox()
+        self.run_box.setEditable(True)
+        self.run_box.addItem(ALL_RUNS)
+        self.run_box.setMinimumContentsLength(12)
+        self.run_box.setToolTip("Show only the lines of one LinOffice run (the number after the date)")
+        self.run_box.currentTextChanged.connect(self._reload_soon)
+        filters.addWidget(self.run_box)
+        filters.addStretch()
+        self.follow_box = QCheckBox("Follow new lines")
+        self.follow_box.setChecked(True)
+        filters.addWidget(self.follow_box)
+        layout.addLayout(filters)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.text.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        layout.addWidget(self.text)
+
+        buttons = QHBoxLayout()
+        self.older_button = QPushButton("Load older")
+        self.older_button.clicked.connect(self.load_older)
+        buttons.addWidget(self.older_button)
+        self.status = QLabel()
+        buttons.addWidget(self.status, 1)
+        editor_button = QPushButton("Open in text editor")
+        editor_button.clicked.connect(lambda: subprocess.Popen(['xdg-open', self.path]))
+        buttons.addWidget(editor_button)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+        # Typing a run id reloads once the user pauses
+        self._reload_timer = QTimer(self)
+        self._reload_timer.setSingleShot(True)
+        self._reload_timer.setInterval(300)
+        self._reload_timer.timeout.connect(self.reload)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(self.POLL_INTERVAL)
+
+        self.reader.refresh()
+        self.reload()
+
+    def _reload_soon(self):
+        self._reload_timer.start()
+
+    def reload(self):
+        run = self.run_box.currentText().strip()
+        level = LEVEL_CHOICES[max(self.level_box.currentIndex(), 0)][1]
+        self.matches = logreader.record_filter(level, '' if run == ALL_RUNS else run)
+        self.text.clear()
+        self.shown = 0
+        self.cursor = len(self.reader)
+        self.load_older()
+        self.text.moveCursor(QTextCursor.End)
+
+    def load_older(self):
+        lines = []
+        scanned = 0
+        while len(lines) < self.PAGE_LINES and scanned < self.MAX_SCAN_LINES:
+            if self.cursor == 0:
+                # Index some more of the file; the lines found before the old first line shift the numbering
+                self.cursor = self.reader.index_older()
+                if self.cursor == 0:
+                    break
+            self.cursor -= 1
+            scanned += 1
+            record = self.reader.record(self.cursor)
+            self._add_run(record.run)
+            if self.matches(record):
+                lines.append(record.text)
+        if lines:
+            self.shown += len(lines)
+            lines.reverse()
+            scrollbar = self.text.verticalScrollBar()
+            from_bottom = scrollbar.maximum() - scrollbar.value()
+            if self.text.document().isEmpty():
+                self.text.setPlainText("\n".join(lines))
+            else:
+                cursor = QTextCursor(self.text.document())
+                cursor.movePosition(QTextCursor.Start)
+                cursor.insertText("\n".join(lines) + "\n")
+            # Keep the lines that were on screen in place
+            scrollbar.setValue(scrollbar.maximum() - from_bottom)
+        self._update_status()
+
+    def poll(self):
+        if self.reader.refresh():
+            # The log was rotated, start over with the new file
+            self.reload()
+            return
+        added = self.reader.index_newer()
+        if not added:
+            return
+        count = len(self.reader)
+        lines = []
+        for i in range(count - added, count):
+            record = self.reader.record(i)
+            self._add_run(record.run)
+            if self.matches(record):
+                lines.append(record.text)
+        if lines:
+            self.shown += len(lines)
+            scrollbar = self.text.verticalScrollBar()
+            position = scrollbar.value()
+            self.text.appendPlainText("\n".join(lines))
+            if self.follow_box.isChecked():
+                self.text.moveCursor(QTextCursor.End)
+                self.text.ensureCursorVisible()
+            else:
+                scrollbar.setValue(position)
+        self._update_status()
+
+    def _add_run(self, run):
+        if run and run not in self.runs:
+            self.runs.add(run)
+            self.run_box.blockSignals(True)
+            self.run_box.addItem(run)
+            self.run_box.blockSignals(False)
+
+    def _update_status(self):
+        at_start = self.cursor == 0 and self.reader.at_start()
+        self.older_button.setEnabled(not at_start)
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            self.status.setText("The log file does not exist yet.")
+            return
+        if at_start:
+            self.status.setText(f"{self.shown} lines shown")
+        else:
+            self.status.setText(f"{self.shown} lines shown from the last {(size - self.reader.first) // 1024} of {size // 1024} KB")
+
+    def done(self, result):
+        self.timer.stop()
+        self.reader.close()
+        super().done(result)
@@ -1,24 +1,44 @@
 # This Python file uses the following encoding: utf-8
 import sys
-from PySide6.QtWidgets import QApplication, QWidget, QMainWindow, QMessageBox, QDialog, QVBoxLayout, QLabel, QPushButton, QHBoxLayout, QTextEdit
-from PySide6.QtUiTools import QUiLoader
-from PySide6.QtCore import QFile, QTimer, QProcess
-from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QApplication, QWidget, QMainWindow, QMessageBox, QDialog, QVBoxLayout, QLabel, QPushButton, QHBoxLayout, QTextEdit, QProgressBar, QComboBox, QCompleter, QTreeWidget, QTreeWidgetItem
+from PySide6.QtCore import QTimer, QProcess, Qt, QEvent, QObject, QRunnable, QThreadPool, Signal
+from PySide6.QtGui import QTextCursor, QStandardItemModel, QStandardItem
 import subprocess
 import os
-import csv
 import threading
+import time
 import re
 
+from container_monitor import ContainerMonitor
+from logviewer import LogViewerWindow
+import uicache
+
+GUI_DIR = os.path.dirname(os.path.abspath(__file__))
 LINOFFICE_SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'linoffice.sh'))
+LIB_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lib'))
 SETUP_SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'setup.sh'))
 UNINSTALL_SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'uninstall.sh'))
 
 # Define the user's local registry override config path
 USER_REGISTRY_CONFIG = os.path.expanduser('~/.local/share/linoffice/registry_override.conf')
 
-# Define the languages CSV file path
-LANGUAGES_CSV = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'config', 'languages.csv'))
+# Shared LinOffice modules (launcher daemon client etc.)
+sys.path.insert(0, LIB_DIR)
+import config_store
+import languages
+import launcher
+import readiness
+import sessions
+import tracing
+
+# Name of the podman container running Windows
+CONTAINER_NAME = 'LinOffice'
+
+# Cached FreeRDP detection written by linoffice.sh (key, command, version)
+FREERDP_CACHE_FILE = os.path.expanduser('~/.local/share/linoffice/freerdp_cache')
+
+# Minimum time between two pre-warm requests from the main window (hovering the buttons repeats them)
+PREWARM_INTERVAL = 15
 
 # Define the internet state file path
 INTERNET_STATE_FILE = os.path.expanduser('~/.local/share/linoffice/internet')
@@ -67,22 +87,30 @@ def ensure_registry_config_exists():
             f.write('DECIMAL_SEPARATOR=""\n')
             f.write('CURRENCY_SYMBOL=""\n')
 
-def load_languages_from_csv():
-    """Load languages from the CSV file and return a list of formatted options"""
-    languages = []
-    try:
-        with open(LANGUAGES_CSV, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            next(reader)  # Skip header row
-            for row in reader:
-                if len(row) >= 3:
-                    kbd_code, lang_code, lang_name = row[0], row[1], row[2]
-                    # Format: "af_ZA [Afrikaans (South Africa)]"
-                    formatted_option = f"{lang_code} [{lang_name}]"
-                    languages.append((formatted_option, kbd_code))
-    except Exception as e:
-        print(f"Error loading languages from CSV: {e}")
-    return languages
+# Item model of the keyboard comboBox, built once and shared by all settings windows
+_keyboard_model = None
+_keyboard_model_index = None
+
+def keyboard_model():
+    """Model with "(no change)" followed by the languages from config/languages.csv"""
+    global _keyboard_model, _keyboard_model_index
+    index = languages.language_index()
+    if _keyboard_model is None or _keyboard_model_index is not index:
+        model = QStandardItemModel()
+        no_change = QStandardItem("(no change)")
+        no_change.setData("", Qt.UserRole)
+        model.appendRow(no_change)
+        for language in index:
+            # Format: "af_ZA [Afrikaans (South Africa)]"
+            item = QStandardItem(language.label)
+            item.setData(language.kbd, Qt.UserRole)
+            model.appendRow(item)
+        _keyboard_model, _keyboard_model_index = model, index
+    return _keyboard_model
+
+def launch_in_background(*args):
+    """Launch a linoffice.sh command through the launcher daemon without blocking the GUI thread"""
+    threading.Thread(target=launcher.launch, args=(args,), daemon=True).start()
 
 def strip_ansi_codes(text):
     ansi_escape = re.compile(r'\x1b\[[0-9;]*m')
@@ -96,32 +124,48 @@ class MainWindow(QWidget):
         self.load_ui('main.ui')
         self.setWindowTitle(self.ui.windowTitle())
         self.connect_buttons()
-        self.update_container_status()
-        # Set up a timer to update container status every 30 seconds
-        self.status_timer = QTimer(self)
-        self.status_timer.timeout.connect(self.update_container_status)
-        self.status_timer.start(30000)  # 30,000 ms = 30 seconds
-        # Check container status and prompt user if not running
-        self.check_and_prompt_container()
+        # Watch the container state in the background (podman events, with a 30 second poll as fallback)
+        self._prompted_container = False
+        self.container_monitor = ContainerMonitor(CONTAINER_NAME, poll_interval=30000, parent=self)
+        self.container_monitor.state_changed.connect(self.update_container_status)
+        self.container_monitor.error.connect(self.container_status_error)
+        self.container_monitor.start()
+        # Show the apps that are open (the session registry is small, so a cheap mtime check is enough)
+        self._sessions_mtime = -1
+        self._sessions_open = False
+        self.sessions_timer = QTimer(self)
+        self.sessions_timer.timeout.connect(self.update_sessions)
+        self.sessions_timer.start(2000)
+        self.update_sessions()
+        # Make sure the launcher daemon is warm before the first click, and Windows too
+        self._last_prewarm = None
+        threading.Thread(target=self.ensure_launcher_daemon, daemon=True).start()
 
     def load_ui(self, ui_file):
-        loader = QUiLoader()
-        file = QFile(ui_file)
-        file.open(QFile.ReadOnly)
-        self.ui = loader.load(file, self)
-        file.close()
+        self.ui = uicache.load_ui(os.path.join(GUI_DIR, ui_file), self)
 
     # Connect the buttons to functions
     def connect_buttons(self):
         self.ui.pushButton_settings.clicked.connect(self.open_settings_window)
         self.ui.pushButton_tools.clicked.connect(self.open_tools_window)
         self.ui.pushButton_troubleshooting.clicked.connect(self.open_troubleshooting_window)
+        self.ui.pushButton_timings.clicked.connect(self.open_timings_window)
         # Connect app launch buttons
         self.ui.pushButton_word.clicked.connect(lambda: self.launch_linoffice_app('word'))
         self.ui.pushButton_excel.clicked.connect(lambda: self.launch_linoffice_app('excel'))
         self.ui.pushButton_powerpoint.clicked.connect(lambda: self.launch_linoffice_app('powerpoint'))
         self.ui.pushButton_outlook.clicked.connect(lambda: self.launch_linoffice_app('outlook'))
         self.ui.pushButton_onenote.clicked.connect(lambda: self.launch_linoffice_app('onenote'))
+        # Resuming Windows while the pointer is on its way to the click saves most of the wait
+        self.app_buttons = (self.ui.pushButton_word, self.ui.pushButton_excel, self.ui.pushButton_powerpoint,
+                            self.ui.pushButton_outlook, self.ui.pushButton_onenote)
+        for button in self.app_buttons:
+            button.installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Enter and watched in self.app_buttons:
+            self.prewarm('hover')
+        return super().eventFilter(watched, event)
 
     # Functions to open secondary windows
     def open_settings_window(self):
@@ -136,45 +180,189 @@ class MainWindow(QWidget):
         self.troubleshooting_window = TroubleshootingWindow()
         self.troubleshooting_window.show()
 
+    def open_timings_window(self):
+        self.timings_window = LaunchTimingsWindow(self)
+        self.timings_window.show()
+
     def launch_linoffice_app(self, *args):
-        subprocess.Popen([LINOFFICE_SCRIPT, *args])
+        launch_in_background(*args)
 
-    def update_container_status(self):
-        try:
-            result = subprocess.run(['podman', 'ps', '--filter', 'name=LinOffice', '--format', '{{.Status}}'], capture_output=True, text=True, check=True)
-            status = result.stdout.strip()
-            if status:
-                status_text = f"Container: running ({status})"
-            else:
-                status_text = "Container: not running"
-        except Exception as e:
-            status_text = f"Container: error"
+    def ensure_launcher_daemon(self):
+        if not launcher.daemon_running():
+            launcher.start_daemon()
+            return
+        self.prewarm('window')
+
+    def prewarm(self, reason):
+        now = time.monotonic()
+        if self._last_prewarm is not None and now - self._last_prewarm < PREWARM_INTERVAL:
+            return
+        self._last_prewarm = now
+        threading.Thread(target=launcher.prewarm, args=(reason,), daemon=True).start()
+
+    def update_container_status(self, state, status):
+        if state in ('running', 'paused'):
+            status_text = f"Container: {state} ({status})" if status else f"Container: {state}"
+        else:
+            status_text = "Container: not running"
         self.ui.label.setText(status_text)
+        self.ui.label.setToolTip(self.readiness_tooltip())
+        # The first state we learn about decides whether to offer starting the container
+        if not self._prompted_container:
+            self._prompted_container = True
+            if state not in ('running', 'paused'):
+                QTimer.singleShot(0, self.check_and_prompt_container)
+
+    def update_sessions(self):
+        try:
+            mtime = os.stat(sessions.SESSIONS_PATH).st_mtime_ns
+        except OSError:
+            mtime = None
+        # While apps are open, keep checking in case one of them died without updating the registry
+        if mtime == self._sessions_mtime and not self._sessions_open:
+            return
+        self._sessions_mtime = mtime
+        try:
+            # Read only: the registry lock may be held by linoffice.sh or the daemon, and they prune it
+            active = sessions.freerdp_sessions(prune=False) if mtime is not None else []
+        except OSError:
+            active = []
+        self._sessions_open = bool(active)
+        if not active:
+            self.ui.label_sessions.setText("No apps open")
+            self.ui.label_sessions.setToolTip("")
+            return
+        names = [entry.args.split(' ', 1)[0] or "?" for entry in active]
+        self.ui.label_sessions.setText(f"Open: {', '.join(names)}")
+        self.ui.label_sessions.setToolTip("\n".join(f"{entry.args} (PID {entry.freerdp_pid})" for entry in active))
+
+    def readiness_tooltip(self):
+        # How long the last wait for Windows took (written by lib/readiness.py)
+        timings = readiness.load_timings()
+        if not timings:
+            return ""
+        names = {'container': "container running", 'port': "RDP port open", 'rdp': "Windows accepting sessions"}
+        lines = [f"{names[phase]}: {timings[phase]:.1f} s" for phase in readiness.PHASES if phase in timings]
+        if not timings.get('ready'):
+            lines.append(f"gave up after {timings.get('total', 0):.1f} s")
+        return "Last Windows start:\n" + "\n".join(lines)
+
+    def container_status_error(self, message):
+        print(f"DEBUG: podman ps error: {message}")
+        self.ui.label.setText("Container: error")
+        if not self._prompted_container:
+            self._prompted_container = True
+            QMessageBox.critical(self, "Error", "Could not check container status.")
 
     def check_and_prompt_container(self):
+        # Container is not running, show dialog
+        dialog = QMessageBox(self)
+        dialog.setWindowTitle("Container Not Running")
+        dialog.setText("The LinOffice container is not running. Would you like to start the container now? Otherwise, starting an Office app may take longer.")
+        dialog.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
+        dialog.setDefaultButton(QMessageBox.Yes)
+        response = dialog.exec()
+        if response == QMessageBox.Yes:
+            # Run linoffice.sh --startcontainer in the background
+            subprocess.Popen([LINOFFICE_SCRIPT, '--startcontainer'])
+
+    def closeEvent(self, event):
+        self.container_monitor.stop()
+        event.accept()
+
+class _DaemonRequestSignals(QObject):
+    reply = Signal(object)
+    failed = Signal()
+
+class DaemonRequest(QRunnable):
+    """Send a request to the launcher daemon from a QThreadPool thread.
+
+    The reply arrives in the GUI thread via signals.reply(dict), or signals.failed() if the
+    daemon could not be reached.
+    """
+
+    def __init__(self, payload, timeout=5.0):
+        super().__init__()
+        self.payload = payload
+        self.timeout = timeout
+        self.signals = _DaemonRequestSignals()
+
+    def start(self):
+        QThreadPool.globalInstance().start(self)
+
+    def run(self):
         try:
-            result = subprocess.run(['podman', 'ps', '--filter', 'name=LinOffice', '--format', '{{.Status}}'], capture_output=True, text=True, check=True)
-            if not result.stdout.strip():
-                # Container is not running, show dialog
-                dialog = QMessageBox(self)
-                dialog.setWindowTitle("Container Not Running")
-                dialog.setText("The LinOffice container is not running. Would you like to start the container now? Otherwise, starting an Office app may take longer.")
-                dialog.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
-                dialog.setDefaultButton(QMessageBox.Yes)
-                response = dialog.exec()
-                if response == QMessageBox.Yes:
-                    # Run linoffice.sh --startcontainer in the background
-                    threading.Thread(target=lambda: subprocess.Popen([LINOFFICE_SCRIPT, '--startcontainer'])).start()
-        except subprocess.CalledProcessError as e:
-            print(f"DEBUG: podman ps error: {e.stderr}")
-            QMessageBox.critical(self, "Error", "Could not check container status.")
+            reply = launcher.request(self.payload, timeout=self.timeout)
+        except (OSError, ValueError):
+            self.signals.failed.emit()
+        else:
+            self.signals.reply.emit(reply)
 
 # Defining secondary windows
+class LaunchTimingsWindow(QDialog):
+    """The last launches with the time spent in each phase (recorded by lib/tracing.py)."""
+
+    LAUNCH_COUNT = 20
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Launch timings")
+        self.setMinimumSize(480, 360)
+
+        layout = QVBoxLayout()
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Launch", "Seconds"])
+        self.tree.setColumnWidth(0, 340)
+        layout.addWidget(self.tree)
+        self.summary = QLabel()
+        layout.addWidget(self.summary)
+        self.setLayout(layout)
+
+        # Launches append to the trace file, reload it whenever it changes
+        self._trace_mtime = -1
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    def refresh(self):
+        try:
+            mtime = os.stat(tracing.TRACE_PATH).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._trace_mtime:
+            return
+        self._trace_mtime = mtime
+        launches = tracing.load_launches(self.LAUNCH_COUNT)
+        expanded = {self.tree.topLevelItem(i).data(0, Qt.UserRole) for i in range(self.tree.topLevelItemCount())
+                    if self.tree.topLevelItem(i).isExpanded()}
+        self.tree.clear()
+        for position, launch in enumerate(launches):
+            started = time.strftime('%a %H:%M:%S', time.localtime(launch['start']))
+            item = QTreeWidgetItem([f"{started}  {launch['command'] or '?'}", f"{launch['total']:.1f}"])
+            item.setData(0, Qt.UserRole, launch['run'])
+            known = [phase for phase in tracing.PHASES if phase in launch['phases']]
+            others = sorted(phase for phase in launch['phases'] if phase not in tracing.PHASES)
+            for phase in known + others:
+                name = tracing.PHASE_NAMES.get(phase, phase)
+                item.addChild(QTreeWidgetItem([name, f"{launch['phases'][phase]:.2f}"]))
+            self.tree.addTopLevelItem(item)
+            # Show the breakdown of the newest launch right away
+            item.setExpanded(launch['run'] in expanded or (position == 0 and not expanded))
+        if launches:
+            slowest = max(launches, key=lambda launch: launch['total'])
+            self.summary.setText(f"{len(launches)} launches, slowest: {slowest['command'] or '?'} ({slowest['total']:.1f} s)")
+        else:
+            self.summary.setText("No launches recorded yet.")
+
 class SettingsWindow(QMainWindow):
     def __init__(self, parent=None):
         super(SettingsWindow, self).__init__(parent)
         self.load_ui('settings.ui')
         self.setWindowTitle(self.ui.windowTitle())
+        # Own instances, so changes made in another window are never saved along with these
+        self.config = config_store.LinOfficeConfig()
+        self.registry_config = config_store.RegistryOverrideConfig()
         self.settings_changed = False
         self._initial_network_checked = None  # Track initial state
         self.load_current_settings()
@@ -183,11 +371,7 @@ class SettingsWindow(QMainWindow):
         self.connect_settings_buttons()
 
     def load_ui(self, ui_file):
-        loader = QUiLoader()
-        file = QFile(ui_file)
-        file.open(QFile.ReadOnly)
-        self.ui = loader.load(file, self)
-        file.close()
+        self.ui = uicache.load_ui(os.path.join(GUI_DIR, ui_file), self)
 
     def connect_settings_buttons(self):
         # Connect the set language button
@@ -212,172 +396,141 @@ class SettingsWindow(QMainWindow):
     def load_current_settings(self):
         """Load current settings from config files"""
         try:
-            import re
             # Load linoffice.conf settings
-            linoffice_conf_path = os.path.join(os.path.dirname(LINOFFICE_SCRIPT), 'config', 'linoffice.conf')
-            if os.path.exists(linoffice_conf_path):
-                with open(linoffice_conf_path, 'r') as f:
-                    content = f.read()
-                    # Set autopause checkbox
-                    if 'AUTOPAUSE="on"' in content:
-                        self.ui.checkBox_suspend.setChecked(True)
-                    elif 'AUTOPAUSE="off"' in content:
-                        self.ui.checkBox_suspend.setChecked(False)
-                    
-                    # Set scaling combobox
-                    if 'RDP_SCALE="100"' in content:
-                        self.ui.comboBox_scaling.setCurrentText("100%")
-                    elif 'RDP_SCALE="140"' in content:
-                        self.ui.comboBox_scaling.setCurrentText("140%")
-                    elif 'RDP_SCALE="180"' in content:
-                        self.ui.comboBox_scaling.setCurrentText("180%")
-                    
-                    # Load and populate keyboard comboBox
-                    self.populate_keyboard_combo()
-                    
-                    # Set current keyboard selection
-                    kbd_match = re.search(r'RDP_KBD="([^"]*)"', content)
-                    if kbd_match and kbd_match.group(1):
-                        current_kbd = kbd_match.group(1)
-                        # Find the corresponding language option
-                        for i in range(self.ui.comboBox_keyboard.count()):
-                            item_data = self.ui.comboBox_keyboard.itemData(i)
-                            if item_data == current_kbd:
-                                self.ui.comboBox_keyboard.setCurrentIndex(i)
-                                break
+            config = self.config
+            if config.exists():
+                # Set autopause checkbox
+                self.ui.checkBox_suspend.setChecked(config.AUTOPAUSE)
+
+                # Set scaling combobox
+                if config.RDP_SCALE in (100, 140, 180):
+                    self.ui.comboBox_scaling.setCurrentText(f"{config.RDP_SCALE}%")
+
+                # Load and populate keyboard comboBox
+                self.populate_keyboard_combo()
+
+                # Set current keyboard selection
+                current_kbd = config.RDP_KBD.removeprefix('/kbd:layout:')
+                if current_kbd:
+                    position = languages.language_index().position(current_kbd)
+                    if position >= 0:
+                        self.ui.comboBox_keyboard.setCurrentIndex(position + 1)  # after "(no change)"
 
             # Load network state from file
             network_state = load_internet_state()
             self.ui.checkBox_network.setChecked(network_state)
 
             # Load registry_override.conf settings
-            registry_conf_path = USER_REGISTRY_CONFIG
             # Ensure the file exists (recreate if deleted)
             ensure_registry_config_exists()
-            
-            with open(registry_conf_path, 'r') as f:
-                content = f.read()
-                # Set date format
-                date_match = re.search(r'DATE_FORMAT="([^"]*)"', content)
-                if date_match and date_match.group(1):
-                    self.ui.comboBox_date.setCurrentText(date_match.group(1))
-                
-                # Set decimal separator
-                decimal_match = re.search(r'DECIMAL_SEPARATOR="([^"]*)"', content)
-                if decimal_match and decimal_match.group(1):
-                    self.ui.comboBox_decimalseparator.setCurrentText(decimal_match.group(1))
-                
-                # Set currency symbol
-                currency_match = re.search(r'CURRENCY_SYMBOL="([^"]*)"', content)
-                if currency_match and currency_match.group(1):
-                    self.ui.lineEdit_currency.setText(currency_match.group(1))
+            registry_config = self.registry_config
+
+            # Set date format
+            if registry_config.DATE_FORMAT:
+                self.ui.comboBox_date.setCurrentText(registry_config.DATE_FORMAT)
+
+            # Set decimal separator
+            if registry_config.DECIMAL_SEPARATOR:
+                self.ui.comboBox_decimalseparator.setCurrentText(registry_config.DECIMAL_SEPARATOR)
+
+            # Set currency symbol
+            if registry_config.CURRENCY_SYMBOL:
+                self.ui.lineEdit_currency.setText(registry_config.CURRENCY_SYMBOL)
         except Exception as e:
             print(f"Error loading settings: {e}")
 
     def populate_keyboard_combo(self):
-        """Populate the keyboard comboBox with language options from CSV"""
-        # Clear existing items except the first "(no change)" option
-        self.ui.comboBox_keyboard.clear()
-        self.ui.comboBox_keyboard.addItem("(no change)", "")
-        
-        # Load languages from CSV
-        languages = load_languages_from_csv()
-        for formatted_option, kbd_code in languages:
-            self.ui.comboBox_keyboard.addItem(formatted_option, kbd_code)
+        """Populate the keyboard comboBox with language options from CSV, filtered while typing"""
+        combo = self.ui.comboBox_keyboard
+        model = keyboard_model()
+        if combo.model() is model:
+            return
+        combo.setModel(model)
+        combo.setEditable(True)
+        combo.setInsertPolicy(QComboBox.NoInsert)
+        completer = QCompleter(model, combo)
+        completer.setFilterMode(Qt.MatchContains)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        completer.setCompletionMode(QCompleter.PopupCompletion)
+        combo.setCompleter(completer)
+        combo.setCurrentIndex(0)
+
+    def selected_keyboard(self):
+        """Keyboard code of the selected (or typed) language, "" for "(no change)" """
+        combo = self.ui.comboBox_keyboard
+        text = combo.currentText()
+        if text != combo.itemText(combo.currentIndex()):
+            # Text typed into the filter without picking an entry
+            language = languages.language_index().find(text)
+            return language.kbd if language else ""
+        return combo.currentData() or ""
 
     def run_setlang(self):
         """Run the set language command"""
-        subprocess.Popen([LINOFFICE_SCRIPT, 'manual', 'C:\\Program Files\\Microsoft Office\\root\\Office16\\SETLANG.EXE'])
+        launch_in_background('manual', 'C:\\Program Files\\Microsoft Office\\root\\Office16\\SETLANG.EXE')
 
     def save_settings(self):
         """Save all settings to config files"""
         try:
-            import re
-            registry_settings_changed = False
             # --- Network checkbox logic ---
             network_checked = self.ui.checkBox_network.isChecked()
             if self._initial_network_checked is not None and network_checked != self._initial_network_checked:
                 if network_checked:
-                    threading.Thread(target=lambda: subprocess.Popen([LINOFFICE_SCRIPT, 'internet_on'])).start()
+                    launch_in_background('internet_on')
                 else:
-                    threading.Thread(target=lambda: subprocess.Popen([LINOFFICE_SCRIPT, 'internet_off'])).start()
+                    launch_in_background('internet_off')
                 # Save the new state to file
                 save_internet_state(network_checked)
                 # Update the initial state for next time
                 self._initial_network_checked = network_checked
             # --- End network checkbox logic ---
             
-            # Save linoffice.conf settings
-            linoffice_conf_path = os.path.join(os.path.dirname(LINOFFICE_SCRIPT), 'config', 'linoffice.conf')
-            if os.path.exists(linoffice_conf_path):
-                with open(linoffice_conf_path, 'r') as f:
-                    content = f.read()
-                
-                # Update AUTOPAUSE setting
-                autopause_value = "on" if self.ui.checkBox_suspend.isChecked() else "off"
-                content = content.replace('AUTOPAUSE="on"', f'AUTOPAUSE="{autopause_value}"')
-                content = content.replace('AUTOPAUSE="off"', f'AUTOPAUSE="{autopause_value}"')
-                
+            # Save linoffice.conf settings (all changes in one atomic write)
+            config = self.config
+            if config.exists():
                 # Update RDP_SCALE setting
                 scaling_text = self.ui.comboBox_scaling.currentText()
                 if scaling_text.endswith('%'):
-                    scaling_value = scaling_text[:-1]  # Remove % character
-                else:
-                    scaling_value = scaling_text
-                
-                content = content.replace('RDP_SCALE="100"', f'RDP_SCALE="{scaling_value}"')
-                content = content.replace('RDP_SCALE="140"', f'RDP_SCALE="{scaling_value}"')
-                content = content.replace('RDP_SCALE="180"', f'RDP_SCALE="{scaling_value}"')
-                
+                    scaling_text = scaling_text[:-1]  # Remove % character
+
+                config.update(
+                    AUTOPAUSE=self.ui.checkBox_suspend.isChecked(),
+                    RDP_SCALE=int(scaling_text),
+                )
+
                 # Update RDP_KBD setting
-                keyboard_data = self.ui.comboBox_keyboard.currentData()
+                keyboard_data = self.selected_keyboard()
                 if keyboard_data:  # Only update if a keyboard is selected (not "(no change)")
-                    kbd_string = f'/kbd:layout:{keyboard_data}'
-                    if re.search(r'RDP_KBD="[^"]*"', content):
-                        content = re.sub(r'RDP_KBD="[^"]*"', f'RDP_KBD="{kbd_string}"', content)
-                    else:
-                        # If RDP_KBD is missing, add it (optional, but not required by your spec)
-                        content += f'\nRDP_KBD="{kbd_string}"\n'
-                
-                with open(linoffice_conf_path, 'w') as f:
-                    f.write(content)
+                    config.RDP_KBD = f'/kbd:layout:{keyboard_data}'
+
+                config.save()
 
             # Save registry_override.conf settings
-            registry_conf_path = USER_REGISTRY_CONFIG
             # Ensure the file exists before saving
             ensure_registry_config_exists()
-            
-            with open(registry_conf_path, 'r') as f:
-                original_content = f.read()
-            
-            content = original_content
-            
+            registry_config = self.registry_config
+
             # Update DATE_FORMAT
             date_value = self.ui.comboBox_date.currentText()
             if date_value != "(no change)":
-                content = re.sub(r'DATE_FORMAT="[^"]*"', f'DATE_FORMAT="{date_value}"', content)
-            
+                registry_config.DATE_FORMAT = date_value
+
             # Update DECIMAL_SEPARATOR
             decimal_value = self.ui.comboBox_decimalseparator.currentText()
             if decimal_value != "(no change)":
-                content = re.sub(r'DECIMAL_SEPARATOR="[^"]*"', f'DECIMAL_SEPARATOR="{decimal_value}"', content)
-            
+                registry_config.DECIMAL_SEPARATOR = decimal_value
+
             # Update CURRENCY_SYMBOL
-            currency_value = self.ui.lineEdit_currency.text()
-            content = re.sub(r'CURRENCY_SYMBOL="[^"]*"', f'CURRENCY_SYMBOL="{currency_value}"', content)
-            
-            # Check if registry settings actually changed
-            if content != original_content:
-                registry_settings_changed = True
-            
-            with open(registry_conf_path, 'w') as f:
-                f.write(content)
-            
+            registry_config.CURRENCY_SYMBOL = self.ui.lineEdit_currency.text()
+
+            # Only written (and applied) if the registry settings actually changed
+            registry_settings_changed = registry_config.save()
+
             # Run linoffice.sh registry_override if registry settings were changed
             if registry_settings_changed:
-                try:
-                    subprocess.Popen([LINOFFICE_SCRIPT, 'registry_override'])
-                except FileNotFoundError:
+                if os.access(LINOFFICE_SCRIPT, os.X_OK):
+                    launch_in_background('registry_override')
+                else:
                     QMessageBox.warning(self, 'Warning', 'LinOffice script not found or not executable')
             
             self.settings_changed = False
@@ -413,11 +566,7 @@ class ToolsWindow(QMainWindow):
         self.connect_tools_buttons()
 
     def load_ui(self, ui_file):
-        loader = QUiLoader()
-        file = QFile(ui_file)
-        file.open(QFile.ReadOnly)
-        self.ui = loader.load(file, self)
-        file.close()
+        self.ui = uicache.load_ui(os.path.join(GUI_DIR, ui_file), self)
 
     def show_warning_dialog_rdp(self, action):
         dialog = QMessageBox(self)
@@ -461,7 +610,7 @@ class ToolsWindow(QMainWindow):
 
     def run_self_updater(self):
         original_dir = os.getcwd()
-        parent_dir = os.path.abspath(os.path.join(original_dir, '..'))
+        parent_dir = os.path.dirname(LINOFFICE_SCRIPT)
         updater_script = os.path.join(parent_dir, 'updater.py')
 
         if not os.path.exists(updater_script):
@@ -478,6 +627,11 @@ class ToolsWindow(QMainWindow):
         self.text_edit.setReadOnly(True)
         layout.addWidget(self.text_edit)
 
+        # Download progress, fed by the 'PROGRESS <done> <total>' lines of updater.py
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
         self.button_box = QHBoxLayout()
         self.yes_button = QPushButton("Yes")
         self.no_button = QPushButton("No")
@@ -494,6 +648,7 @@ class ToolsWindow(QMainWindow):
 
         # Initialize state
         self.waiting_for_input = False
+        self._stdout_buffer = ''
         
         # Create QProcess
         self.process = QProcess(self)
@@ -542,10 +697,18 @@ class ToolsWindow(QMainWindow):
         if data:
             text = bytes(data).decode('utf-8', errors='replace')
             
-            # Split into lines and process each
-            lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+            # Split into lines and process each, keeping an unfinished last line for the next read
+            lines = (self._stdout_buffer + text).replace('\r\n', '\n').replace('\r', '\n').split('\n')
+            self._stdout_buffer = lines.pop()
+            if self._stdout_buffer.lower().rstrip().endswith(("(y/n):", "update?")):
+                # Prompts have no newline until the user answers
+                lines.append(self._stdout_buffer)
+                self._stdout_buffer = ''
             
             for line in lines:
+                if line.startswith("PROGRESS "):
+                    self._update_progress(line)
+                    continue
                 if line.strip():  # Only process non-empty lines
                     self.text_edit.append(line)
                     
@@ -559,6 +722,21 @@ class ToolsWindow(QMainWindow):
             # Auto-scroll to bottom
             self._scroll_to_bottom()
 
+    def _update_progress(self, line):
+        try:
+            done, total = (int(value) for value in line.split()[1:3])
+        except ValueError:
+            return
+        self.progress_bar.setVisible(True)
+        if total > 0:
+            self.progress_bar.setRange(0, 1000)
+            self.progress_bar.setValue(int(done * 1000 / total))
+            self.progress_bar.setFormat(f"%p% ({done / 1048576:.1f} of {total / 1048576:.1f} MB)")
+        else:
+            # Size unknown (e.g. generated archive): show a busy bar with the amount so far
+            self.progress_bar.setRange(0, 0)
+            self.progress_bar.setFormat(f"{done / 1048576:.1f} MB")
+
     def _handle_stderr(self):
         """Handle stderr output from process"""
         if not self.process:
@@ -573,6 +751,9 @@ class ToolsWindow(QMainWindow):
 
     def _handle_finished(self, exit_code, exit_status):
         """Handle process completion"""
+        if self._stdout_buffer.strip():
+            self.text_edit.append(self._stdout_buffer)
+            self._stdout_buffer = ''
         self.text_edit.append(f"\nUpdater finished")
         self.yes_button.setVisible(False)
         self.no_button.setVisible(False)
@@ -661,6 +842,11 @@ class TroubleshootingWindow(QMainWindow):
         super(TroubleshootingWindow, self).__init__(parent)
         self.load_ui('troubleshooting.ui')
         self.setWindowTitle(self.ui.windowTitle())
+        self.config = config_store.LinOfficeConfig()  # pending toggles belong to this window only
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(500)
+        self._save_timer.timeout.connect(self._save_conf)
         self.connect_troubleshooting_buttons()
         # Initialize checkboxes based on current config
         self._tr_init = True
@@ -670,16 +856,13 @@ class TroubleshootingWindow(QMainWindow):
             self._tr_init = False
 
     def load_ui(self, ui_file):
-        loader = QUiLoader()
-        file = QFile(ui_file)
-        file.open(QFile.ReadOnly)
-        self.ui = loader.load(file, self)
-        file.close()
+        self.ui = uicache.load_ui(os.path.join(GUI_DIR, ui_file), self)
 
     # Connect buttons in troubleshooting window with LinOffice script
     def connect_troubleshooting_buttons(self):
         self.ui.pushButton_lockfiles.clicked.connect(self.run_cleanup_full)
         self.ui.pushButton_desktopfiles.clicked.connect(self.run_setup_desktop)
+        self.ui.pushButton_redetect_freerdp.clicked.connect(self.run_redetect_freerdp)
         self.ui.pushButton_reset.clicked.connect(self.run_reset)
         self.ui.pushButton_stopcontainer.clicked.connect(self.run_stopcontainer)
         self.ui.pushButton_logfile.clicked.connect(self.open_logfile)
@@ -690,78 +873,50 @@ class TroubleshootingWindow(QMainWindow):
         self.ui.checkBox_multimon.toggled.connect(self._on_multimon_toggled)
         self.ui.checkBox_hidef.toggled.connect(self._on_hidef_toggled)
 
-    def _conf_path(self):
-        # Reuse same resolution as in SettingsWindow
-        return os.path.join(os.path.dirname(LINOFFICE_SCRIPT), 'config', 'linoffice.conf')
-
-    def _read_conf(self):
-        path = self._conf_path()
-        if not os.path.exists(path):
-            return ''
-        with open(path, 'r') as f:
-            return f.read()
-
-    def _write_conf(self, content):
-        path = self._conf_path()
-        with open(path, 'w') as f:
-            f.write(content)
-
     def _load_troubleshooting_state(self):
-        content = self._read_conf()
-        # Multiple Monitors: check if "/multimon" present anywhere
-        self.ui.checkBox_multimon.setChecked('/multimon' in content)
+        config = self.config
+        # Multiple Monitors: check if "/multimon" is one of the FreeRDP flags
+        self.ui.checkBox_multimon.setChecked('/multimon' in config.RDP_FLAGS)
         # HiDef: check HIDEF value; if missing, uncheck
-        hidef_match = re.search(r'^HIDEF="(on|off)"', content, re.MULTILINE)
-        if hidef_match:
-            self.ui.checkBox_hidef.setChecked(hidef_match.group(1) == 'on')
-        else:
-            self.ui.checkBox_hidef.setChecked(False)
+        self.ui.checkBox_hidef.setChecked(config.get('HIDEF') is not None and config.HIDEF)
 
     def _on_multimon_toggled(self, checked):
         if getattr(self, '_tr_init', False):
             return
-        content = self._read_conf()
-        if not content:
+        config = self.config
+        if not config.exists():
             return
-        # Ensure there is an RDP_FLAGS line to modify
-        def add_multimon_to_flags(match):
-            inner = match.group(1)
-            if ' /multimon' not in inner and '/multimon' not in inner:
-                inner = inner + ' /multimon'
-            return f'RDP_FLAGS="{inner}"'
-
-        def remove_multimon_from_flags(match):
-            inner = match.group(1)
-            inner = inner.replace(' /multimon', '')
-            inner = inner.replace('/multimon', '')
-            return f'RDP_FLAGS="{inner}"'
-
-        pattern = r'^RDP_FLAGS="([^"]*)"'
+        flags = [flag for flag in config.RDP_FLAGS if flag != '/multimon']
         if checked:
-            new_content = re.sub(pattern, add_multimon_to_flags, content, count=1, flags=re.MULTILINE)
-        else:
-            new_content = re.sub(pattern, remove_multimon_from_flags, content, count=1, flags=re.MULTILINE)
-        if new_content != content:
-            self._write_conf(new_content)
+            flags.append('/multimon')
+        config.RDP_FLAGS = flags
+        self._save_conf_soon()
 
     def _on_hidef_toggled(self, checked):
         if getattr(self, '_tr_init', False):
             return
-        content = self._read_conf()
-        if content == '':
+        config = self.config
+        if not config.exists():
             return
-        hidef_re = r'^HIDEF="(on|off)"'
-        if re.search(hidef_re, content, flags=re.MULTILINE):
-            new_value = 'on' if checked else 'off'
-            new_content = re.sub(hidef_re, f'HIDEF="{new_value}"', content, flags=re.MULTILINE)
-            if new_content != content:
-                self._write_conf(new_content)
-        else:
-            # Only add when enabling (checked). If disabling and missing, leave as-is.
-            if checked:
-                # Append at end on a new line
-                suffix = '' if content.endswith('\n') else '\n'
-                self._write_conf(content + suffix + 'HIDEF="on"\n')
+        # Only add when enabling (checked). If disabling and missing, leave as-is.
+        if checked or config.get('HIDEF') is not None:
+            config.HIDEF = checked
+            self._save_conf_soon()
+
+    def _save_conf_soon(self):
+        # Toggling several options in a row ends up in a single write of linoffice.conf
+        self._save_timer.start()
+
+    def _save_conf(self):
+        self._save_timer.stop()
+        try:
+            self.config.save()
+        except OSError as e:
+            QMessageBox.critical(self, 'Error', f'Failed to save settings: {e}')
+
+    def closeEvent(self, event):
+        self._save_conf()
+        event.accept()
 
     def run_cleanup_full(self):
         # Start the subprocess and capture the output
@@ -792,6 +947,54 @@ class TroubleshootingWindow(QMainWindow):
         clean_output_line = strip_ansi_codes(last_output_line)
         QMessageBox.information(self.ui, "Recreate app launchers", clean_output_line, QMessageBox.Ok)
 
+    def run_redetect_freerdp(self):
+        # The detection (e.g. 'flatpak list') takes seconds, so nothing here waits for it
+        button = self.ui.pushButton_redetect_freerdp
+        self._redetect_label = button.text()
+        button.setEnabled(False)
+        button.setText("Detecting FreeRDP...")
+        # Go through the launcher daemon if it is running so that its copy is refreshed as well
+        self._redetect_request = DaemonRequest({'cmd': 'reload', 'redetect': True}, timeout=120)
+        self._redetect_request.signals.reply.connect(self._on_redetect_reply)
+        self._redetect_request.signals.failed.connect(self._redetect_with_script)
+        self._redetect_request.start()
+
+    def _on_redetect_reply(self, reply):
+        self._redetect_finished(reply.get('freerdp_command'))
+
+    def _redetect_with_script(self):
+        self._redetect_process = QProcess(self)
+        self._redetect_process.finished.connect(self._on_redetect_script_finished)
+        self._redetect_process.errorOccurred.connect(self._on_redetect_script_error)
+        self._redetect_process.start(LINOFFICE_SCRIPT, ['--redetect-freerdp'])
+
+    def _on_redetect_script_finished(self, exit_code, exit_status):
+        output_lines = bytes(self._redetect_process.readAllStandardOutput()).decode(errors='replace').strip().splitlines()
+        ok = exit_status == QProcess.NormalExit and exit_code == 0 and output_lines
+        self._redetect_finished(output_lines[-1].strip() if ok else None)
+
+    def _on_redetect_script_error(self, error):
+        if error == QProcess.FailedToStart:
+            self._redetect_finished(None)
+
+    def _redetect_finished(self, command):
+        button = self.ui.pushButton_redetect_freerdp
+        button.setEnabled(True)
+        button.setText(self._redetect_label)
+        if not command:
+            QMessageBox.warning(self.ui, "Re-detect FreeRDP", "FreeRDP version 3 could not be found.", QMessageBox.Ok)
+            return
+        version = ''
+        try:
+            with open(FREERDP_CACHE_FILE, 'r') as f:
+                cache_lines = f.read().splitlines()
+            if len(cache_lines) >= 3 and cache_lines[1] == command:
+                version = cache_lines[2]
+        except OSError:
+            pass
+        message = f"Using FreeRDP command '{command}'" + (f" (version {version})." if version else ".")
+        QMessageBox.information(self.ui, "Re-detect FreeRDP", message, QMessageBox.Ok)
+
     def run_reset(self):
         subprocess.Popen([LINOFFICE_SCRIPT, 'reset'])
 
@@ -799,9 +1002,9 @@ class TroubleshootingWindow(QMainWindow):
         subprocess.Popen([LINOFFICE_SCRIPT, '--stopcontainer'])
 
     def open_logfile(self):
-        logfile = os.path.expanduser('~/.local/share/linoffice/linoffice.log')
-        # Try to open with xdg-open (Linux default)
-        subprocess.Popen(['xdg-open', logfile])
+        # Reads only the end of the log, however large it has grown
+        self.log_window = LogViewerWindow(self)
+        self.log_window.show()
 
     def open_website(self):
         import webbrowser
@@ -0,0 +1,163 @@
+# This Python file uses the following encoding: utf-8
+"""Load Qt Designer forms from Python modules compiled with pyside6-uic.
+
+load_ui(path, parent) returns the same widget QUiLoader would (with the child widgets as
+attributes), but builds it from a module compiled from the .ui file and cached in UI_CACHE_DIR,
+so opening a window is an import instead of an XML parse. A compiled module is used only while
+it matches the .ui file (path, mtime and size) and the installed PySide6 version. Otherwise the form
+is loaded with QUiLoader and compiled in the background for the next time.
+
+Run this file to compile all forms ahead of time (setup.sh does this after installing):
+    python3 gui/uicache.py
+"""
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import xml.etree.ElementTree as ET
+
+import PySide6
+from PySide6 import QtWidgets
+
+GUI_DIR = os.path.dirname(os.path.abspath(__file__))
+UI_CACHE_DIR = os.path.expanduser('~/.cache/linoffice/ui')
+HEADER_PREFIX = '# linoffice-ui-cache:'
+
+_compiling = set()
+_compiling_lock = threading.Lock()
+
+def _stamp(ui_path):
+    st = os.stat(ui_path)
+    return f"{st.st_mtime_ns} {st.st_size} {PySide6.__version__} {os.path.abspath(ui_path)}"
+
+def _cache_path(ui_path):
+    # Include the directory in the name, the installer forms are separate from the main ones
+    relative = os.path.relpath(os.path.abspath(ui_path), GUI_DIR)
+    name = relative.replace(os.sep, '_').replace('.', '_')
+    return os.path.join(UI_CACHE_DIR, f"ui_{name}.py")
+
+def _uic_command():
+    uic = shutil.which('pyside6-uic')
+    if uic:
+        return [uic]
+    # Some distributions only ship the uic binary inside the PySide6 package
+    bundled = os.path.join(os.path.dirname(PySide6.__file__), 'Qt', 'libexec', 'uic')
+    if os.access(bundled, os.X_OK):
+        return [bundled, '-g', 'python']
+    return None
+
+def compile_ui(ui_path):
+    """Compile a .ui file into the cache. Returns True on success."""
+    command = _uic_command()
+    if not command:
+        return False
+    cache_path = _cache_path(ui_path)
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        stamp = _stamp(ui_path)
+        root_class = ET.parse(ui_path).getroot().find('widget').get('class')
+        os.makedirs(UI_CACHE_DIR, exist_ok=True)
+        result = subprocess.run(command + [ui_path, '-o', tmp_path], capture_output=True, timeout=60)
+        if result.returncode != 0:
+            return False
+        with open(tmp_path, 'r', encoding='utf-8') as f:
+            code = f.read()
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(f"{HEADER_PREFIX} {stamp}\n")
+            f.write(code)
+            f.write(f"\nUI_ROOT_CLASS = {root_class!r}\n")
+        os.replace(tmp_path, cache_path)
+        return True
+    except (OSError, ET.ParseError, AttributeError, subprocess.TimeoutExpired):
+        return False
+    finally:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+def _compile_in_background(ui_path):
+    with _compiling_lock:
+        if ui_path in _compiling:
+            return
+        _compiling.add(ui_path)
+
+    def run():
+        try:
+            compile_ui(ui_path)
+        finally:
+            with _compiling_lock:
+                _compiling.discard(ui_path)
+
+    threading.Thread(target=run, daemon=True).start()
+
+def _load_compiled(ui_path):
+    """The compiled module for ui_path, or None if there is no up-to-date one."""
+    cache_path = _cache_path(ui_path)
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            header = f.readline().rstrip('\n')
+        if header != f"{HEADER_PREFIX} {_stamp(ui_path)}":
+            return None
+    except OSError:
+        return None
+    module_name = 'linoffice_' + os.path.splitext(os.path.basename(cache_path))[0]
+    module = sys.modules.get(module_name)
+    if module is not None and getattr(module, '__linoffice_header__', None) == header:
+        return module
+    try:
+        spec = importlib.util.spec_from_file_location(module_name, cache_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except Exception as e:
+        print(f"Could not load compiled form {cache_path}: {e}")
+        return None
+    module.__linoffice_header__ = header
+    sys.modules[module_name] = module
+    return module
+
+def _ui_class(module):
+    for name, value in vars(module).items():
+        if name.startswith('Ui_') and isinstance(value, type):
+            return value
+    return None
+
+def load_ui(ui_path, parent=None):
+    """Build the form in ui_path, like QUiLoader().load(ui_path, parent)."""
+    module = _load_compiled(ui_path)
+    ui_class = _ui_class(module) if module else None
+    root_class = getattr(QtWidgets, getattr(module, 'UI_ROOT_CLASS', ''), None)
+    if ui_class and root_class:
+        widget = root_class(parent)
+        form = ui_class()
+        form.setupUi(widget)
+        # Same access as with QUiLoader: child widgets are attributes of the form's widget
+        for name, value in vars(form).items():
+            if not hasattr(widget, name):
+                setattr(widget, name, value)
+        return widget
+
+    _compile_in_background(ui_path)
+    # QtUiTools is only imported when it is needed
+    from PySide6.QtCore import QFile
+    from PySide6.QtUiTools import QUiLoader
+    loader = QUiLoader()
+    file = QFile(ui_path)
+    file.open(QFile.ReadOnly)
+    widget = loader.load(file, parent)
+    file.close()
+    return widget
+
+def main():
+    ui_files = []
+    for directory, _, files in os.walk(GUI_DIR):
+        ui_files += [os.path.join(directory, name) for name in sorted(files) if name.endswith('.ui')]
+    failed = [ui_path for ui_path in ui_files if not compile_ui(ui_path)]
+    for ui_path in failed:
+        print(f"Could not compile {ui_path}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+# This Python file uses the following encoding: utf-8
+"""Paths and small helpers shared by the LinOffice background services."""
+import atexit
+import fcntl
+import gzip
+import os
+import shutil
+import threading
+import time
+
+SCRIPT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+LINOFFICE_SCRIPT = os.path.join(SCRIPT_DIR, 'linoffice.sh')
+CONFIG_PATH = os.path.join(SCRIPT_DIR, 'config', 'linoffice.conf')
+COMPOSE_PATH = os.path.join(SCRIPT_DIR, 'config', 'compose.yaml')
+
+APPDATA_PATH = os.path.expanduser('~/.local/share/linoffice')  # make sure this is the same as in the setup.sh
+LOG_PATH = os.path.join(APPDATA_PATH, 'linoffice.log')
+
+# Keep the socket in the per-user runtime directory if there is one, it is cleaned up on logout
+RUNTIME_DIR = os.path.join(os.environ['XDG_RUNTIME_DIR'], 'linoffice') if os.environ.get('XDG_RUNTIME_DIR') else APPDATA_PATH
+SOCKET_PATH = os.path.join(RUNTIME_DIR, 'linofficed.sock')
+PID_PATH = os.path.join(RUNTIME_DIR, 'linofficed.pid')
+
+# Variables of the caller's session that launches through the daemon carry over: where to show FreeRDP, and in which language
+SESSION_ENV_KEYS = ('DISPLAY', 'WAYLAND_DISPLAY', 'XAUTHORITY', 'XDG_RUNTIME_DIR', 'LANG')
+
+CONTAINER_NAME = 'LinOffice'
+RDP_IP = '127.0.0.1'
+RDP_PORT = 3388
+
+# Log levels, as for LOG_LEVEL in linoffice.conf (keep in sync with LOG_LEVELS in linoffice.sh)
+LOG_LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARN': 30, 'ERROR': 40}
+LOG_MAX_SIZE = 2 * 1024 * 1024  # linoffice.log is rotated once it is larger
+LOG_KEEP = 3  # compressed old logs: linoffice.log.1.gz ... linoffice.log.3.gz
+LOG_ROTATE_LOCK = os.path.join(APPDATA_PATH, 'linoffice.log.lock')
+LOG_BATCH = 32  # records buffered before they are written
+LOG_FLUSH_INTERVAL = 1.0  # seconds a record may wait in the buffer
+
+def session_env(environ):
+    """The SESSION_ENV_KEYS and LC_* variables of environ."""
+    return {key: value for key, value in environ.items() if key in SESSION_ENV_KEYS or key.startswith('LC_')}
+
+def rotate_log(path=LOG_PATH):
+    """Move a log that grew past LOG_MAX_SIZE to path.1 and compress it in the background.
+
+    Uses the same lock and names as waLogRotate in linoffice.sh, so whoever gets there first rotates.
+    """
+    try:
+        lock_fd = os.open(LOG_ROTATE_LOCK, os.O_WRONLY | os.O_CREAT, 0o644)
+    except OSError:
+        return
+    try:
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return
+        try:
+            if os.stat(path).st_size <= LOG_MAX_SIZE:
+                return  # rotated by someone else in the meantime
+            for n in range(LOG_KEEP - 1, 0, -1):
+                if os.path.exists(f"{path}.{n}.gz"):
+                    os.replace(f"{path}.{n}.gz", f"{path}.{n + 1}.gz")
+            os.replace(path, f"{path}.1")
+        except OSError:
+            return
+    finally:
+        os.close(lock_fd)
+    threading.Thread(target=_compress, args=(f"{path}.1",), daemon=True).start()
+
+def _compress(path):
+    try:
+        with open(path, 'rb') as source, gzip.open(f"{path}.gz.tmp", 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.replace(f"{path}.gz.tmp", f"{path}.gz")
+        os.remove(path)
+    except OSError:
+        pass
+
+class LogWriter:
+    """Buffered appends to linoffice.log.
+
+    Records are collected and written with one write() per batch: when LOG_BATCH records are
+    waiting, LOG_FLUSH_INTERVAL seconds after the first one, for warnings and errors right away, and
+    at exit. The file stays open; it is reopened after it was rotated (by us or by linoffice.sh).
+    """
+
+    def __init__(self, path=LOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._fd = None
+        self._timer = None
+        atexit.register(self.flush)
+
+    def write(self, line, urgent=False):
+        with self._lock:
+            self._buffer.append(line)
+            if urgent or len(self._buffer) >= LOG_BATCH:
+                self._flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(LOG_FLUSH_INTERVAL, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _open(self):
+        if self._fd is not None:
+            try:
+                st = os.fstat(self._fd)
+                current = os.stat(self.path)
+                if st.st_ino == current.st_ino and st.st_size <= LOG_MAX_SIZE:
+                    return self._fd
+            except OSError:
+                pass
+            os.close(self._fd)
+            self._fd = None
+        try:
+            if os.stat(self.path).st_size > LOG_MAX_SIZE:
+                rotate_log(self.path)
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer:
+            return
+        data = ''.join(self._buffer).encode('utf-8', errors='replace')
+        self._buffer.clear()
+        try:
+            os.write(self._open(), data)
+        except OSError:
+            pass
+
+_log_writer = LogWriter()
+_log_threshold = LOG_LEVELS['INFO']
+
+def set_log_level(name):
+    """Only log records of this level (DEBUG, INFO, WARN or ERROR) and above."""
+    global _log_threshold
+    _log_threshold = LOG_LEVELS.get(str(name).upper(), LOG_LEVELS['INFO'])
+
+def dprint(message, runid='daemon', debug=True, level='DEBUG'):
+    """Log a line to linoffice.log in the same format as 'waLog' in linoffice.sh."""
+    if not debug or LOG_LEVELS.get(level, LOG_LEVELS['DEBUG']) < _log_threshold:
+        return
+    _log_writer.write(f"[{time.strftime('%a %b %d %H:%M:%S %Z %Y')}-{runid}] {level}: {message}\n",
+                      urgent=LOG_LEVELS.get(level, 0) >= LOG_LEVELS['WARN'])
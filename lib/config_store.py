@@ -0,0 +1,234 @@
+# This Python file uses the following encoding: utf-8
+"""Typed access to linoffice.conf and registry_override.conf.
+
+Both files are shell assignments (KEY="value") with comments in between. A ConfigFile parses
+its file once and keeps the values until the file's mtime or size changes. Settings are
+declared as typed class attributes, so callers read and assign Python values:
+
+    config = LinOfficeConfig()
+    if '/multimon' not in config.RDP_FLAGS:
+        config.RDP_FLAGS = config.RDP_FLAGS + ['/multimon']
+    config.HIDEF = False
+    config.save()
+
+Assignments are only collected until save(), which applies all of them in one atomic replace
+of the file, keeping comments and the order of the lines. They belong to the instance, so every
+window that edits a file uses its own.
+"""
+import os
+import re
+import threading
+
+from common import APPDATA_PATH, CONFIG_PATH
+
+REGISTRY_CONFIG_PATH = os.path.join(APPDATA_PATH, 'registry_override.conf')
+
+def _unquote(value):
+    """Undo shell quoting for a simple KEY=value assignment."""
+    value = value.strip()
+    if value.startswith("'"):
+        end = value.find("'", 1)
+        return value[1:end] if end != -1 else value[1:]
+    if value.startswith('"'):
+        result = []
+        i = 1
+        while i < len(value):
+            char = value[i]
+            if char == '\\' and i + 1 < len(value) and value[i + 1] in '$`"\\':
+                result.append(value[i + 1])
+                i += 2
+                continue
+            if char == '"':
+                break
+            result.append(char)
+            i += 1
+        return ''.join(result)
+    # Unquoted: strip trailing comments
+    return value.split('#', 1)[0].strip()
+
+def _quote(value):
+    """Double-quote a value for a shell assignment."""
+    return '"' + re.sub(r'([$`"\\])', r'\\\1', value) + '"'
+
+def parse_assignments(text):
+    values = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#') or '=' not in line:
+            continue
+        key, _, value = line.partition('=')
+        key = key.strip()
+        if key.isidentifier():
+            values[key] = _unquote(value)
+    return values
+
+def load_assignments(path):
+    """Read KEY=value lines (as used by linoffice.conf and apps/*/info.txt) into a dict."""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return parse_assignments(f.read())
+
+# Conversions between the text in the file and the typed value: (parse, format)
+KINDS = {
+    'str': (str, str),
+    'int': (int, str),
+    'switch': (lambda text: text == 'on', lambda value: 'on' if value else 'off'),
+    'bool': (lambda text: text == 'true', lambda value: 'true' if value else 'false'),
+    'flags': (str.split, ' '.join),
+}
+
+class Setting:
+    """A typed setting of a ConfigFile; reading returns the default if it is missing or invalid."""
+
+    def __init__(self, kind, default):
+        self.kind = kind
+        self.default = default
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def parse(self, text):
+        if text is None:
+            return self.default
+        try:
+            return KINDS[self.kind][0](text)
+        except ValueError:
+            return self.default
+
+    def format(self, value):
+        return KINDS[self.kind][1](value)
+
+    def __get__(self, config, owner):
+        if config is None:
+            return self
+        return self.parse(config.get(self.name))
+
+    def __set__(self, config, value):
+        config.set(self.name, self.format(value))
+
+class ConfigFile:
+    """A KEY="value" file, parsed once per change on disk; writes are batched until save()."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self._stamp = None
+        self._values = {}
+        self._pending = {}
+
+    @classmethod
+    def settings(cls):
+        return {name: value for klass in reversed(cls.__mro__)
+                for name, value in vars(klass).items() if isinstance(value, Setting)}
+
+    def _load(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self._stamp, self._values = None, {}
+            return
+        stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if stamp != self._stamp:
+            try:
+                self._values = load_assignments(self.path)
+            except OSError:
+                self._values = {}
+            self._stamp = stamp
+
+    def get(self, key):
+        """The text of a setting (including unsaved changes), or None if it is not set."""
+        with self.lock:
+            if key in self._pending:
+                return self._pending[key]
+            self._load()
+            return self._values.get(key)
+
+    def set(self, key, text):
+        with self.lock:
+            self._pending[key] = text
+
+    def update(self, **values):
+        """Assign several typed settings at once."""
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def discard(self):
+        with self.lock:
+            self._pending.clear()
+
+    def save(self):
+        """Write all pending changes with one atomic replace. Returns True if the file changed."""
+        with self.lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return False
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            except FileNotFoundError:
+                content = ''
+            new_content = content
+            for key, text in pending.items():
+                pattern = re.compile(rf'^([ \t]*{re.escape(key)}=)("(?:[^"\\\n]|\\.)*"|\'[^\'\n]*\'|[^\s#]*)', re.MULTILINE)
+                replacement = _quote(text)
+                new_content, count = pattern.subn(lambda m: m.group(1) + replacement, new_content, count=1)
+                if not count:
+                    if new_content and not new_content.endswith('\n'):
+                        new_content += '\n'
+                    new_content += f'{key}={replacement}\n'
+            if new_content == content:
+                return False
+            self._replace(new_content)
+            self._stamp = None
+            self._load()
+            return True
+
+    def _replace(self, content):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            mode = os.stat(self.path).st_mode & 0o7777
+        except OSError:
+            mode = 0o644
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+class LinOfficeConfig(ConfigFile):
+    RDP_SCALE = Setting('int', 100)
+    REMOVABLE_MEDIA = Setting('str', '/run/media')
+    DEBUG = Setting('bool', True)
+    LOG_LEVEL = Setting('str', 'INFO')
+    AUTOPAUSE = Setting('switch', True)
+    AUTOPAUSE_TIME = Setting('int', 300)
+    FREERDP_COMMAND = Setting('str', '')
+    RDP_KBD = Setting('str', '')
+    CLEANUP_TIME_WINDOW = Setting('str', '86400')
+    RDP_FLAGS = Setting('flags', [])
+    HIDEF = Setting('switch', True)
+    PREWARM = Setting('switch', True)
+    PREWARM_TIME = Setting('int', 120)
+
+    def __init__(self, path=CONFIG_PATH):
+        super().__init__(path)
+
+class RegistryOverrideConfig(ConfigFile):
+    DATE_FORMAT = Setting('str', '')
+    DECIMAL_SEPARATOR = Setting('str', '')
+    CURRENCY_SYMBOL = Setting('str', '')
+
+    def __init__(self, path=REGISTRY_CONFIG_PATH):
+        super().__init__(path)
@@ -0,0 +1,119 @@
+# This Python file uses the following encoding: utf-8
+"""Index of the keyboard layouts and languages in config/languages.csv.
+
+The CSV is parsed once per process and the result is also kept in INDEX_CACHE_PATH together
+with the CSV's mtime and size, so later processes load the parsed list instead of parsing the
+CSV again. Lookups by keyboard code, locale and display name are dictionary lookups.
+"""
+import csv
+import json
+import os
+from collections import namedtuple
+
+from common import SCRIPT_DIR
+
+LANGUAGES_CSV = os.path.join(SCRIPT_DIR, 'config', 'languages.csv')
+INDEX_CACHE_PATH = os.path.expanduser('~/.cache/linoffice/languages.json')
+INDEX_VERSION = 1
+
+# label is the text shown in the GUI, e.g. "af_ZA [Afrikaans (South Africa)]"
+Language = namedtuple('Language', 'kbd locale name label')
+
+def _language(kbd_code, lang_code, lang_name):
+    return Language(kbd_code, lang_code, lang_name, f"{lang_code} [{lang_name}]")
+
+class LanguageIndex:
+    def __init__(self, languages, stamp=None):
+        self.languages = list(languages)
+        self.stamp = stamp
+        self.by_kbd = {}
+        self.by_locale = {}
+        self.by_name = {}
+        self.positions = {}
+        for position, language in enumerate(self.languages):
+            # The first entry wins where several languages share a keyboard layout
+            self.by_kbd.setdefault(language.kbd.lower(), language)
+            self.by_locale.setdefault(language.locale.lower(), language)
+            self.by_name.setdefault(language.name.lower(), language)
+            self.by_name.setdefault(language.label.lower(), language)
+            self.positions.setdefault(language.kbd.lower(), position)
+
+    def __len__(self):
+        return len(self.languages)
+
+    def __iter__(self):
+        return iter(self.languages)
+
+    def position(self, kbd_code):
+        """Position of the first language with this keyboard code, or -1."""
+        return self.positions.get(kbd_code.lower(), -1)
+
+    def find(self, text):
+        """Look a language up by keyboard code, locale, name or label (case insensitive)."""
+        key = text.strip().lower()
+        return self.by_kbd.get(key) or self.by_locale.get(key) or self.by_name.get(key)
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def _parse_csv(path):
+    languages = []
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # Skip header row
+        for row in reader:
+            if len(row) >= 3:
+                languages.append(_language(row[0], row[1], row[2]))
+    return languages
+
+def _load_cache(stamp):
+    try:
+        with open(INDEX_CACHE_PATH, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cache.get('version') != INDEX_VERSION or cache.get('csv') != LANGUAGES_CSV or cache.get('stamp') != stamp:
+        return None
+    try:
+        return [_language(*entry) for entry in cache['languages']]
+    except (KeyError, TypeError):
+        return None
+
+def _save_cache(stamp, languages):
+    tmp_path = f"{INDEX_CACHE_PATH}.{os.getpid()}"
+    try:
+        os.makedirs(os.path.dirname(INDEX_CACHE_PATH), exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': INDEX_VERSION,
+                'csv': LANGUAGES_CSV,
+                'stamp': stamp,
+                'languages': [[lang.kbd, lang.locale, lang.name] for lang in languages],
+            }, f)
+        os.replace(tmp_path, INDEX_CACHE_PATH)
+    except OSError:
+        pass
+
+_index = None
+
+def language_index():
+    """The process-wide index, rebuilt only when the CSV has changed."""
+    global _index
+    stamp = _stamp(LANGUAGES_CSV)
+    if _index is not None and _index.stamp == stamp:
+        return _index
+    languages = _load_cache(stamp) if stamp else None
+    if languages is None:
+        try:
+            languages = _parse_csv(LANGUAGES_CSV)
+        except (OSError, csv.Error) as e:
+            print(f"Error loading languages from CSV: {e}")
+            languages = []
+        else:
+            _save_cache(stamp, languages)
+    _index = LanguageIndex(languages, stamp)
+    return _index
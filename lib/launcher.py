@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# This Python file uses the following encoding: utf-8
+"""Thin client for the LinOffice launcher daemon (linofficed.py).
+
+Used by the GUI and the .desktop files instead of calling linoffice.sh directly. If the
+daemon is not running, it is started in the background and this launch falls back to
+linoffice.sh, so nothing is lost when the daemon is unavailable.
+
+Usage: launcher.py [linoffice.sh arguments]
+       launcher.py --adopt PID COMMAND OFFICE_APP [RUNID]   (used by linoffice.sh, see waAdoptSession)
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+
+from common import LINOFFICE_SCRIPT, SOCKET_PATH, session_env
+
+DAEMON_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'linofficed.py')
+# The daemon answers a launch once FreeRDP was started (files are collected for a moment first, and a paused
+# container is resumed), and falling back to linoffice.sh after a timeout would open everything twice
+LAUNCH_TIMEOUT = 30.0
+# Adopting a session only registers it (the registry lock is held for short writes only). If the reply came too
+# late, linoffice.sh would keep supervising the session as well, so leave plenty of room
+ADOPT_TIMEOUT = 10.0
+
+def request(payload, timeout=5.0):
+    """Send one request to the daemon and return its reply. Raises OSError if it is not reachable."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(SOCKET_PATH)
+        sock.sendall(json.dumps(payload).encode() + b'\n')
+        reply = b''
+        while not reply.endswith(b'\n'):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            reply += chunk
+    if not reply:
+        raise ConnectionError("Empty reply from linofficed")
+    return json.loads(reply)
+
+def daemon_running():
+    try:
+        return request({'cmd': 'ping'}, timeout=1.0).get('ok', False)
+    except (OSError, ValueError):
+        return False
+
+def start_daemon():
+    """Start linofficed.py detached from the caller."""
+    try:
+        subprocess.Popen(
+            [sys.executable, DAEMON_SCRIPT],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError as e:
+        print(f"Could not start linofficed: {e}", file=sys.stderr)
+
+def launch_request(args):
+    """The 'launch' request for linoffice.sh arguments. Only the variables FreeRDP needs from this session are passed on."""
+    return {
+        'cmd': 'launch',
+        'argv': list(args),
+        'env': session_env(os.environ),
+        'cwd': os.getcwd(),
+    }
+
+def launch(args, wait=False):
+    """Launch linoffice.sh arguments through the daemon, falling back to linoffice.sh.
+
+    Returns the daemon reply, or the Popen object of the fallback process.
+    """
+    try:
+        reply = request(launch_request(args), timeout=LAUNCH_TIMEOUT)
+        if reply.get('ok'):
+            return reply
+        print(f"linofficed: {reply.get('error', 'unknown error')}", file=sys.stderr)
+    except (OSError, ValueError):
+        # Not running (or stale socket): start it for next time and use the script for now
+        start_daemon()
+    process = subprocess.Popen([LINOFFICE_SCRIPT, *args])
+    if wait:
+        process.wait()
+    return process
+
+def adopt(pid, command, office, runid=None):
+    """Hand a FreeRDP process started by linoffice.sh to the daemon. Returns False if it is not running."""
+    try:
+        return request({'cmd': 'adopt', 'pid': int(pid), 'command': command, 'office': office, 'run': runid},
+                       timeout=ADOPT_TIMEOUT).get('ok', False)
+    except (OSError, ValueError):
+        return False
+
+def prewarm(reason):
+    """Ask the daemon to get the container ready for a likely launch. Returns False if it is not running."""
+    try:
+        return request({'cmd': 'prewarm', 'reason': reason}, timeout=2.0).get('ok', False)
+    except (OSError, ValueError):
+        return False
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--adopt':
+        if len(args) not in (4, 5):
+            print("Usage: launcher.py --adopt PID COMMAND OFFICE_APP [RUNID]", file=sys.stderr)
+            return 2
+        return 0 if adopt(args[1], args[2], args[3] == 'true', args[4] if len(args) == 5 else None) else 1
+    if not args:
+        os.execv(LINOFFICE_SCRIPT, [LINOFFICE_SCRIPT])
+    try:
+        reply = request(launch_request(args), timeout=LAUNCH_TIMEOUT)
+        if reply.get('ok'):
+            return 0
+        print(f"linofficed: {reply.get('error', 'unknown error')}", file=sys.stderr)
+    except (OSError, ValueError):
+        start_daemon()
+    # Hand over to the script so the caller sees the same behaviour as before
+    os.execv(LINOFFICE_SCRIPT, [LINOFFICE_SCRIPT, *args])
+
+if __name__ == "__main__":
+    sys.exit(main())
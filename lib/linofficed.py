@@ -0,0 +1,889 @@
+#!/usr/bin/env python3
+# This Python file uses the following encoding: utf-8
+"""LinOffice launcher daemon.
+
+A long-running per-user process listening on a Unix socket (see common.SOCKET_PATH). It keeps
+the configuration, the FreeRDP command, the podman-compose command and the container state
+warm, so launching an app only costs a socket round trip plus starting FreeRDP. Anything it
+cannot do on the fast path (booting Windows, cleanup, reset, ...) is handed to linoffice.sh.
+
+Protocol: one JSON object per line, answered with one JSON object per line.
+    {"cmd": "ping"}
+    {"cmd": "status"}
+    {"cmd": "reload", "redetect": false}
+    {"cmd": "launch", "argv": [...], "env": {"DISPLAY": ..., "LANG": ...}, "cwd": "..."}
+    {"cmd": "adopt", "pid": 1234, "command": "word", "office": true, "run": "12345"}
+    {"cmd": "prewarm", "reason": "hover"}
+
+Files opened with an app ({"argv": ["excel", "/path/a.xlsx", ...]}) are collected for
+FILE_BATCH_DELAY seconds, across all launch requests for the same app, and opened together in
+one RemoteApp session, so selecting many files in the file manager costs one connection and one
+cleanup instead of one per file. Each of those requests is answered once the batch was launched.
+
+The phases of every launch (config load, container state, resume, FreeRDP start and the cleanup
+afterwards) are recorded with tracing.py, under the same run id as linoffice.sh uses for the
+launches and cleanups delegated to it.
+
+Sessions (FreeRDP processes started here, or handed over by linoffice.sh with 'adopt') are
+watched by a single supervisor thread through pidfds, which also runs the autopause timer.
+
+Two more watchers run as threads of the daemon, so launches do not have to do their work:
+lockwatch.py keeps the index of Office lock files that waOfficeCleanup reads instead of scanning
+the home folder, and sleepwatch.py creates the marker that makes Windows resync its clock after
+the host resumed (with gdbus or dbus-monitor, or by comparing the uptime every 30 seconds),
+instead of waTimeSync checking for a missed sleep on every launch.
+
+'prewarm' resumes (or boots) the container ahead of a likely launch: the GUI sends it when the
+main window opens and when the pointer rests on an app button, and the daemon sends it to itself
+shortly before the hours at which apps are usually launched (see prewarm.py). If no launch
+follows within PREWARM_TIME seconds, the container is paused again.
+"""
+import errno
+import json
+import os
+import random
+import select
+import shlex
+import shutil
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+from common import (
+    APPDATA_PATH, COMPOSE_PATH, CONFIG_PATH, CONTAINER_NAME, LINOFFICE_SCRIPT,
+    PID_PATH, RDP_IP, RDP_PORT, RUNTIME_DIR, SCRIPT_DIR, SOCKET_PATH, dprint, session_env, set_log_level,
+)
+from config_store import load_assignments
+import podman_api
+import sessions as registry
+from lockwatch import LockFileWatcher
+from sleepwatch import SleepWatcher
+from prewarm import LaunchHistory
+import tracing
+
+# Commands the daemon runs itself; everything else goes to linoffice.sh
+FREERDP_COMMANDS = ('windows', 'manual', 'registry_override', 'internet_off', 'internet_on')
+OFFICE_WXP_APPS = ('excel', 'word', 'powerpoint')
+VALID_SCALES = (100, 140, 180)
+
+# Wait this long for more files to open with the same app before launching it
+FILE_BATCH_DELAY = 0.5
+# Characters of quoted Windows paths per RemoteApp command line, more files start another session
+MAX_FILE_ARGS_LENGTH = 7000
+
+# Map 'podman events' statuses onto the container state they leave behind
+EVENT_STATES = {
+    'create': 'created',
+    'init': 'created',
+    'start': 'running',
+    'restart': 'running',
+    'unpause': 'running',
+    'pause': 'paused',
+    'died': 'exited',
+    'stop': 'exited',
+    'kill': 'exited',
+    'remove': 'missing',
+}
+
+CONFIG_DEFAULTS = {
+    'RDP_USER': 'MyWindowsUser',
+    'RDP_PASS': 'MyWindowsPassword',
+    'RDP_FLAGS': '',
+    'RDP_KBD': '',
+    'FREERDP_COMMAND': '',
+    'REMOVABLE_MEDIA': '',
+    'RDP_SCALE': '100',
+    'AUTOPAUSE': 'on',
+    'AUTOPAUSE_TIME': '300',
+    'HIDEF': 'on',
+    'DEBUG': 'true',
+    'LOG_LEVEL': 'INFO',
+    'PREWARM': 'on',
+    'PREWARM_TIME': '120',
+}
+
+# Sources linoffice.conf like waLoadConfig does and prints the given variables, NUL-separated
+EXPAND_CONFIG_SCRIPT = 'source "$1" >/dev/null 2>&1; shift; for key; do if [ -n "${!key+set}" ]; then printf "%s=%s\\0" "$key" "${!key}"; fi; done'
+
+def load_config(path):
+    """The values of linoffice.conf as linoffice.sh sees them. Returns None if they could not be determined.
+
+    Plain values are read directly. If any value refers to a variable or command ($HOME, `...`),
+    the file is sourced by bash, so the expansion is the same as in linoffice.sh.
+    """
+    values = load_assignments(path)
+    if not any('$' in value or '`' in value for value in values.values()):
+        return values
+    keys = sorted(set(values) | set(CONFIG_DEFAULTS))
+    try:
+        result = subprocess.run(['bash', '-c', EXPAND_CONFIG_SCRIPT, 'bash', path, *keys],
+                                stdin=subprocess.DEVNULL, capture_output=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    expanded = {}
+    for item in result.stdout.split(b'\0'):
+        key, sep, value = item.decode('utf-8', errors='replace').partition('=')
+        if sep:
+            expanded[key] = value
+    return expanded
+
+def fix_scale(value):
+    try:
+        scale = int(value)
+    except (TypeError, ValueError):
+        return 100
+    return min(VALID_SCALES, key=lambda valid: (abs(scale - valid), valid))
+
+def resolve_compose_command():
+    """Same resolution order as linoffice.sh: /usr/bin, then PATH (including the LinOffice venv)."""
+    if os.access('/usr/bin/podman-compose', os.X_OK):
+        return ['/usr/bin/podman-compose']
+    venv_bin = os.path.expanduser('~/.local/bin/linoffice/venv/bin')
+    search_path = os.pathsep.join(filter(None, [os.environ.get('PATH', ''), venv_bin]))
+    found = shutil.which('podman-compose', path=search_path)
+    return [found] if found else None
+
+def to_windows_path(path, removable_media):
+    """Convert a UNIX path to the path of the redirected drive inside Windows."""
+    home = os.path.expanduser('~')
+    if path.startswith(home):
+        path = '\\\\tsclient\\home' + path[len(home):]
+    elif removable_media and path.startswith(removable_media):
+        path = '\\\\tsclient\\media' + path[len(removable_media):]
+    return path.replace('/', '\\')
+
+class ContainerWatcher(threading.Thread):
+    """Keep the container state current from 'podman events', re-subscribing if the stream drops."""
+
+    def __init__(self, container_name):
+        super().__init__(daemon=True)
+        self.container_name = container_name
+        self.state = None  # None = unknown, ask podman
+        self._lock = threading.Lock()
+
+    def run(self):
+        delay = 1
+        while True:
+            try:
+                process = subprocess.Popen(
+                    ['podman', 'events', '--filter', 'type=container',
+                     '--filter', f'container={self.container_name}', '--format', 'json'],
+                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+                )
+            except OSError:
+                time.sleep(60)
+                continue
+            self.refresh()
+            delay = 1
+            for line in process.stdout:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                state = EVENT_STATES.get(str(event.get('Status', '')).lower())
+                if state:
+                    with self._lock:
+                        self.state = state
+            process.wait()
+            # The stream dropped: nothing can be trusted until it is back
+            with self._lock:
+                self.state = None
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+
+    def refresh(self):
+        try:
+            state = podman_api.client().container_state(self.container_name, max_age=0)
+        except podman_api.PodmanUnavailable:
+            state = self._refresh_cli()
+        with self._lock:
+            self.state = state
+        return state
+
+    def _refresh_cli(self):
+        try:
+            result = subprocess.run(
+                ['podman', 'inspect', '--format', '{{.State.Status}}', self.container_name],
+                capture_output=True, text=True, timeout=30,
+            )
+            return result.stdout.strip() if result.returncode == 0 else 'missing'
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+
+    def get(self):
+        with self._lock:
+            state = self.state
+        return state if state is not None else self.refresh()
+
+class SessionSupervisor(threading.Thread):
+    """Wait for processes to exit and run the idle timer, all in one thread.
+
+    Processes are watched through pidfds, so an exit is noticed immediately, including for
+    processes the daemon did not start itself. The idle timer is the poll timeout, so it fires
+    exactly when it runs out. Without pidfd support (Linux < 5.3), processes are checked every second.
+    Callbacks run in this thread and must not block.
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self._lock = threading.Lock()
+        self._watched = {}  # pid -> (pidfd or None, Popen or None, callback)
+        self._deadline = None
+        self._deadline_callback = None
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self._use_pidfd = hasattr(os, 'pidfd_open')
+
+    def watch(self, pid, callback, process=None):
+        """Call callback(pid) once the process has exited (and reap it if process is its Popen)."""
+        pidfd = None
+        if self._use_pidfd:
+            try:
+                pidfd = os.pidfd_open(pid)
+            except OSError as e:
+                if e.errno != errno.ESRCH:
+                    self._use_pidfd = False
+        with self._lock:
+            self._watched[pid] = (pidfd, process, callback)
+        self._wakeup()
+
+    def set_deadline(self, seconds, callback):
+        with self._lock:
+            self._deadline = time.monotonic() + seconds
+            self._deadline_callback = callback
+        self._wakeup()
+
+    def cancel_deadline(self):
+        with self._lock:
+            self._deadline = None
+            self._deadline_callback = None
+        self._wakeup()
+
+    def remaining(self):
+        with self._lock:
+            return None if self._deadline is None else max(self._deadline - time.monotonic(), 0)
+
+    def _wakeup(self):
+        os.write(self._wakeup_w, b'x')
+
+    @staticmethod
+    def _exited(pid, process):
+        if process is not None:
+            return process.poll() is not None
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    def run(self):
+        while True:
+            with self._lock:
+                watched = dict(self._watched)
+                deadline = self._deadline
+            poller = select.poll()
+            poller.register(self._wakeup_r, select.POLLIN)
+            timeout = None
+            for pidfd, _, _ in watched.values():
+                if pidfd is None:
+                    timeout = 1000
+                else:
+                    poller.register(pidfd, select.POLLIN)
+            if deadline is not None:
+                remaining = max(int((deadline - time.monotonic()) * 1000) + 1, 0)
+                timeout = remaining if timeout is None else min(timeout, remaining)
+
+            ready = {fd for fd, _ in poller.poll(timeout)}
+            if self._wakeup_r in ready:
+                os.read(self._wakeup_r, 4096)
+
+            for pid, (pidfd, process, callback) in watched.items():
+                if pidfd in ready or (pidfd is None and self._exited(pid, process)):
+                    if process is not None:
+                        process.poll()  # reap it
+                    with self._lock:
+                        self._watched.pop(pid, None)
+                    if pidfd is not None:
+                        os.close(pidfd)
+                    callback(pid)
+
+            with self._lock:
+                callback = None
+                if self._deadline is not None and time.monotonic() >= self._deadline:
+                    callback = self._deadline_callback
+                    self._deadline = None
+                    self._deadline_callback = None
+            if callback:
+                callback()
+
+class Session:
+    def __init__(self, pid, command, office, process=None, runid=None):
+        self.process = process  # None for sessions handed over by linoffice.sh
+        self.pid = pid
+        self.command = command
+        self.office = office
+        self.runid = str(runid) if runid else str(random.randint(0, 32767))
+        self.registry_id = f"daemon_{pid}"
+
+class FileBatch:
+    """Files waiting to be opened with one app."""
+
+    def __init__(self, command, env, cwd):
+        self.command = command
+        self.env = env
+        self.cwd = cwd
+        self.files = []
+        self.timer = None
+        self.done = threading.Event()  # set once the files were handed to FreeRDP (or that failed)
+        self.error = None
+
+    def add(self, files):
+        for path in files:
+            if path not in self.files:
+                self.files.append(path)
+
+    def chunks(self, removable_media):
+        """The files split into groups that fit on one RemoteApp command line."""
+        chunk, length = [], 0
+        for path in self.files:
+            size = len(to_windows_path(path, removable_media)) + 3
+            if chunk and length + size > MAX_FILE_ARGS_LENGTH:
+                yield chunk
+                chunk, length = [], 0
+            chunk.append(path)
+            length += size
+        if chunk:
+            yield chunk
+
+class LinOfficeDaemon:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.config = {}
+        self.config_mtime = None
+        self.config_expanded = False
+        self.freerdp_command = None
+        self.compose_command = resolve_compose_command()
+        self.sessions = {}
+        self.batches = {}  # command -> FileBatch
+        self.supervisor = SessionSupervisor()
+        self.container = ContainerWatcher(CONTAINER_NAME)
+        self.lock_watcher = None
+        self.sleep_watcher = SleepWatcher()
+        self.history = LaunchHistory()
+        self.boot_process = None  # linoffice.sh --startcontainer started by a pre-warm
+        self.schedule_changed = threading.Event()
+        self.reload()
+
+    # --- Warm state ---
+
+    def debug(self):
+        return self.config.get('DEBUG', 'true') == 'true'
+
+    def log(self, message, runid='daemon', level='INFO'):
+        dprint(f"LINOFFICED: {message}", runid=runid, debug=self.debug(), level=level)
+
+    def reload(self, force_detect=False, redetect=False):
+        """(Re)load linoffice.conf and detect FreeRDP if needed (redetect=True also drops the detection cache)."""
+        with self.lock:
+            try:
+                mtime = os.stat(CONFIG_PATH).st_mtime_ns
+            except OSError:
+                self.config, self.config_mtime = {}, None
+                return
+            if mtime == self.config_mtime and not force_detect:
+                return
+            previous = self.config.get('FREERDP_COMMAND')
+            values = load_config(CONFIG_PATH)
+            # Without the values linoffice.sh would use, launches are delegated to it
+            self.config_expanded = values is not None
+            if values is None:
+                self.log("COULD NOT EXPAND LINOFFICE.CONF, DELEGATING LAUNCHES TO LINOFFICE.SH", level='WARN')
+                values = load_assignments(CONFIG_PATH)
+            config = dict(CONFIG_DEFAULTS)
+            config.update(values)
+            self.config, self.config_mtime = config, mtime
+            set_log_level(config['LOG_LEVEL'])
+            if force_detect or self.freerdp_command is None or previous != config['FREERDP_COMMAND']:
+                self.freerdp_command = self.detect_freerdp(redetect)
+            self.update_lock_watcher()
+            self.log(f"LOADED CONFIG, FREERDP COMMAND '{self.freerdp_command}'", level='DEBUG')
+
+    def detect_freerdp(self, redetect=False):
+        # Reuse the (cached) detection in linoffice.sh so there is only one implementation to maintain
+        try:
+            result = subprocess.run(
+                [LINOFFICE_SCRIPT, '--redetect-freerdp' if redetect else '--detect-freerdp'],
+                capture_output=True, text=True, timeout=60,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        lines = result.stdout.strip().splitlines()
+        return lines[-1].strip() if result.returncode == 0 and lines else None
+
+    def update_lock_watcher(self):
+        # Index the same folders waOfficeCleanup would scan
+        roots = [os.path.expanduser('~'), self.config.get('REMOVABLE_MEDIA') or '/run/media']
+        roots = [os.path.abspath(root) for root in roots if os.path.isdir(root)]
+        if self.lock_watcher and self.lock_watcher.roots == roots:
+            return
+        self.stop_lock_watcher()
+        self.lock_watcher = LockFileWatcher(roots)
+        self.lock_watcher.start()
+
+    def stop_lock_watcher(self):
+        if self.lock_watcher:
+            self.lock_watcher.stop()
+            self.lock_watcher.join(5)
+            self.lock_watcher = None
+
+    def status(self):
+        with self.lock:
+            sessions = [{'pid': s.pid, 'command': s.command, 'office': s.office} for s in self.sessions.values()]
+        return {
+            'ok': True,
+            'pid': os.getpid(),
+            'container': self.container.state,
+            'freerdp_command': self.freerdp_command,
+            'compose_command': self.compose_command,
+            'sessions': sessions,
+            'autopause_in': self.supervisor.remaining(),
+            'lockfiles_indexed': self.lock_watcher.complete if self.lock_watcher else False,
+            'prewarm_hours': self.history.learned_hours(),
+        }
+
+    # --- Launching ---
+
+    def handle_launch(self, argv, env, cwd):
+        if not argv:
+            return {'ok': False, 'error': 'no command'}
+        command = argv[0]
+        app_info = None
+        if command not in FREERDP_COMMANDS:
+            app_info = self.load_app(command)
+        if app_info is not None or command in ('windows', 'manual'):
+            self.history.record()
+            self.schedule_changed.set()
+        files = [path for path in argv[1:] if path]
+        if app_info is not None and files and '--startcontainer' not in argv:
+            return self.queue_files(command, files, env, cwd)
+        return self.launch(argv, env, cwd, app_info)
+
+    def queue_files(self, command, files, env, cwd):
+        # Paths from different callers are relative to different directories
+        files = [os.path.abspath(os.path.join(cwd or os.path.expanduser('~'), path)) for path in files]
+        with self.lock:
+            batch = self.batches.get(command)
+            if batch is None:
+                batch = self.batches[command] = FileBatch(command, env, cwd)
+            batch.add(files)
+            if batch.timer:
+                batch.timer.cancel()
+            batch.timer = threading.Timer(FILE_BATCH_DELAY, self.flush_batch, args=(command,))
+            batch.timer.daemon = True
+            batch.timer.start()
+        # Answer once the batch was launched, so the caller can fall back to linoffice.sh if that failed
+        batch.done.wait()
+        if batch.error:
+            return {'ok': False, 'error': batch.error}
+        return {'ok': True, 'queued': len(batch.files)}
+
+    def flush_batch(self, command):
+        # Called from the batch timer thread
+        with self.lock:
+            batch = self.batches.pop(command, None)
+        if batch is None:
+            return
+        try:
+            app_info = self.load_app(command)
+            if app_info is None:
+                self.log(f"APP '{command}' DISAPPEARED BEFORE OPENING {len(batch.files)} FILE(S)", level='WARN')
+                batch.error = f"unknown app '{command}'"
+                return
+            self.reload()
+            removable_media = self.config.get('REMOVABLE_MEDIA') or '/run/media'
+            for chunk in batch.chunks(removable_media):
+                self.log(f"OPENING {len(chunk)} FILE(S) WITH {command}")
+                reply = self.launch([command, *chunk], batch.env, batch.cwd, app_info)
+                if not reply.get('ok'):
+                    self.log(f"COULD NOT OPEN FILES WITH {command}: {reply.get('error')}", level='WARN')
+                    batch.error = f"could not open files with {command}: {reply.get('error')}"
+                    break
+        except Exception as e:
+            batch.error = f"could not open files with {command}: {e}"
+            raise
+        finally:
+            batch.done.set()
+
+    def launch(self, argv, env, cwd, app_info):
+        runid = str(random.randint(0, 32767))
+        command = argv[0]
+        tracer = tracing.Tracer(runid, command)
+        with tracer.span('config'):
+            self.reload()
+        fast_path = (
+            (command in FREERDP_COMMANDS or app_info is not None)
+            and '--startcontainer' not in argv
+            and self.freerdp_command
+            and self.compose_command
+            and self.config_mtime is not None
+            and self.config_expanded
+            and not self.booting()
+        )
+        if fast_path:
+            with tracer.span('container_state'):
+                state = self.container.get()
+            if state == 'paused':
+                self.log("WINDOWS PAUSED. RESUMING WINDOWS.", runid)
+                with tracer.span('resume'):
+                    subprocess.run([*self.compose_command, '--file', COMPOSE_PATH, 'unpause'],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    state = self.container.refresh()
+            fast_path = state == 'running'
+        if not fast_path:
+            # Booting, recreating or anything unusual is left to linoffice.sh, which traces under our run id
+            self.log(f"DELEGATING TO LINOFFICE.SH: {argv}", runid)
+            self.cancel_idle_timer()
+            process = subprocess.Popen(
+                [LINOFFICE_SCRIPT, *argv], env=dict(env, LINOFFICE_RUNID=runid), cwd=cwd or None,
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+            # Only to reap it, linoffice.sh hands its FreeRDP session back with 'adopt'
+            self.supervisor.watch(process.pid, lambda pid: None, process)
+            return {'ok': True, 'pid': process.pid, 'delegated': True}
+
+        args = self.freerdp_args(command, argv, app_info)
+        if args is None:
+            return {'ok': False, 'error': f"missing argument for '{command}'"}
+        self.log(f"LAUNCHING: {argv}", runid)
+        self.cancel_idle_timer()
+        with tracer.span('freerdp_spawn'):
+            process = subprocess.Popen(
+                ['podman', 'unshare', '--rootless-netns', *shlex.split(self.freerdp_command), *args],
+                env=env, cwd=cwd or None,
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        session = Session(process.pid, command, command in OFFICE_WXP_APPS, process, runid)
+        self.register(session, argv)
+        self.supervisor.watch(process.pid, self.session_ended, process)
+        return {'ok': True, 'pid': process.pid, 'delegated': False}
+
+    def handle_adopt(self, pid, command, office, runid=None):
+        """Take over a FreeRDP session started by linoffice.sh, so the script does not have to wait for it."""
+        try:
+            pid = int(pid)
+            os.kill(pid, 0)
+        except (TypeError, ValueError, ProcessLookupError):
+            return {'ok': False, 'error': f"no such process: {pid}"}
+        except PermissionError:
+            return {'ok': False, 'error': f"not allowed to watch process {pid}"}
+        # No reload(): the session is already running, and a FreeRDP detection could outlast the client's timeout
+        self.log(f"ADOPTED FREERDP PROCESS {pid} ({command})")
+        self.cancel_idle_timer()
+        session = Session(pid, command, bool(office), runid=runid)
+        self.register(session, [command])
+        self.supervisor.watch(pid, self.session_ended)
+        return {'ok': True, 'pid': pid}
+
+    # --- Pre-warming ---
+
+    def booting(self):
+        process = self.boot_process
+        return process is not None and process.poll() is None
+
+    def prewarm_time(self):
+        try:
+            return max(int(self.config.get('PREWARM_TIME', '120')), 10)
+        except ValueError:
+            return 120
+
+    def handle_prewarm(self, reason):
+        """Get the container running before a likely launch; pause it again if none follows."""
+        self.reload()
+        if self.config.get('PREWARM', 'on') != 'on' or not self.compose_command or self.config_mtime is None:
+            return {'ok': True, 'prewarm': False}
+        with self.lock:
+            if self.sessions:
+                return {'ok': True, 'prewarm': False}
+        state = self.container.get()
+        if state in ('paused', 'exited', 'created') and not self.booting():
+            threading.Thread(target=self.resume, args=(state, reason), daemon=True).start()
+        elif state == 'running' and not registry.freerdp_sessions(prune=False):
+            # Already warm: only make sure the autopause timer does not fire right before the launch
+            remaining = self.supervisor.remaining()
+            if remaining is not None and remaining < self.prewarm_time():
+                self.supervisor.set_deadline(self.prewarm_time(), self.prewarm_expired)
+        return {'ok': True, 'prewarm': True, 'container': state}
+
+    def resume(self, state, reason):
+        if state == 'paused':
+            self.log(f"PRE-WARMING ({reason}). RESUMING WINDOWS.")
+            subprocess.run([*self.compose_command, '--file', COMPOSE_PATH, 'unpause'],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self.container.refresh()
+        else:
+            # Booting is left to linoffice.sh, launches are delegated to it until Windows is up.
+            # --no-idle: it exits as soon as Windows accepts sessions, the pre-warm timer takes over from there
+            self.log(f"PRE-WARMING ({reason}). BOOTING WINDOWS.")
+            self.boot_process = subprocess.Popen(
+                [LINOFFICE_SCRIPT, '--startcontainer', '--no-idle'],
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+            self.supervisor.watch(self.boot_process.pid, self.boot_finished, self.boot_process)
+            return
+        self.arm_prewarm_timer()
+
+    def boot_finished(self, pid):
+        # Called from the supervisor thread (which has reaped the process)
+        process, self.boot_process = self.boot_process, None
+        if process is None or process.returncode != 0:
+            self.log(f"PRE-WARM BOOT FAILED (STATUS {process.returncode if process else '?'})", level='WARN')
+            return
+        self.log("PRE-WARM BOOT FINISHED, WINDOWS IS READY.")
+        self.arm_prewarm_timer()
+
+    def arm_prewarm_timer(self):
+        # Read the registry without its lock, which linoffice.sh may be holding: this can run in the supervisor thread
+        running = registry.freerdp_sessions(prune=False)
+        with self.lock:
+            # A launch may already have happened in the meantime
+            if self.sessions or running:
+                return
+            self.supervisor.set_deadline(self.prewarm_time(), self.prewarm_expired)
+
+    def prewarm_expired(self):
+        # Called from the supervisor thread
+        threading.Thread(target=self.pause_if_idle, args=(f"NO LAUNCH WITHIN {self.prewarm_time()} SECONDS OF PRE-WARMING",),
+                         daemon=True).start()
+
+    def run_schedule(self):
+        """Pre-warm shortly before the hours at which apps are usually launched (runs in its own thread)."""
+        while True:
+            next_time = self.history.next_prewarm()
+            # Wake up regularly, the wall clock jumps when the computer was suspended
+            timeout = 300 if next_time is None else min(max(next_time - time.time(), 0), 300)
+            if self.schedule_changed.wait(timeout):
+                self.schedule_changed.clear()
+                continue
+            if next_time is None or time.time() < next_time:
+                continue
+            self.handle_prewarm('schedule')
+
+    def load_app(self, name):
+        for base in (os.path.join(SCRIPT_DIR, 'apps'), os.path.join(APPDATA_PATH, 'apps')):
+            info = os.path.join(base, name, 'info.txt')
+            if os.path.exists(info):
+                values = load_assignments(info)
+                values['ICON'] = os.path.join(base, name, 'icon.svg')
+                return values
+        return None
+
+    def freerdp_args(self, command, argv, app_info):
+        """Build the FreeRDP arguments exactly like waRunCommand in linoffice.sh."""
+        config = self.config
+        removable_media = config['REMOVABLE_MEDIA'] or '/run/media'
+        hidef = config['HIDEF']
+        base = [
+            f"/u:{config['RDP_USER']}",
+            f"/p:{config['RDP_PASS']}",
+            f"/scale:{fix_scale(config['RDP_SCALE'])}",
+        ]
+        common_flags = ['+auto-reconnect', '+home-drive', '+clipboard', '-wallpaper']
+        kbd = config['RDP_KBD'].split()
+        flags = config['RDP_FLAGS'].split()
+        target = f"/v:{RDP_IP}:{RDP_PORT}"
+
+        if command == 'windows':
+            return [*base, '+dynamic-resolution', *common_flags, *kbd,
+                    '/wm-class:Microsoft Windows', f"/t:Windows RDP Session [{RDP_IP}]", *flags, target]
+        if command == 'manual':
+            if len(argv) < 2:
+                return None
+            return [*base, *common_flags, *kbd, *flags, f"/app:program:{argv[1]},hidef:{hidef}", target]
+        if command == 'registry_override':
+            return [*base, *common_flags, *kbd, *flags,
+                    r"/app:program:powershell.exe,cmd:-ExecutionPolicy Bypass -File C:\\OEM\\RegistryOverride.ps1", target]
+        if command == 'internet_off':
+            return [*base, *common_flags, *kbd, *flags, r"/app:program:cmd.exe,cmd:/c C:\\OEM\\dns_off.bat", target]
+        if command == 'internet_on':
+            return [*base, *common_flags, *kbd, *flags, r"/app:program:cmd.exe,cmd:/c C:\\OEM\\dns_on.bat", target]
+
+        full_name = app_info.get('FULL_NAME', '')
+        app = f"/app:program:{app_info.get('EXE', '')},hidef:{hidef},icon:{app_info['ICON']},name:{full_name}"
+        if len(argv) < 2 or not argv[1]:
+            return [*base, *common_flags, *kbd, *flags, f"/wm-class:{full_name}", app, target]
+        file_paths = ' '.join(f'"{to_windows_path(path, removable_media)}"' for path in argv[1:] if path)
+        return [*base, '+auto-reconnect', '+home-drive', '+clipboard', f"/drive:media,{removable_media}",
+                '-wallpaper', *kbd, *flags, f"/wm-class:{full_name}", f'{app},cmd:{file_paths}', target]
+
+    # --- Session tracking ---
+
+    def register(self, session, argv):
+        with self.lock:
+            self.sessions[session.pid] = session
+        try:
+            # Let linoffice.sh instances see this session in their cleanup and idle checks
+            registry.register(registry.new_entry(session.registry_id, session.pid, session.pid, session.office, ' '.join(argv)))
+        except OSError as e:
+            self.log(f"COULD NOT REGISTER SESSION {session.pid}: {e}", level='WARN')
+
+    def session_ended(self, pid):
+        # Called from the supervisor thread
+        with self.lock:
+            session = self.sessions.pop(pid, None)
+            last = not self.sessions
+        if session is None:
+            return
+        self.log(f"SESSION {pid} ({session.command}) ENDED")
+        try:
+            registry.unregister(session.registry_id)
+        except OSError as e:
+            self.log(f"COULD NOT UNREGISTER SESSION {pid}: {e}", level='WARN')
+        if last:
+            threading.Thread(target=self.cleanup_and_idle, args=(session,), daemon=True).start()
+
+    def cleanup_and_idle(self, session):
+        # Same post-exit cleanup as linoffice.sh runs after a FreeRDP session (traced there as part of the launch)
+        subprocess.run([LINOFFICE_SCRIPT, 'cleanup', '--full'],
+                       env=dict(os.environ, LINOFFICE_RUNID=session.runid),
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.start_idle_timer(session.command)
+
+    def start_idle_timer(self, last_command):
+        if self.config.get('AUTOPAUSE', 'on') != 'on':
+            return
+        try:
+            timeout = int(self.config.get('AUTOPAUSE_TIME', '300'))
+        except ValueError:
+            timeout = 300
+        # RemoteApp sessions already take 20 seconds to be terminated by Windows, see waLoadConfig
+        if last_command != 'windows':
+            timeout = max(timeout - 20, 0)
+        with self.lock:
+            # A new session may have started while cleaning up
+            if self.sessions:
+                return
+            self.supervisor.set_deadline(timeout, self.idle_timer_expired)
+
+    def cancel_idle_timer(self):
+        self.supervisor.cancel_deadline()
+
+    def idle_timer_expired(self):
+        # Called from the supervisor thread, pausing takes a moment
+        threading.Thread(target=self.pause_if_idle, daemon=True).start()
+
+    def pause_if_idle(self, reason=None):
+        with self.lock:
+            if self.sessions:
+                return
+        # Sessions started by linoffice.sh itself are only visible in the session registry
+        if registry.freerdp_sessions():
+            return
+        if reason is None:
+            reason = f"IDLE FOR {self.config.get('AUTOPAUSE_TIME')} SECONDS"
+        self.log(f"{reason}. SUSPENDING WINDOWS.")
+        subprocess.run([*self.compose_command, '--file', COMPOSE_PATH, 'pause'],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    # --- Requests ---
+
+    def handle(self, request):
+        cmd = request.get('cmd')
+        if cmd == 'ping':
+            return {'ok': True}
+        if cmd == 'status':
+            return self.status()
+        if cmd == 'reload':
+            self.reload(force_detect=True, redetect=bool(request.get('redetect')))
+            if self.lock_watcher and not self.lock_watcher.complete:
+                # The lock file watcher gave up at the inotify watch limit, try again (it may have been raised)
+                self.lock_watcher.request_rescan()
+            return {'ok': True, 'freerdp_command': self.freerdp_command}
+        if cmd == 'adopt':
+            return self.handle_adopt(request.get('pid'), request.get('command', ''), request.get('office'),
+                                     request.get('run'))
+        if cmd == 'launch':
+            # The daemon's own environment, with the display and language of the caller's session
+            env = dict(os.environ, **session_env(request.get('env') or {}))
+            return self.handle_launch(request.get('argv') or [], env, request.get('cwd'))
+        if cmd == 'prewarm':
+            return self.handle_prewarm(str(request.get('reason', '')))
+        return {'ok': False, 'error': f"unknown command '{cmd}'"}
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                reply = self.server.linoffice.handle(json.loads(line))
+            except Exception as e:
+                reply = {'ok': False, 'error': str(e)}
+            self.wfile.write(json.dumps(reply).encode() + b'\n')
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def already_running():
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(1.0)
+        try:
+            sock.connect(SOCKET_PATH)
+            return True
+        except OSError:
+            return False
+
+def main():
+    os.makedirs(RUNTIME_DIR, mode=0o700, exist_ok=True)
+    os.makedirs(APPDATA_PATH, exist_ok=True)
+    if already_running():
+        print("linofficed is already running")
+        return 0
+    # A previous daemon did not shut down cleanly
+    if os.path.exists(SOCKET_PATH):
+        os.remove(SOCKET_PATH)
+
+    daemon = LinOfficeDaemon()
+    daemon.container.start()
+    daemon.supervisor.start()
+    daemon.sleep_watcher.start()
+    threading.Thread(target=daemon.run_schedule, daemon=True).start()
+
+    old_umask = os.umask(0o177)
+    try:
+        server = Server(SOCKET_PATH, RequestHandler)
+    finally:
+        os.umask(old_umask)
+    server.linoffice = daemon
+    with open(PID_PATH, 'w') as f:
+        f.write(f"{os.getpid()}\n")
+
+    def shutdown(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    daemon.log("STARTED")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        daemon.stop_lock_watcher()
+        daemon.sleep_watcher.stop()
+        for path in (SOCKET_PATH, PID_PATH):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        daemon.log("STOPPED")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
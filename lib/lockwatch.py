@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# This Python file uses the following encoding: utf-8
+"""Index of Office lock files (e.g. ~$file.docx), kept up to date with inotify.
+
+waOfficeCleanup in linoffice.sh reads the index (LOCKFILE_INDEX_PATH, NUL-separated paths like
+'find -print0') instead of scanning the whole home folder, as long as the watcher that wrote it
+is alive and covers the folders it would scan (LOCKWATCH_PID_PATH: pid, then one root per line). If the index could not be kept complete (e.g. the inotify watch
+limit was reached) it is removed again and linoffice.sh falls back to scanning.
+
+When the watch limit is reached, all watches are given back right away, so the watcher does not
+keep the user's inotify quota (shared with file managers, IDEs, ...) for an index nobody uses. It
+then stays idle until rescan is requested (request_rescan(), the daemon's 'reload' command or
+SIGHUP when running standalone).
+
+Runs inside the launcher daemon (linofficed.py), or standalone: lockwatch.py [directory ...]
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import signal
+import struct
+import sys
+import threading
+
+from common import APPDATA_PATH, dprint
+
+LOCKFILE_INDEX_PATH = os.path.join(APPDATA_PATH, 'lockfile_index')
+LOCKWATCH_PID_PATH = os.path.join(APPDATA_PATH, 'lockwatch.pid')
+
+# Same patterns as the 'find' fallback in waOfficeCleanup
+LOCKFILE_SUFFIXES = ('.xlsx', '.docx', '.pptx', '.xlsm', '.docm', '.pptm')
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct('iIII')
+
+def is_lockfile(name):
+    return name.startswith('~$') and name.endswith(LOCKFILE_SUFFIXES)
+
+def _is_hidden(path, roots):
+    # 'find -not -path "*/.*"' skips everything below a hidden component
+    for root in roots:
+        if path == root or path.startswith(root + os.sep):
+            return any(part.startswith('.') for part in path[len(root):].split(os.sep) if part)
+    return False
+
+class Inotify:
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd):
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self):
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            yield wd, mask, os.fsdecode(name)
+
+    def close(self):
+        os.close(self.fd)
+
+class LockFileWatcher(threading.Thread):
+    """Maintain the set of Office lock files below the given roots."""
+
+    def __init__(self, roots):
+        super().__init__(daemon=True)
+        self.roots = [os.path.abspath(root) for root in roots if os.path.isdir(root)]
+        self.lockfiles = set()
+        self.complete = True
+        self._watches = {}   # wd -> directory
+        self._dirs = {}      # directory -> wd
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self._stopped = False
+
+    # --- Index ---
+
+    def write_index(self):
+        if not self.complete:
+            # An index with holes would make waOfficeCleanup miss files, so let it scan instead
+            try:
+                os.remove(LOCKFILE_INDEX_PATH)
+            except OSError:
+                pass
+            return
+        tmp_path = f"{LOCKFILE_INDEX_PATH}.{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            for path in sorted(self.lockfiles):
+                f.write(os.fsencode(path) + b'\0')
+        os.replace(tmp_path, LOCKFILE_INDEX_PATH)
+
+    # --- Watches ---
+
+    def _watch_tree(self, top):
+        """Add watches for top and every non-hidden directory below it, indexing lock files on the way."""
+        stack = [top]
+        while stack and self.complete:
+            directory = stack.pop()
+            if directory in self._dirs or _is_hidden(directory, self.roots):
+                continue
+            try:
+                wd = self.inotify.add_watch(directory)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    dprint(f"LOCKWATCH: INOTIFY WATCH LIMIT REACHED AT {directory}, FALLING BACK TO SCANNING", level='WARN')
+                    self._give_up()
+                continue
+            self._watches[wd] = directory
+            self._dirs[directory] = wd
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name.startswith('.'):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif is_lockfile(entry.name) and entry.is_file(follow_symlinks=False):
+                            self.lockfiles.add(entry.path)
+            except OSError:
+                continue
+
+    def _give_up(self):
+        """Release every watch and drop the index until the next rescan."""
+        self._remove_watches()
+        self.complete = False
+
+    def _remove_watches(self):
+        for wd in list(self._watches):
+            self.inotify.rm_watch(wd)
+        self._watches.clear()
+        self._dirs.clear()
+        self.lockfiles.clear()
+
+    def _forget_tree(self, top):
+        prefix = top + os.sep
+        for directory in [d for d in self._dirs if d == top or d.startswith(prefix)]:
+            wd = self._dirs.pop(directory)
+            self._watches.pop(wd, None)
+            self.inotify.rm_watch(wd)
+        self.lockfiles = {path for path in self.lockfiles if not path.startswith(prefix)}
+
+    def rescan(self):
+        """Drop everything and build the index from scratch."""
+        self._remove_watches()
+        self.complete = True
+        for root in self.roots:
+            self._watch_tree(root)
+        self.write_index()
+        dprint(f"LOCKWATCH: INDEXED {len(self.lockfiles)} LOCK FILES IN {len(self._dirs)} DIRECTORIES (COMPLETE: {self.complete})")
+
+    def _refresh_media(self):
+        """Re-index the roots other than the home folder after a drive was (un)mounted."""
+        home = os.path.expanduser('~')
+        for root in self.roots:
+            if root != home:
+                self._forget_tree(root)
+                self._watch_tree(root)
+        self.write_index()
+
+    # --- Main loop ---
+
+    def run(self):
+        try:
+            self.inotify = Inotify()
+        except OSError as e:
+            dprint(f"LOCKWATCH: INOTIFY NOT AVAILABLE ({e})")
+            return
+        mounts = None
+        try:
+            with open(LOCKWATCH_PID_PATH, 'w') as f:
+                f.write(f"{os.getpid()}\n")
+                f.writelines(f"{root}\n" for root in self.roots)
+            self.rescan()
+
+            poller = select.poll()
+            poller.register(self.inotify.fd, select.POLLIN)
+            poller.register(self._wakeup_r, select.POLLIN)
+            # /proc/self/mounts becomes readable with POLLPRI whenever something is (un)mounted, e.g. a USB drive
+            mounts = open('/proc/self/mounts', 'rb')
+            poller.register(mounts.fileno(), select.POLLPRI)
+            while not self._stopped:
+                for fd, event in poller.poll():
+                    if fd == self._wakeup_r:
+                        os.read(self._wakeup_r, 4096)
+                        if self._stopped:
+                            return
+                        self.rescan()
+                    elif fd == mounts.fileno():
+                        mounts.seek(0)
+                        mounts.read()
+                        # After giving up, wait for an explicit rescan instead of filling the quota again
+                        if self.complete:
+                            self._refresh_media()
+                    elif self.complete:
+                        self._handle_events()
+                    else:
+                        # Leftover events of the watches given up
+                        for _event in self.inotify.read():
+                            pass
+        finally:
+            if mounts is not None:
+                mounts.close()
+            self.inotify.close()
+            for path in (LOCKWATCH_PID_PATH, LOCKFILE_INDEX_PATH):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _handle_events(self):
+        changed = False
+        for wd, mask, name in self.inotify.read():
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, nothing short of a rescan can be trusted
+                self.rescan()
+                return
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                if mask & IN_IGNORED or directory in self.roots:
+                    self._forget_tree(directory)
+                    changed = True
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    before = len(self.lockfiles)
+                    self._watch_tree(path)
+                    changed = changed or len(self.lockfiles) != before
+                elif mask & IN_MOVED_FROM:
+                    self._forget_tree(path)
+                    changed = True
+            elif is_lockfile(name):
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self.lockfiles.add(path)
+                else:
+                    self.lockfiles.discard(path)
+                changed = True
+        if changed:
+            self.write_index()
+
+    def request_rescan(self):
+        """Build the index from scratch in the watcher thread (e.g. after the watch limit was raised)."""
+        os.write(self._wakeup_w, b'r')
+
+    def stop(self):
+        self._stopped = True
+        os.write(self._wakeup_w, b'x')
+
+def main():
+    roots = sys.argv[1:] or [os.path.expanduser('~'), '/run/media']
+    os.makedirs(APPDATA_PATH, exist_ok=True)
+    watcher = LockFileWatcher(roots)
+    signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: watcher.stop())
+    signal.signal(signal.SIGHUP, lambda signum, frame: watcher.request_rescan())
+    watcher.start()
+    watcher.join()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
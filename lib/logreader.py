@@ -0,0 +1,170 @@
+# This Python file uses the following encoding: utf-8
+"""Incremental reading of linoffice.log for the log viewer.
+
+The log is memory-mapped and only indexed as far as it is looked at: the viewer starts at the
+end and asks for older lines (index_older) as the user scrolls back, and for the lines appended
+since the last look (index_newer). Opening a log of any size therefore only touches its last
+few pages. The index (the start offsets of the lines seen so far) is kept, so changing the
+filters does not search the file for line breaks again.
+
+Lines are written by dprint in lib/common.py and waLog in linoffice.sh:
+    [Mon Jan 01 12:00:00 CET 2024-12345] INFO: START
+Older logs have no level ("[date-runid] message"); those lines count as DEBUG, or as the level
+their message starts with ("ERROR: ...").
+"""
+import mmap
+import os
+import re
+from array import array
+from collections import namedtuple
+
+from common import LOG_LEVELS, LOG_PATH
+
+LINE_RE = re.compile(r'\[(?P<date>.*)-(?P<run>[^\]\-]+)\] (?:(?P<level>DEBUG|INFO|WARN|WARNING|ERROR):? )?(?P<message>.*)')
+# Bytes searched for line breaks per index_older() call, so a long way back does not block the GUI
+SCAN_BYTES = 1024 * 1024
+
+LogRecord = namedtuple('LogRecord', 'date run level message text')
+
+def parse_line(text):
+    """LogRecord for one line; date and run are empty for lines that are not records (e.g. tracebacks)."""
+    match = LINE_RE.match(text)
+    if not match:
+        return LogRecord('', '', 'DEBUG', text, text)
+    level = match.group('level') or 'DEBUG'
+    if level == 'WARNING':
+        level = 'WARN'
+    return LogRecord(match.group('date'), match.group('run'), level, match.group('message'), text)
+
+class LogReader:
+    """Line index over a growing, rotating log file.
+
+    Line i (0 = oldest line indexed so far) is record(i). index_older() extends the index towards
+    the start of the file, which shifts all line numbers by the number of lines it returns.
+    """
+
+    def __init__(self, path=LOG_PATH):
+        self.path = path
+        self._file = None
+        self._map = None
+        self._inode = None
+        self._starts = array('q')  # start offsets of the indexed lines, ascending
+        self.first = 0  # offset of the oldest indexed line
+        self.end = 0  # offset after the newest indexed (complete) line
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __len__(self):
+        return len(self._starts)
+
+    def at_start(self):
+        """Whether the index reaches back to the beginning of the file."""
+        return self.first == 0
+
+    def refresh(self):
+        """Map what was appended since the last call. Returns True if the file was replaced or truncated (rotated), which empties the index."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            st = None
+        replaced = st is None or st.st_ino != self._inode or st.st_size < self.end
+        if replaced:
+            self.close()
+            was_indexed = len(self._starts) > 0 or self._inode is not None
+            self._starts = array('q')
+            self._inode = None
+            self.first = self.end = 0
+            if st is None:
+                return was_indexed
+            try:
+                self._file = open(self.path, 'rb')
+            except OSError:
+                return was_indexed
+            self._inode = os.fstat(self._file.fileno()).st_ino
+            # Start at the end: older lines are only indexed when they are asked for
+            self.first = self.end = self._last_line_end(st.st_size)
+        if self._map is None or st.st_size > len(self._map):
+            self._remap(st.st_size)
+        return replaced and was_indexed
+
+    def _remap(self, size):
+        if self._file is None or size == 0:
+            return
+        try:
+            new_map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return
+        if self._map is not None:
+            self._map.close()
+        self._map = new_map
+
+    def _last_line_end(self, size):
+        """Offset after the last complete line of a file of this size."""
+        self._remap(size)
+        if self._map is None:
+            return 0
+        return self._map.rfind(b'\n', 0, size) + 1
+
+    def index_newer(self):
+        """Index the complete lines appended since the last call; returns how many there are."""
+        if self._map is None:
+            return 0
+        size = len(self._map)
+        new_starts = array('q')
+        position = self.end
+        while position < size:
+            newline = self._map.find(b'\n', position, size)
+            if newline < 0:
+                break  # the writer has not finished this line yet
+            new_starts.append(position)
+            position = newline + 1
+        self._starts.extend(new_starts)
+        self.end = position
+        return len(new_starts)
+
+    def index_older(self, max_bytes=SCAN_BYTES):
+        """Index lines before the oldest indexed one, searching at most max_bytes; returns how many were added."""
+        if self._map is None or self.first == 0:
+            return 0
+        limit = max(self.first - max_bytes, 0)
+        new_starts = array('q')
+        # self.first - 1 is the line break ending the previous line
+        position = self.first - 1
+        while True:
+            newline = self._map.rfind(b'\n', limit, position)
+            if newline < 0:
+                break
+            new_starts.append(newline + 1)
+            position = newline
+        if limit == 0:
+            new_starts.append(0)
+        if not new_starts:
+            # One line longer than max_bytes: keep searching next time
+            if limit == 0:
+                return 0
+            return self.index_older(max_bytes * 2)
+        new_starts.reverse()
+        self._starts[0:0] = new_starts
+        self.first = new_starts[0]
+        return len(new_starts)
+
+    def line(self, i):
+        start = self._starts[i]
+        stop = self._starts[i + 1] if i + 1 < len(self._starts) else self.end
+        return self._map[start:stop].rstrip(b'\r\n').decode('utf-8', errors='replace')
+
+    def record(self, i):
+        return parse_line(self.line(i))
+
+def record_filter(level='DEBUG', run=''):
+    """Predicate for LogRecords of at least this level and (if given) this run id."""
+    threshold = LOG_LEVELS.get(level, LOG_LEVELS['DEBUG'])
+    def matches(record):
+        return LOG_LEVELS.get(record.level, LOG_LEVELS['DEBUG']) >= threshold and (not run or record.run == run)
+    return matches
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# This Python file uses the following encoding: utf-8
+"""Container state from the libpod REST API instead of running the podman CLI.
+
+Podman serves its API on a Unix socket (rootless: $XDG_RUNTIME_DIR/podman/podman.sock, enabled
+with 'systemctl --user enable --now podman.socket'). A PodmanClient keeps one HTTP connection to
+it open and caches answers for a short TTL, so asking for the container state costs a local
+round trip (or nothing) instead of starting a podman process. If the socket is not there,
+PodmanUnavailable is raised and callers fall back to the CLI.
+
+The socket can be overridden with LINOFFICE_PODMAN_SOCKET (e.g. to point at a test server).
+
+Usage: podman_api.py state|exists [CONTAINER]
+Exit status: 0 on success (exists: the container exists), 1 if it does not exist,
+2 if the API is not available.
+"""
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+from common import CONTAINER_NAME
+
+API_PREFIX = '/v4.0.0/libpod'
+DEFAULT_TTL = 2.0
+
+class PodmanUnavailable(Exception):
+    pass
+
+def socket_path():
+    """Path of the podman API socket for this user."""
+    override = os.environ.get('LINOFFICE_PODMAN_SOCKET')
+    if override:
+        return override
+    host = os.environ.get('CONTAINER_HOST', '')
+    if host.startswith('unix://'):
+        return host[len('unix://'):]
+    if os.geteuid() == 0:
+        return '/run/podman/podman.sock'
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or f'/run/user/{os.getuid()}'
+    return os.path.join(runtime_dir, 'podman', 'podman.sock')
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=5.0):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+class PodmanClient:
+    """Thread-safe libpod API client with one persistent connection and a short-TTL cache."""
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, timeout=5.0):
+        self.path = path or socket_path()
+        self.ttl = ttl
+        self.timeout = timeout
+        self._conn = None
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def close(self):
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+    def invalidate(self):
+        """Forget cached answers (e.g. after starting or stopping the container)."""
+        with self._lock:
+            self._cache.clear()
+
+    def request(self, path):
+        """GET an API path and return (status, decoded JSON body or None)."""
+        with self._lock:
+            # A kept-alive connection may have been closed by podman in the meantime: retry once on a new one
+            for attempt in range(2):
+                if self._conn is None:
+                    if not os.path.exists(self.path):
+                        raise PodmanUnavailable(f"no podman API socket at {self.path}")
+                    self._conn = UnixHTTPConnection(self.path, self.timeout)
+                try:
+                    self._conn.request('GET', API_PREFIX + path)
+                    response = self._conn.getresponse()
+                    body = response.read()
+                except (OSError, http.client.HTTPException) as e:
+                    self._conn.close()
+                    self._conn = None
+                    if attempt:
+                        raise PodmanUnavailable(str(e)) from e
+                    continue
+                if response.will_close:
+                    self._conn.close()
+                    self._conn = None
+                try:
+                    return response.status, json.loads(body) if body else None
+                except ValueError:
+                    return response.status, None
+
+    def _cached(self, key, fetch, max_age=None):
+        max_age = self.ttl if max_age is None else max_age
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and now - entry[0] < max_age:
+                return entry[1]
+        value = fetch()
+        with self._lock:
+            self._cache[key] = (time.monotonic(), value)
+        return value
+
+    def container(self, name=CONTAINER_NAME, max_age=None):
+        """(state, status) like 'podman ps -a' shows them, e.g. ('running', 'Up 5 minutes'); state 'missing' if there is none.
+
+        max_age overrides the TTL of the cached answer (0 always asks podman).
+        """
+        def fetch():
+            filters = quote(json.dumps({'name': [f'^{name}$']}))
+            status, containers = self.request(f'/containers/json?all=true&filters={filters}')
+            if status != 200 or not isinstance(containers, list):
+                raise PodmanUnavailable(f"unexpected answer from podman ({status})")
+            if not containers:
+                return 'missing', ''
+            return str(containers[0].get('State', '')).lower(), str(containers[0].get('Status', ''))
+        return self._cached(('container', name), fetch, max_age)
+
+    def container_state(self, name=CONTAINER_NAME, max_age=None):
+        return self.container(name, max_age)[0]
+
+    def container_exists(self, name=CONTAINER_NAME, max_age=None):
+        return self.container_state(name, max_age) != 'missing'
+
+_client = None
+_client_lock = threading.Lock()
+
+def client():
+    """The shared PodmanClient of this process."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = PodmanClient()
+        return _client
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('state', 'exists'):
+        print("Usage: podman_api.py state|exists [CONTAINER]", file=sys.stderr)
+        return 2
+    name = sys.argv[2] if len(sys.argv) > 2 else CONTAINER_NAME
+    try:
+        state = client().container_state(name)
+    except PodmanUnavailable as e:
+        print(f"podman API not available: {e}", file=sys.stderr)
+        return 2
+    if sys.argv[1] == 'state':
+        print(state)
+        return 0
+    return 0 if state != 'missing' else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+# This Python file uses the following encoding: utf-8
+"""Launch history for pre-warming the container before the user starts an app.
+
+Every launch through the daemon is recorded in HISTORY_PATH (timestamps only). From it the
+daemon learns the hours of the day at which apps are usually started: an hour counts once apps
+were launched in it on at least MIN_DAYS different days of the last HISTORY_DAYS days. Shortly
+before such an hour (LEAD_TIME) the daemon resumes the container, so the first launch does not
+have to wait for it.
+"""
+import json
+import os
+import threading
+import time
+
+from common import APPDATA_PATH
+
+HISTORY_PATH = os.path.join(APPDATA_PATH, 'launch_history.json')
+HISTORY_DAYS = 28
+MAX_ENTRIES = 2000
+MIN_DAYS = 3
+LEAD_TIME = 120
+
+class LaunchHistory:
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._launches = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                launches = json.load(f).get('launches', [])
+            return [float(t) for t in launches]
+        except (OSError, ValueError, TypeError, AttributeError):
+            return []
+
+    def _save(self, launches):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'launches': launches}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def record(self, when=None):
+        when = time.time() if when is None else when
+        cutoff = when - HISTORY_DAYS * 86400
+        with self._lock:
+            self._launches = [t for t in self._launches if t >= cutoff][-(MAX_ENTRIES - 1):]
+            self._launches.append(when)
+            launches = list(self._launches)
+        self._save(launches)
+
+    def learned_hours(self, now=None):
+        """Hours of the day (0-23, local time) in which apps were launched on at least MIN_DAYS days."""
+        now = time.time() if now is None else now
+        cutoff = now - HISTORY_DAYS * 86400
+        days = {}
+        with self._lock:
+            launches = [t for t in self._launches if t >= cutoff]
+        for t in launches:
+            local = time.localtime(t)
+            days.setdefault(local.tm_hour, set()).add((local.tm_year, local.tm_yday))
+        return sorted(hour for hour, seen in days.items() if len(seen) >= MIN_DAYS)
+
+    def next_prewarm(self, now=None):
+        """Epoch time of the next scheduled pre-warm (LEAD_TIME before a learned hour), or None."""
+        now = time.time() if now is None else now
+        hours = self.learned_hours(now)
+        if not hours:
+            return None
+        local = time.localtime(now)
+        # Three days: just before midnight, tomorrow's first learned hour may already be too close
+        for day in range(3):
+            for hour in hours:
+                # mktime normalises the day overflow and daylight saving changes
+                start = time.mktime((local.tm_year, local.tm_mon, local.tm_mday + day, hour, 0, 0, 0, 0, -1))
+                if start - LEAD_TIME > now:
+                    return start - LEAD_TIME
+        return None
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# This Python file uses the following encoding: utf-8
+"""Wait until Windows in the LinOffice container accepts RDP sessions.
+
+An open TCP port is not enough: the port forward of the container accepts connections long
+before Windows has booted. So the last phase sends an RDP X.224 Connection Request and only
+counts Windows as ready once it answers with a Connection Confirm. All phases are polled with
+a short exponential backoff instead of fixed 5 second sleeps.
+
+The phase timings (seconds since the wait started) are written to READINESS_PATH for the GUI
+and printed on stdout for linoffice.sh, e.g.:
+    ready=true container=0.8 port=21.4 rdp=37.9 attempts=41
+
+Usage: readiness.py [--timeout SECONDS] [--quiet]
+Exit status: 0 if Windows is ready, 1 on timeout.
+"""
+import argparse
+import json
+import os
+import socket
+import struct
+import subprocess
+import sys
+import time
+
+from common import APPDATA_PATH, CONTAINER_NAME, RDP_IP, RDP_PORT
+import podman_api
+
+READINESS_PATH = os.path.join(APPDATA_PATH, 'readiness.json')
+
+PHASES = ('container', 'port', 'rdp')
+
+# TPKT header + X.224 Connection Request + RDP_NEG_REQ asking for TLS | CredSSP
+X224_CONNECTION_REQUEST = bytes([
+    0x03, 0x00, 0x00, 0x13,
+    0x0e, 0xe0, 0x00, 0x00, 0x00, 0x00, 0x00,
+    0x01, 0x00, 0x08, 0x00, 0x03, 0x00, 0x00, 0x00,
+])
+X224_CONNECTION_CONFIRM = 0xd0
+
+def container_running(container_name=CONTAINER_NAME):
+    try:
+        return podman_api.client().container_state(container_name, max_age=0) == 'running'
+    except podman_api.PodmanUnavailable:
+        pass
+    try:
+        result = subprocess.run(
+            ['podman', 'inspect', '--format', '{{.State.Status}}', container_name],
+            capture_output=True, text=True, timeout=10,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return result.stdout.strip() == 'running'
+
+def port_open(host=RDP_IP, port=RDP_PORT, timeout=1.0):
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+def rdp_ready(host=RDP_IP, port=RDP_PORT, timeout=2.0):
+    """Return True if an RDP server answers the X.224 Connection Request with a Connection Confirm."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.settimeout(timeout)
+            sock.sendall(X224_CONNECTION_REQUEST)
+            header = b''
+            while len(header) < 6:
+                chunk = sock.recv(6 - len(header))
+                if not chunk:
+                    return False
+                header += chunk
+    except OSError:
+        return False
+    version, _, length = struct.unpack('>BBH', header[:4])
+    # header[4] is the X.224 length indicator, header[5] the TPDU code
+    return version == 3 and length >= 11 and header[5] & 0xf0 == X224_CONNECTION_CONFIRM
+
+def save_timings(timings):
+    tmp_path = f"{READINESS_PATH}.{os.getpid()}"
+    try:
+        os.makedirs(APPDATA_PATH, exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump(timings, f)
+        os.replace(tmp_path, READINESS_PATH)
+    except OSError:
+        pass
+
+def load_timings():
+    """Timings of the last wait, or None if there are none (used by the GUI)."""
+    try:
+        with open(READINESS_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def wait_ready(timeout=120, progress=None, initial_delay=0.1, max_delay=2.0):
+    """Wait until Windows accepts RDP sessions and return the phase timings.
+
+    progress, if given, is called with the elapsed seconds about every 30 seconds.
+    """
+    start = time.monotonic()
+    timings = {'ready': False, 'started': time.time(), 'attempts': 0}
+    checks = {'container': container_running, 'port': port_open, 'rdp': rdp_ready}
+    phase = 0
+    delay = initial_delay
+    next_progress = 30
+    while True:
+        timings['attempts'] += 1
+        # A phase that passes moves straight on to the next one without sleeping
+        while phase < len(PHASES) and checks[PHASES[phase]]():
+            timings[PHASES[phase]] = round(time.monotonic() - start, 2)
+            phase += 1
+            delay = initial_delay
+        elapsed = time.monotonic() - start
+        if phase == len(PHASES):
+            timings['ready'] = True
+            break
+        if elapsed >= timeout:
+            break
+        if progress and elapsed >= next_progress:
+            progress(int(elapsed))
+            next_progress += 30
+        time.sleep(min(delay, max(timeout - elapsed, 0)))
+        delay = min(delay * 1.5, max_delay)
+    timings['total'] = round(time.monotonic() - start, 2)
+    save_timings(timings)
+    return timings
+
+def format_timings(timings):
+    parts = [f"ready={'true' if timings.get('ready') else 'false'}"]
+    parts += [f"{phase}={timings[phase]}" for phase in PHASES if phase in timings]
+    parts.append(f"attempts={timings.get('attempts', 0)}")
+    return ' '.join(parts)
+
+def main():
+    parser = argparse.ArgumentParser(description="Wait until Windows in the LinOffice container accepts RDP sessions.")
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--quiet', action='store_true', help="do not print progress messages")
+    args = parser.parse_args()
+
+    def progress(elapsed):
+        print(f"Still waiting for Windows to be ready... ({elapsed} seconds elapsed)", file=sys.stderr, flush=True)
+
+    timings = wait_ready(args.timeout, None if args.quiet else progress)
+    print(format_timings(timings))
+    return 0 if timings['ready'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
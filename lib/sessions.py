@@ -0,0 +1,106 @@
+# This Python file uses the following encoding: utf-8
+"""Registry of running linoffice.sh instances and FreeRDP sessions.
+
+One line per entry in SESSIONS_PATH, tab separated:
+    ID  PID  FREERDP_PID  OFFICE_APP  START_TIME  ARGS
+PID is the process keeping the entry alive: the linoffice.sh instance, or FreeRDP itself for
+sessions run by the launcher daemon. Entries whose PID is gone are dropped by the next query.
+
+Changes are made while holding an flock on SESSIONS_LOCK_PATH (the same lock linoffice.sh takes
+in waWithRegistryLock) and the file is replaced atomically, so it can be read without the lock.
+"""
+import fcntl
+import os
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from common import APPDATA_PATH
+
+SESSIONS_PATH = os.path.join(APPDATA_PATH, 'sessions')
+SESSIONS_LOCK_PATH = os.path.join(APPDATA_PATH, 'sessions.lock')
+
+Entry = namedtuple('Entry', 'id pid freerdp_pid office start_time args')
+
+def new_entry(entry_id, pid, freerdp_pid=-1, office=False, args=''):
+    return Entry(entry_id, int(pid), int(freerdp_pid), bool(office), int(time.time()), args)
+
+def _alive(pid):
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _parse(line):
+    fields = line.rstrip('\n').split('\t')
+    if len(fields) < 5:
+        return None
+    try:
+        return Entry(fields[0], int(fields[1]), int(fields[2]), fields[3] == 'true', int(fields[4]),
+                     fields[5] if len(fields) > 5 else '')
+    except ValueError:
+        return None
+
+def _format(entry):
+    args = entry.args.replace('\t', ' ').replace('\n', ' ')
+    return f"{entry.id}\t{entry.pid}\t{entry.freerdp_pid}\t{str(entry.office).lower()}\t{entry.start_time}\t{args}\n"
+
+@contextmanager
+def locked():
+    """Hold the registry lock."""
+    os.makedirs(APPDATA_PATH, exist_ok=True)
+    with open(SESSIONS_LOCK_PATH, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def read():
+    """All entries as they are on disk, without locking or pruning."""
+    try:
+        with open(SESSIONS_PATH) as f:
+            return [entry for entry in map(_parse, f) if entry]
+    except OSError:
+        return []
+
+def _write(entries):
+    tmp_path = f"{SESSIONS_PATH}.{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        f.writelines(_format(entry) for entry in entries)
+    os.replace(tmp_path, SESSIONS_PATH)
+
+def register(entry):
+    """Add an entry, replacing one with the same ID."""
+    with locked():
+        _write([e for e in read() if e.id != entry.id] + [entry])
+
+def unregister(entry_id):
+    with locked():
+        entries = read()
+        remaining = [e for e in entries if e.id != entry_id]
+        if len(remaining) != len(entries):
+            _write(remaining)
+
+def active():
+    """Entries whose owner is still running (dead ones are removed from the registry)."""
+    with locked():
+        entries = read()
+        alive = [e for e in entries if _alive(e.pid)]
+        if len(alive) != len(entries):
+            _write(alive)
+    return alive
+
+def freerdp_sessions(prune=True):
+    """Entries with a running FreeRDP process.
+
+    prune=False only reads the registry, without taking the lock or removing dead entries
+    (for display, e.g. in the GUI thread).
+    """
+    entries = active() if prune else [e for e in read() if _alive(e.pid)]
+    return [e for e in entries if _alive(e.freerdp_pid)]
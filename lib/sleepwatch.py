@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# This Python file uses the following encoding: utf-8
+"""Time sync of the Windows VM right after the host wakes up from suspend.
+
+Listens for the PrepareForSleep signal of systemd-logind (false = the system has just resumed)
+with 'gdbus monitor', or 'dbus-monitor' if gdbus is not installed, and then creates SLEEP_MARKER,
+which config/oem/TimeSync.ps1 in Windows picks up to resync its clock.
+
+If neither tool is available, or while the listener is being restarted, the watcher does what
+waTimeSync in linoffice.sh does on each launch, but every UPTIME_CHECK_INTERVAL seconds: it
+compares how far the clock and /proc/uptime advanced (uptime stands still while the host sleeps).
+Launches through the daemon do not run linoffice.sh, so this cannot be left to it.
+
+While the watcher runs, SLEEPWATCH_PID_PATH holds the pid of its process and waTimeSync skips
+its own check.
+
+The bus can be overridden with LINOFFICE_SLEEP_BUS (a D-Bus address, e.g. of a test bus).
+
+Runs inside the launcher daemon (linofficed.py), or standalone: sleepwatch.py
+"""
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from common import APPDATA_PATH, dprint
+
+SLEEP_MARKER = os.path.join(APPDATA_PATH, 'sleep_marker')  # make sure this is the same as in linoffice.sh and TimeSync.ps1
+SLEEPWATCH_PID_PATH = os.path.join(APPDATA_PATH, 'sleepwatch.pid')
+SLEEP_DETECT_PATH = os.path.join(APPDATA_PATH, 'last_activity')  # shared with waTimeSync in linoffice.sh
+
+# Fallback without a listener: how often the uptime is compared, and how large a gap counts as a sleep
+UPTIME_CHECK_INTERVAL = 30
+MIN_SLEEP_GAP = 30
+
+LOGIN1_NAME = 'org.freedesktop.login1'
+LOGIN1_PATH = '/org/freedesktop/login1'
+LOGIN1_INTERFACE = 'org.freedesktop.login1.Manager'
+
+# Seconds before the listener is restarted after it exited (e.g. the bus was restarted), doubled up to the maximum
+RESTART_DELAY = 5
+MAX_RESTART_DELAY = 300
+
+# gdbus:        /org/freedesktop/login1: org.freedesktop.login1.Manager.PrepareForSleep (false,)
+GDBUS_SIGNAL_RE = re.compile(r'\.PrepareForSleep \((true|false),\)')
+# dbus-monitor: "signal ... member=PrepareForSleep", then "   boolean false" on the next line
+DBUS_MONITOR_VALUE_RE = re.compile(r'^\s*boolean (true|false)')
+
+def monitor_commands(address=None):
+    """The listener commands to try, in order of preference."""
+    bus = ['--address', address] if address else ['--system']
+    return [
+        ['gdbus', 'monitor', *bus, '--dest', LOGIN1_NAME, '--object-path', LOGIN1_PATH],
+        ['dbus-monitor', *bus,
+         f"type='signal',sender='{LOGIN1_NAME}',interface='{LOGIN1_INTERFACE}',member='PrepareForSleep'"],
+    ]
+
+def check_uptime_gap():
+    """Seconds the host slept since the last check (like waTimeSync in linoffice.sh), and remember this check."""
+    now = int(time.time())
+    with open('/proc/uptime', 'r') as f:
+        uptime = int(float(f.read().split()[0]))
+    gap = 0
+    try:
+        with open(SLEEP_DETECT_PATH, 'r') as f:
+            lines = f.read().split()
+        stored_time, stored_uptime = int(lines[0]), int(lines[-1])
+        if stored_time > 0 and stored_uptime > 0:
+            gap = stored_uptime + now - stored_time - uptime
+    except (OSError, ValueError, IndexError):
+        pass
+    with open(SLEEP_DETECT_PATH, 'w') as f:
+        f.write(f"{now}\n{uptime}\n")
+    return gap
+
+class SleepWatcher(threading.Thread):
+    def __init__(self, address=None):
+        super().__init__(daemon=True)
+        self.address = address or os.environ.get('LINOFFICE_SLEEP_BUS') or None
+        self.process = None
+        self._stopped = threading.Event()
+
+    def sleeping(self):
+        dprint("SLEEPWATCH: HOST IS GOING TO SLEEP")
+
+    def resumed(self):
+        try:
+            with open(SLEEP_MARKER, 'a'):
+                pass
+        except OSError as e:
+            dprint(f"SLEEPWATCH: COULD NOT CREATE SLEEP MARKER ({e})", level='WARN')
+            return
+        dprint("SLEEPWATCH: HOST RESUMED FROM SLEEP. CREATED SLEEP MARKER TO SYNC WINDOWS TIME.", level='INFO')
+
+    def handle_line(self, line, expect_value):
+        """Handle one line of monitor output; returns whether the next line carries the value (dbus-monitor)."""
+        match = GDBUS_SIGNAL_RE.search(line)
+        if not match and expect_value:
+            match = DBUS_MONITOR_VALUE_RE.match(line)
+        if match:
+            if match.group(1) == 'true':
+                self.sleeping()
+            else:
+                self.resumed()
+            return False
+        return 'member=PrepareForSleep' in line
+
+    def _start_monitor(self):
+        for command in monitor_commands(self.address):
+            if not shutil.which(command[0]):
+                continue
+            try:
+                return subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, text=True, bufsize=1)
+            except OSError:
+                continue
+        return None
+
+    def _poll_uptime(self, duration=None):
+        """Check for a missed sleep every UPTIME_CHECK_INTERVAL seconds, for duration seconds (None: until stopped)."""
+        self._write_pid()
+        deadline = None if duration is None else time.monotonic() + duration
+        while not self._stopped.is_set():
+            try:
+                gap = check_uptime_gap()
+            except OSError:
+                gap = 0
+            if gap > MIN_SLEEP_GAP and not os.path.exists(SLEEP_MARKER):
+                dprint(f"SLEEPWATCH: UPTIME GAP OF {gap} SECONDS")
+                self.resumed()
+            wait = UPTIME_CHECK_INTERVAL
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return
+            self._stopped.wait(wait)
+
+    def _write_pid(self):
+        with open(SLEEPWATCH_PID_PATH, 'w') as f:
+            f.write(f"{os.getpid()}\n")
+
+    def _remove_pid(self):
+        try:
+            os.remove(SLEEPWATCH_PID_PATH)
+        except OSError:
+            pass
+
+    def run(self):
+        try:
+            self._run()
+        finally:
+            self._remove_pid()
+
+    def _run(self):
+        delay = RESTART_DELAY
+        while not self._stopped.is_set():
+            self.process = self._start_monitor()
+            if self.process is None:
+                dprint(f"SLEEPWATCH: NEITHER GDBUS NOR DBUS-MONITOR AVAILABLE, CHECKING THE UPTIME EVERY {UPTIME_CHECK_INTERVAL} SECONDS", level='WARN')
+                self._poll_uptime()
+                return
+            if self._stopped.is_set():
+                # stop() came while the listener was starting
+                self.process.terminate()
+                self.process.wait()
+                return
+            self._write_pid()
+            dprint(f"SLEEPWATCH: LISTENING FOR PREPAREFORSLEEP ({self.process.args[0]})")
+            expect_value = False
+            received = False
+            for line in self.process.stdout:
+                received = True
+                expect_value = self.handle_line(line, expect_value)
+            self.process.wait()
+            if self._stopped.is_set():
+                break
+            # A monitor that printed something was connected, so restart it quickly
+            delay = RESTART_DELAY if received else min(delay * 2, MAX_RESTART_DELAY)
+            dprint(f"SLEEPWATCH: LISTENER EXITED WITH STATUS {self.process.returncode}, RESTARTING IN {delay} SECONDS", level='WARN')
+            # A sleep in the meantime must not go unnoticed
+            self._poll_uptime(delay)
+
+    def stop(self):
+        self._stopped.set()
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+        self._remove_pid()
+
+def main():
+    os.makedirs(APPDATA_PATH, exist_ok=True)
+    watcher = SleepWatcher()
+    signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: watcher.stop())
+    watcher.start()
+    watcher.join()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
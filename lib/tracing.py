@@ -0,0 +1,131 @@
+# This Python file uses the following encoding: utf-8
+"""Timed phases of each launch, for finding out where the time goes.
+
+linoffice.sh (waSpanBegin/waSpanEnd) and the launcher daemon append one JSON object per
+finished phase to TRACE_PATH:
+    {"run": "12345", "source": "daemon", "command": "excel", "span": "resume", "start": 1700000000.123456, "duration": 2.5}
+
+All phases of one launch share the run id: the daemon passes its run id to linoffice.sh in
+LINOFFICE_RUNID when it delegates a launch or runs the cleanup afterwards. load_launches()
+groups the phases by run for the GUI.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from common import APPDATA_PATH
+
+TRACE_PATH = os.path.join(APPDATA_PATH, 'launch_trace.jsonl')
+# Once the file is larger than this, only the newer half is kept
+MAX_TRACE_SIZE = 512 * 1024
+
+PHASES = ('config', 'freerdp_detect', 'compose', 'container_state', 'resume', 'readiness', 'freerdp_spawn', 'cleanup')
+PHASE_NAMES = {
+    'config': "Load configuration",
+    'freerdp_detect': "Detect FreeRDP",
+    'compose': "Find podman-compose",
+    'container_state': "Check container state",
+    'resume': "Resume or boot Windows",
+    'readiness': "Wait for Windows",
+    'freerdp_spawn': "Start FreeRDP",
+    'cleanup': "Cleanup after closing",
+}
+# Phases that happen after the app was started and do not count towards the launch time
+AFTER_LAUNCH = ('cleanup',)
+
+_write_lock = threading.Lock()
+
+def _trim(path):
+    try:
+        with open(path, 'rb') as f:
+            f.seek(-MAX_TRACE_SIZE // 2, os.SEEK_END)
+            f.readline()  # drop the partial line
+            tail = f.read()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(tail)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def record(run, span, start, duration, command='', source='daemon', path=TRACE_PATH):
+    """Append one finished phase."""
+    line = json.dumps({
+        'run': str(run), 'source': source, 'command': command, 'span': span,
+        'start': round(start, 6), 'duration': round(duration, 6),
+    }) + '\n'
+    with _write_lock:
+        try:
+            # One short O_APPEND write, so lines from linoffice.sh and the daemon do not interleave
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line.encode())
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+        except OSError:
+            return
+        if size > MAX_TRACE_SIZE:
+            _trim(path)
+
+class Tracer:
+    """Records the phases of one launch: with tracer.span('resume'): ..."""
+
+    def __init__(self, run, command='', source='daemon'):
+        self.run = run
+        self.command = command
+        self.source = source
+
+    @contextmanager
+    def span(self, name):
+        start = time.time()
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            record(self.run, name, start, time.perf_counter() - began, self.command, self.source)
+
+def _read_tail(path, size):
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(max(end - size, 0))
+        if end > size:
+            f.readline()
+        return f.read().decode('utf-8', errors='replace').splitlines()
+
+def load_launches(limit=20, path=TRACE_PATH):
+    """The last `limit` runs, newest first, as dicts with the phase durations summed per phase."""
+    try:
+        lines = _read_tail(path, MAX_TRACE_SIZE)
+    except OSError:
+        return []
+    runs = {}
+    for line in lines:
+        try:
+            entry = json.loads(line)
+            run, span = str(entry['run']), str(entry['span'])
+            start, duration = float(entry['start']), float(entry['duration'])
+        except (ValueError, KeyError, TypeError):
+            continue
+        launch = runs.get(run)
+        if launch is None:
+            # Reinserting keeps the runs ordered by their latest phase
+            launch = {'run': run, 'command': '', 'start': start, 'end': start, 'phases': {}, 'sources': set()}
+        else:
+            del runs[run]
+        runs[run] = launch
+        if start < launch['start'] or not launch['command']:
+            launch['command'] = entry.get('command') or launch['command']
+        launch['start'] = min(launch['start'], start)
+        launch['phases'][span] = launch['phases'].get(span, 0.0) + duration
+        launch['sources'].add(entry.get('source', ''))
+        if span not in AFTER_LAUNCH:
+            launch['end'] = max(launch['end'], start + duration)
+    launches = list(runs.values())[-limit:]
+    launches.reverse()
+    for launch in launches:
+        launch['total'] = launch['end'] - launch['start']
+    return launches
@@ -22,24 +22,57 @@ readonly LASTRUN_PATH="${APPDATA_PATH}/lastrun"
 readonly SLEEP_DETECT_PATH="${APPDATA_PATH}/last_activity"
 readonly SLEEP_MARKER="${APPDATA_PATH}/sleep_marker"
 readonly LOG_PATH="${APPDATA_PATH}/linoffice.log"
+readonly LOG_ROTATE_LOCK="${APPDATA_PATH}/linoffice.log.lock"
+readonly LOG_MAX_SIZE=$((2 * 1024 * 1024)) # linoffice.log is rotated once it is larger
+readonly LOG_KEEP=3 # compressed old logs: linoffice.log.1.gz ... linoffice.log.3.gz
+readonly LOG_BATCH=32 # records buffered before they are written
+# Log levels, as for LOG_LEVEL in linoffice.conf (keep in sync with LOG_LEVELS in lib/common.py)
+declare -rA LOG_LEVELS=([DEBUG]=10 [INFO]=20 [WARN]=30 [ERROR]=40)
+readonly FREERDP_CACHE_PATH="${APPDATA_PATH}/freerdp_cache"
+readonly LOCKFILE_INDEX_PATH="${APPDATA_PATH}/lockfile_index" # maintained by lib/lockwatch.py
+readonly LOCKWATCH_PID_PATH="${APPDATA_PATH}/lockwatch.pid"
+readonly SLEEPWATCH_PID_PATH="${APPDATA_PATH}/sleepwatch.pid" # written while lib/sleepwatch.py listens for suspend/resume
+readonly TRACE_PATH="${APPDATA_PATH}/launch_trace.jsonl" # timed phases of each launch, see lib/tracing.py
 readonly CONFIG_PATH="$(realpath "${SCRIPT_DIR_PATH}/config/linoffice.conf")"
 readonly COMPOSE_PATH="$(realpath "${SCRIPT_DIR_PATH}/config/compose.yaml")"
 
 # MULTI-INSTANCE COORDINATION - NEW
 readonly INSTANCE_ID="${RANDOM}_$$"
-readonly INSTANCES_DIR="${APPDATA_PATH}/instances"
-readonly INSTANCE_FILE="${INSTANCES_DIR}/${INSTANCE_ID}"
+readonly SESSIONS_PATH="${APPDATA_PATH}/sessions" # registry of instances and FreeRDP sessions, see lib/sessions.py
+readonly SESSIONS_LOCK="${APPDATA_PATH}/sessions.lock"
 readonly MASTER_LOCK="${APPDATA_PATH}/cleanup.lock"
 
 # OTHER
 readonly CONTAINER_NAME="LinOffice"
 readonly RDP_IP="127.0.0.1"
 readonly RDP_PORT="3388"
-readonly RUNID="${RANDOM}"
+# libpod REST API socket (see lib/podman_api.py); the podman CLI is used if it is not there
+if [ -n "$LINOFFICE_PODMAN_SOCKET" ]; then
+    readonly PODMAN_SOCKET="$LINOFFICE_PODMAN_SOCKET"
+elif [[ "$CONTAINER_HOST" == unix://* ]]; then
+    readonly PODMAN_SOCKET="${CONTAINER_HOST#unix://}"
+else
+    readonly PODMAN_SOCKET="${XDG_RUNTIME_DIR:-/run/user/$(id -u)}/podman/podman.sock"
+fi
+# The launcher daemon passes its run id, so the phases it traces and ours end up in the same launch
+if [[ "$LINOFFICE_RUNID" =~ ^[0-9]+$ ]]; then
+    readonly RUNID="$LINOFFICE_RUNID"
+else
+    readonly RUNID="${RANDOM}"
+fi
 readonly WAFLAVOR="podman"
 COMPOSE_COMMAND="podman-compose"
 
 ### GLOBAL VARIABLES ###
+# LAUNCH TRACING (empty TRACE_COMMAND = this run is not traced)
+TRACE_COMMAND=""
+declare -A SPAN_STARTS=()
+NOW_US=0
+# LOGGING (records wait in LOG_BUFFER until waLogFlush writes them to LOG_FD)
+LOG_FD=""
+LOG_SIZE=0 # size of the log file as far as this script knows
+LOG_BUFFER=""
+LOG_BUFFERED=0
 # WINAPPS CONFIGURATION FILE
 RDP_USER="MyWindowsUser"
 RDP_PASS="MyWindowsPassword"
@@ -52,6 +85,7 @@ AUTOPAUSE="on"
 AUTOPAUSE_TIME="300"
 HIDEF="on"
 DEBUG="true"
+LOG_LEVEL="INFO"
 CLEANUP_TIME_WINDOW=86400  # Default: 24 hours. Do not delete Office lock files older than 24 hours, to avoid deleting pre-existing files.
 
 # OTHER
@@ -118,9 +152,104 @@ waThrowExit() {
 }
 
 # Name: 'dprint'
-# Role: Conditionally print debug messages to a log file, creating it if it does not exist.
+# Role: Log a debug message; messages starting with 'ERROR:' or 'WARNING:' are logged at that level.
 function dprint() {
-    [ "$DEBUG" = "true" ] && echo "[$(date)-$RUNID] $1" >>"$LOG_PATH"
+    case "$1" in
+    ERROR:*) waLog ERROR "${1#ERROR: }" ;;
+    WARNING:*) waLog WARN "${1#WARNING: }" ;;
+    *) waLog DEBUG "$1" ;;
+    esac
+}
+# Name: 'waLog'
+# Role: Buffer a record of level $1 (DEBUG, INFO, WARN or ERROR) for the log file if DEBUG is on and the level is at least LOG_LEVEL.
+function waLog() {
+    [ "$DEBUG" = "true" ] || return 0
+    local LEVEL="$1"
+    local THRESHOLD="${LOG_LEVEL^^}"
+    (( ${LOG_LEVELS[$LEVEL]:-10} >= ${LOG_LEVELS[${THRESHOLD:-INFO}]:-20} )) || return 0
+    local TIMESTAMP
+    # Formatted by bash itself, without starting 'date'
+    printf -v TIMESTAMP '%(%a %b %d %H:%M:%S %Z %Y)T' -1
+    LOG_BUFFER+="[${TIMESTAMP}-${RUNID}] ${LEVEL}: $2"$'\n'
+    LOG_BUFFERED=$((LOG_BUFFERED + 1))
+    # Subshells (command substitutions, background jobs) cannot hand their buffer back, so they write right away
+    if [ "$BASHPID" != "$$" ] || (( LOG_BUFFERED >= LOG_BATCH || ${LOG_LEVELS[$LEVEL]:-10} >= ${LOG_LEVELS[WARN]} )); then
+        waLogFlush
+    fi
+}
+# Name: 'waLogFlush'
+# Role: Write the buffered log records with a single write to the log file.
+function waLogFlush() {
+    [ -n "$LOG_BUFFER" ] || return 0
+    # Reopen the log after it was rotated (test builtin, no stat process)
+    if [ -z "$LOG_FD" ] || ! [ "/dev/fd/$LOG_FD" -ef "$LOG_PATH" ]; then
+        [ -n "$LOG_FD" ] && exec {LOG_FD}>&-
+        waLogOpen || { LOG_BUFFER=""; LOG_BUFFERED=0; return 0; }
+    fi
+    printf '%s' "$LOG_BUFFER" >&"$LOG_FD"
+    LOG_SIZE=$((LOG_SIZE + ${#LOG_BUFFER}))
+    LOG_BUFFER=""
+    LOG_BUFFERED=0
+    # Rotate on the next flush
+    if (( LOG_SIZE > LOG_MAX_SIZE )); then
+        exec {LOG_FD}>&-
+        LOG_FD=""
+    fi
+}
+# Name: 'waLogOpen'
+# Role: Open the log file for appending on LOG_FD, rotating it first if it is too large.
+function waLogOpen() {
+    [ -d "$APPDATA_PATH" ] || mkdir -p "$APPDATA_PATH"
+    waLogRotate
+    { exec {LOG_FD}>>"$LOG_PATH"; } 2>/dev/null
+}
+# Name: 'waLogRotate'
+# Role: Move a log file larger than LOG_MAX_SIZE to linoffice.log.1 and compress it in the background (same lock and names as rotate_log in lib/common.py).
+function waLogRotate() {
+    local SIZE
+    LOG_SIZE=0
+    SIZE=$(stat -c %s "$LOG_PATH" 2>/dev/null) || return 0
+    LOG_SIZE=$SIZE
+    (( SIZE > LOG_MAX_SIZE )) || return 0
+    LOG_SIZE=0
+    (
+        flock -n 9 || exit 0
+        # Rotated by someone else in the meantime
+        SIZE=$(stat -c %s "$LOG_PATH" 2>/dev/null) || exit 0
+        (( SIZE > LOG_MAX_SIZE )) || exit 0
+        local N
+        for (( N = LOG_KEEP - 1; N > 0; N-- )); do
+            [ -f "${LOG_PATH}.${N}.gz" ] && mv -f "${LOG_PATH}.${N}.gz" "${LOG_PATH}.$((N + 1)).gz"
+        done
+        mv -f "$LOG_PATH" "${LOG_PATH}.1" && ( gzip -f "${LOG_PATH}.1" & )
+    ) 9>"$LOG_ROTATE_LOCK"
+}
+# Name: 'waNow'
+# Role: Set NOW_US to the current time in microseconds ($EPOCHREALTIME, no fork on bash >= 5).
+function waNow() {
+    local NOW="${EPOCHREALTIME:-}"
+    [ -n "$NOW" ] || NOW="$(date +%s.%6N)"
+    # The decimal separator follows the locale
+    NOW_US="${NOW/[.,]/}"
+}
+# Name: 'waSpanBegin'
+# Role: Remember the start of a traced phase of this launch.
+function waSpanBegin() {
+    [ -n "$TRACE_COMMAND" ] || return 0
+    waNow
+    SPAN_STARTS[$1]="$NOW_US"
+}
+# Name: 'waSpanEnd'
+# Role: Append a finished phase to TRACE_PATH (same format as lib/tracing.py).
+function waSpanEnd() {
+    local START="${SPAN_STARTS[$1]:-}"
+    [ -n "$START" ] || return 0
+    unset 'SPAN_STARTS[$1]'
+    waNow
+    local DURATION=$((10#$NOW_US - 10#$START))
+    printf '{"run": "%s", "source": "linoffice.sh", "command": "%s", "span": "%s", "start": %d.%06d, "duration": %d.%06d}\n' \
+        "$RUNID" "$TRACE_COMMAND" "$1" $((10#$START / 1000000)) $((10#$START % 1000000)) \
+        $((DURATION / 1000000)) $((DURATION % 1000000)) >>"$TRACE_PATH" 2>/dev/null
 }
 # Name: 'waFixRemovableMedia'
 # Role: If user left REMOVABLE_MEDIA config null,fallback to /run/media for udisks defaults ,warning.
@@ -132,68 +261,90 @@ function waFixRemovableMedia() {
     fi
 }
 
-# Name: 'waAcquireLock'
-# Role: Acquire lock with timeout, used for Office lock file cleanup
-waAcquireLock() {
-    local lock_file="$1"
-    local timeout="${2:-5}"
-    local elapsed=0
-    
-    while [ $elapsed -lt $timeout ]; do
-        if (set -C; echo $$ > "$lock_file") 2>/dev/null; then
-            return 0
-        fi
-        
-        # Check if lock holder is still alive
-        if [ -f "$lock_file" ]; then
-            local lock_pid=$(cat "$lock_file" 2>/dev/null)
-            if [ -n "$lock_pid" ] && ! kill -0 "$lock_pid" 2>/dev/null; then
-                # Stale lock, remove it
-                rm -f "$lock_file" 2>/dev/null
-                continue
-            fi
-        fi
-        
-        sleep 1
-        elapsed=$((elapsed + 1))
-    done
-    
-    return 1
+# Name: 'waWithRegistryLock'
+# Role: Run a command while holding the session registry lock (flock, shared with lib/sessions.py)
+waWithRegistryLock() {
+    local lock_fd
+    local status
+
+    exec {lock_fd}>>"$SESSIONS_LOCK"
+    flock -x "$lock_fd"
+    "$@"
+    status=$?
+    exec {lock_fd}>&-
+    return $status
 }
 
-# Name: 'waReleaseLock'
-# Role: Release previously acquired lock, used for Office lock file cleanup
-waReleaseLock() {
-    local lock_file="$1"
-    local lock_pid=$(cat "$lock_file" 2>/dev/null)
-    
-    # Only remove if we own the lock
-    if [ "$lock_pid" = "$$" ]; then
-        rm -f "$lock_file" 2>/dev/null
+# Name: 'waRegistrySet'
+# Role: Add or replace the registry entry of this instance (caller holds the registry lock). The file is replaced atomically so it can be read without the lock.
+waRegistrySet() {
+    local tmp_file="${SESSIONS_PATH}.$$"
+    local args="${SCRIPT_ARGS//[$'\t\n']/ }"
+
+    {
+        [ -f "$SESSIONS_PATH" ] && awk -F '\t' -v id="$INSTANCE_ID" '$1 != id' "$SESSIONS_PATH"
+        printf '%s\t%s\t%s\t%s\t%s\t%s\n' "$INSTANCE_ID" "$$" "$FREERDP_PID" "$IS_OFFICE_WXP_APP" "$SCRIPT_START_TIME" "$args"
+    } > "$tmp_file" && mv -f "$tmp_file" "$SESSIONS_PATH"
+}
+
+# Name: 'waRegistryRemove'
+# Role: Remove the registry entry of this instance (caller holds the registry lock)
+waRegistryRemove() {
+    local tmp_file="${SESSIONS_PATH}.$$"
+
+    [ -f "$SESSIONS_PATH" ] || return 0
+    awk -F '\t' -v id="$INSTANCE_ID" '$1 != id' "$SESSIONS_PATH" > "$tmp_file" && mv -f "$tmp_file" "$SESSIONS_PATH"
+}
+
+# Name: 'waRegistryActive'
+# Role: Drop registry entries whose process is gone and print the remaining ones (caller holds the registry lock)
+waRegistryActive() {
+    local tmp_file="${SESSIONS_PATH}.$$"
+    local id pid freerdp_pid office start_time args
+    local pruned=false
+
+    [ -f "$SESSIONS_PATH" ] || return 0
+    : > "$tmp_file"
+    while IFS=$'\t' read -r id pid freerdp_pid office start_time args; do
+        [ -n "$id" ] || continue
+        if kill -0 "$pid" 2>/dev/null; then
+            printf '%s\t%s\t%s\t%s\t%s\t%s\n' "$id" "$pid" "$freerdp_pid" "$office" "$start_time" "$args" >> "$tmp_file"
+        else
+            pruned=true
+        fi
+    done < "$SESSIONS_PATH"
+
+    if [ "$pruned" = true ]; then
+        mv -f "$tmp_file" "$SESSIONS_PATH"
+    else
+        rm -f "$tmp_file"
     fi
+    cat "$SESSIONS_PATH"
+}
+
+# Name: 'waFreeRDPPids'
+# Role: Print the PIDs of the running FreeRDP sessions of all instances
+waFreeRDPPids() {
+    local id pid freerdp_pid office start_time args
+
+    while IFS=$'\t' read -r id pid freerdp_pid office start_time args; do
+        if [ "$freerdp_pid" -gt 0 ] 2>/dev/null && kill -0 "$freerdp_pid" 2>/dev/null; then
+            echo "$freerdp_pid"
+        fi
+    done < <(waWithRegistryLock waRegistryActive)
 }
 
 # Name: 'waRegisterInstance'
 # Role: Register this script instance, used for Office lock file cleanup
 waRegisterInstance() {
-    mkdir -p "$INSTANCES_DIR"
-    
-    # Create instance file with metadata
-    cat > "$INSTANCE_FILE" << EOF
-PID=$$
-START_TIME=$SCRIPT_START_TIME
-SCRIPT_ARGS=$*
-OFFICE_APP=$IS_OFFICE_WXP_APP
-FREERDP_PID=$FREERDP_PID
-EOF
-    
+    waWithRegistryLock waRegistrySet
     dprint "REGISTERED INSTANCE: $INSTANCE_ID"
 }
 
 # Name: 'waUnregisterInstance'
 # Role: Unregister this script instance, used for Office lock file cleanup
 waUnregisterInstance() {
-    rm -f "$INSTANCE_FILE" 2>/dev/null
+    waWithRegistryLock waRegistryRemove
     dprint "UNREGISTERED INSTANCE: $INSTANCE_ID"
 }
 
@@ -201,27 +352,23 @@ waUnregisterInstance() {
 # Role: Check if master cleanup should run, used for Office lock file cleanup
 waCheckMasterCleanup() {
     local force_cleanup="$1"
-    
-    if waAcquireLock "$MASTER_LOCK" 10; then
+    local cleanup_fd
+
+    # Only one instance cleans up at a time; registering and unregistering is not blocked by this
+    exec {cleanup_fd}>>"$MASTER_LOCK"
+    if flock -w 10 "$cleanup_fd"; then
         dprint "ACQUIRED MASTER CLEANUP LOCK"
         
         local active_instances=0
         local office_instances=0
+        local id pid freerdp_pid office start_time args
         
-        if [ -d "$INSTANCES_DIR" ]; then
-            for instance_file in "$INSTANCES_DIR"/*; do
-                [ -f "$instance_file" ] || continue
-                local instance_pid=$(grep "^PID=" "$instance_file" 2>/dev/null | cut -d= -f2)
-                if [ -n "$instance_pid" ] && kill -0 "$instance_pid" 2>/dev/null; then
-                    active_instances=$((active_instances + 1))
-                    if grep -q "^OFFICE_APP=true" "$instance_file" 2>/dev/null; then
-                        office_instances=$((office_instances + 1))
-                    fi
-                else
-                    rm -f "$instance_file" 2>/dev/null
-                fi
-            done
-        fi
+        while IFS=$'\t' read -r id pid freerdp_pid office start_time args; do
+            active_instances=$((active_instances + 1))
+            if [ "$office" = "true" ]; then
+                office_instances=$((office_instances + 1))
+            fi
+        done < <(waWithRegistryLock waRegistryActive)
         
         dprint "ACTIVE INSTANCES: $active_instances, OFFICE INSTANCES: $office_instances"
         
@@ -234,11 +381,10 @@ waCheckMasterCleanup() {
                 waMasterCleanup "$office_instances" "false"
             fi
         fi
-        
-        waReleaseLock "$MASTER_LOCK"
     else
         dprint "COULD NOT ACQUIRE MASTER CLEANUP LOCK - ANOTHER INSTANCE CLEANING UP"
     fi
+    exec {cleanup_fd}>&-
 }
 
 # Name: 'waMasterCleanup'
@@ -249,8 +395,6 @@ waMasterCleanup() {
     
     dprint "RUNNING MASTER CLEANUP (Force: $force_cleanup)"
     
-    rm -f "${APPDATA_PATH}"/FreeRDP_Process_*.cproc 2>/dev/null
-    
     if [ "$office_instances" -gt 0 ] || [ "$force_cleanup" = "true" ]; then
         dprint "RUNNING OFFICE CLEANUP"
         if [ "$force_cleanup" = "true" ]; then
@@ -260,9 +404,39 @@ waMasterCleanup() {
         fi
     fi
     
-    rmdir "$INSTANCES_DIR" 2>/dev/null
-    
-    dprint "MASTER CLEANUP COMPLETED"
+    waLog INFO "MASTER CLEANUP COMPLETED"
+}
+
+# Name: 'waListOfficeLockFiles'
+# Role: Print the Office lock files below the given folders, NUL-separated. Uses the index kept by lib/lockwatch.py if the watcher is running and covers all folders, otherwise scans them.
+waListOfficeLockFiles() {
+    local watcher_pid=""
+    local watched_roots=()
+    if [ -f "$LOCKWATCH_PID_PATH" ]; then
+        { read -r watcher_pid; mapfile -t watched_roots; } < "$LOCKWATCH_PID_PATH"
+    fi
+
+    if [ -n "$watcher_pid" ] && kill -0 "$watcher_pid" 2>/dev/null && [ -f "$LOCKFILE_INDEX_PATH" ]; then
+        local path root covered
+        for path in "$@"; do
+            covered=false
+            for root in "${watched_roots[@]}"; do
+                [ "$root" = "$(realpath -m "$path")" ] && covered=true && break
+            done
+            if [ "$covered" = false ]; then
+                watcher_pid=""
+                break
+            fi
+        done
+        if [ -n "$watcher_pid" ]; then
+            dprint "USING LOCK FILE INDEX OF WATCHER $watcher_pid"
+            cat "$LOCKFILE_INDEX_PATH"
+            return
+        fi
+    fi
+
+    dprint "LOCK FILE INDEX NOT AVAILABLE, SCANNING ${*}"
+    find "$@" -type f \( -name '~$*.xlsx' -o -name '~$*.docx' -o -name '~$*.pptx' -o -name '~$*.xlsm' -o -name '~$*.docm' -o -name '~$*.pptm' \) -not -path '*/.*' -print0 2>/dev/null
 }
 
 # Name: 'waOfficeCleanup'
@@ -312,9 +486,9 @@ waOfficeCleanup() {
                 files_skipped=$((files_skipped + 1))
             fi
         fi
-    done < <(find "${find_paths[@]}" -type f \( -name '~$*.xlsx' -o -name '~$*.docx' -o -name '~$*.pptx' -o -name '~$*.xlsm' -o -name '~$*.docm' -o -name '~$*.pptm' \) -not -path '*/.*' -print0 2>/dev/null)
+    done < <(waListOfficeLockFiles "${find_paths[@]}")
     
-    dprint "OFFICE CLEANUP COMPLETED - $files_cleaned files cleaned, $files_skipped files skipped"
+    waLog INFO "OFFICE CLEANUP COMPLETED - $files_cleaned files cleaned, $files_skipped files skipped"
     echo -e "Office cleanup completed: $files_cleaned files cleaned, $files_skipped files skipped"
 
     # Update last cleanup timestamp
@@ -332,27 +506,20 @@ waWaitForAllProcesses() {
     dprint "WAITING FOR ALL FREERDP PROCESSES TO CLOSE"
     
     # First, try to find and kill any remaining FreeRDP processes
-    for proc_file in "${APPDATA_PATH}"/FreeRDP_Process_*.cproc; do
-        [ -f "$proc_file" ] || continue
-        local pid="$(basename "$proc_file" | sed 's/FreeRDP_Process_\(.*\)\.cproc/\1/')"
-        if [ -n "$pid" ] && kill -0 "$pid" 2>/dev/null; then
-            dprint "Found lingering FreeRDP process $pid, attempting to kill"
-            kill -TERM "$pid" 2>/dev/null
-            sleep 1
-            if kill -0 "$pid" 2>/dev/null; then
-                dprint "Process $pid still running, force killing"
-                kill -KILL "$pid" 2>/dev/null
-            fi
+    for pid in $(waFreeRDPPids); do
+        dprint "Found lingering FreeRDP process $pid, attempting to kill"
+        kill -TERM "$pid" 2>/dev/null
+        sleep 1
+        if kill -0 "$pid" 2>/dev/null; then
+            dprint "Process $pid still running, force killing"
+            kill -KILL "$pid" 2>/dev/null
         fi
-        rm -f "$proc_file" 2>/dev/null
     done 2>/dev/null
     
     # Then wait for any remaining processes to finish
-    while ls "${APPDATA_PATH}"/FreeRDP_Process_*.cproc &>/dev/null; do
+    while [ -n "$(waFreeRDPPids)" ]; do
         if [ $wait_elapsed -ge $max_wait_time ]; then
-            dprint "TIMEOUT WAITING FOR PROCESSES - FORCING CLEANUP"
-            # Force remove any remaining process files
-            rm -f "${APPDATA_PATH}"/FreeRDP_Process_*.cproc 2>/dev/null
+            waLog WARN "TIMEOUT WAITING FOR PROCESSES - FORCING CLEANUP"
             break
         fi
         
@@ -377,6 +544,9 @@ waCleanupInstance() {
     
     # Check if master cleanup should run
     waCheckMasterCleanup "false"
+
+    # Write what is still buffered
+    waLogFlush
 }
 
 # Name: 'waLastRun'
@@ -398,26 +568,64 @@ waLastRun() {
     dprint "THIS_RUN: ${CURR_RUN_UNIX_TIME}"
 }
 
+# Name: 'waWaitForWindows'
+# Role: Wait until Windows accepts RDP sessions, for up to $1 seconds. Uses lib/readiness.py (RDP handshake check with backoff) if python3 is available, otherwise polls the RDP port and waits $2 more seconds for the Windows services.
+waWaitForWindows() {
+    local max_wait_time="$1"
+    local settle_time="${2:-0}"
+    local readiness_script="${SCRIPT_DIR_PATH}/lib/readiness.py"
+    local wait_elapsed=0
+    local check_interval=5
+
+    waLogFlush
+
+    if command -v python3 &>/dev/null && [ -f "$readiness_script" ]; then
+        local timings
+        if timings=$(python3 "$readiness_script" --timeout "$max_wait_time"); then
+            dprint "WINDOWS READY ($timings)"
+            return 0
+        fi
+        waLog WARN "WINDOWS NOT READY ($timings)"
+        return 1
+    fi
+
+    while (( wait_elapsed < max_wait_time )); do
+        if [[ $(waContainerState) == "running" ]]; then
+            # Try to connect to RDP port to verify it's ready
+            if timeout 1 bash -c ">/dev/tcp/$RDP_IP/$RDP_PORT" 2>/dev/null; then
+                dprint "RDP PORT OPEN AFTER ${wait_elapsed}s"
+                if (( settle_time > 0 )); then
+                    echo -e "Waiting for Windows services to initialize..."
+                    sleep "$settle_time"
+                fi
+                return 0
+            fi
+        fi
+        sleep $check_interval
+        wait_elapsed=$((wait_elapsed + check_interval))
+        # Show progress every 30 seconds
+        if (( wait_elapsed % 30 == 0 )); then
+            echo -e "Still waiting for Windows to be ready... ($wait_elapsed seconds elapsed)"
+        fi
+    done
+    return 1
+}
+
 # Name: 'waResetSystem'
 # Role: Reset the system by killing all FreeRDP processes, running cleanup, and rebooting the Windows VM
 waResetSystem() {
-    dprint "STARTING SYSTEM RESET"
+    waLog INFO "STARTING SYSTEM RESET"
     
     # 1. Kill all FreeRDP processes
     dprint "KILLING ALL FREERDP PROCESSES"
-    for proc_file in "${APPDATA_PATH}"/FreeRDP_Process_*.cproc; do
-        [ -f "$proc_file" ] || continue
-        local pid="$(basename "$proc_file" | sed 's/FreeRDP_Process_\(.*\)\.cproc/\1/')"
-        if [ -n "$pid" ] && kill -0 "$pid" 2>/dev/null; then
-            dprint "Terminating FreeRDP process $pid"
-            kill -TERM "$pid" 2>/dev/null
-            sleep 1
-            if kill -0 "$pid" 2>/dev/null; then
-                dprint "Force killing FreeRDP process $pid"
-                kill -KILL "$pid" 2>/dev/null
-            fi
+    for pid in $(waFreeRDPPids); do
+        dprint "Terminating FreeRDP process $pid"
+        kill -TERM "$pid" 2>/dev/null
+        sleep 1
+        if kill -0 "$pid" 2>/dev/null; then
+            dprint "Force killing FreeRDP process $pid"
+            kill -KILL "$pid" 2>/dev/null
         fi
-        rm -f "$proc_file" 2>/dev/null
     done
     
     # 2. Run cleanup
@@ -430,33 +638,17 @@ waResetSystem() {
     "$COMPOSE_COMMAND" --file "$COMPOSE_PATH" restart &>/dev/null
     
     # Wait for container to restart
-    local max_wait_time=120
-    local wait_elapsed=0
-    local check_interval=5
-    
     dprint "WAITING FOR WINDOWS VM TO RESTART..."
-    while (( wait_elapsed < max_wait_time )); do
-        if [[ $("$WAFLAVOR" inspect --format='{{.State.Status}}' "$CONTAINER_NAME") == "running" ]]; then
-            if timeout 1 bash -c ">/dev/tcp/$RDP_IP/$RDP_PORT" 2>/dev/null; then
-                dprint "WINDOWS VM RESTARTED SUCCESSFULLY"
-                echo -e "Windows VM restarted successfully."
-                break
-            fi
-        fi
-        sleep $check_interval
-        wait_elapsed=$((wait_elapsed + check_interval))
-        if (( wait_elapsed % 30 == 0 )); then
-            echo -e "Still waiting for Windows VM to restart... ($((wait_elapsed/60)) minutes elapsed)"
-        fi
-    done
-    
-    if (( wait_elapsed >= max_wait_time )); then
-        dprint "TIMEOUT WAITING FOR WINDOWS VM TO RESTART"
+    if waWaitForWindows 120; then
+        dprint "WINDOWS VM RESTARTED SUCCESSFULLY"
+        echo -e "Windows VM restarted successfully."
+    else
+        waLog WARN "TIMEOUT WAITING FOR WINDOWS VM TO RESTART"
         echo -e "Timeout waiting for Windows VM to restart. Please check the container status."
         waThrowExit $EC_FAIL_START
     fi
     
-    dprint "SYSTEM RESET COMPLETED"
+    waLog INFO "SYSTEM RESET COMPLETED"
 }
 
 # Name: 'waFixScale'
@@ -502,6 +694,8 @@ function waLoadConfig() {
     else
         waThrowExit $EC_MISSING_CONFIG
     fi
+    # Earlier versions kept a cache of the expanded values (including RDP_PASS) readable by everyone
+    [ -e "${CONFIG_PATH}.cache" ] && rm -f "${CONFIG_PATH}.cache"
 
     # Update $RDP_SCALE.
     waFixScale
@@ -520,18 +714,58 @@ function waLoadConfig() {
     fi
 }
 
+# Name: 'waFreeRDPCacheKey'
+# Role: Print a fingerprint of the installed FreeRDP candidates (binary paths and mtimes, Flatpak installation state).
+function waFreeRDPCacheKey() {
+    # Declare variables.
+    local CANDIDATES=()
+    local CANDIDATE_PATH=""
+    local FLATPAK_DIR=""
+
+    for CANDIDATE in xfreerdp xfreerdp3; do
+        CANDIDATE_PATH="$(command -v "$CANDIDATE" 2>/dev/null)" && CANDIDATES+=("$CANDIDATE_PATH")
+    done
+
+    # The 'active' link of a Flatpak app points to a new deployment after every install or update.
+    for FLATPAK_DIR in "${HOME}/.local/share/flatpak" "/var/lib/flatpak"; do
+        [ -e "${FLATPAK_DIR}/app/com.freerdp.FreeRDP/current/active" ] && CANDIDATES+=("${FLATPAK_DIR}/app/com.freerdp.FreeRDP/current/active")
+    done
+
+    if [ "${#CANDIDATES[@]}" -gt 0 ]; then
+        stat -L -c '%n:%Y' "${CANDIDATES[@]}" 2>/dev/null | tr '\n' ' '
+    fi
+}
+
 # Name: 'waGetFreeRDPCommand'
 # Role: Determine the correct FreeRDP command to use.
 function waGetFreeRDPCommand() {
     # Declare variables.
+    local FREERDP_VERSION=""       # Stores the version of the installed copy of FreeRDP.
     local FREERDP_MAJOR_VERSION="" # Stores the major version of the installed copy of FreeRDP.
+    local CACHE_KEY=""
+    local CACHED_KEY=""
+    local CACHED_COMMAND=""
+    local CACHED_VERSION=""
 
     # Attempt to set a FreeRDP command if the command variable is empty.
+    if [ -z "$FREERDP_COMMAND" ]; then
+        # Reuse the previous detection as long as none of the candidates changed (flatpak list alone is slow).
+        CACHE_KEY="$(waFreeRDPCacheKey)"
+        if [ -n "$CACHE_KEY" ] && [ -f "$FREERDP_CACHE_PATH" ]; then
+            { IFS= read -r CACHED_KEY; IFS= read -r CACHED_COMMAND; IFS= read -r CACHED_VERSION; } < "$FREERDP_CACHE_PATH"
+            if [ "$CACHED_KEY" = "$CACHE_KEY" ] && [ -n "$CACHED_COMMAND" ]; then
+                FREERDP_COMMAND="$CACHED_COMMAND"
+                dprint "Using cached FreeRDP detection '${CACHED_COMMAND}' (version ${CACHED_VERSION})."
+            fi
+        fi
+    fi
+
     if [ -z "$FREERDP_COMMAND" ]; then
         # Check for 'xfreerdp'.
         if command -v xfreerdp &>/dev/null; then
             # Check FreeRDP major version is 3 or greater.
-            FREERDP_MAJOR_VERSION=$(xfreerdp --version | head -n 1 | grep -o -m 1 '\b[0-9]\S*' | head -n 1 | cut -d'.' -f1)
+            FREERDP_VERSION=$(xfreerdp --version | head -n 1 | grep -o -m 1 '\b[0-9]\S*' | head -n 1)
+            FREERDP_MAJOR_VERSION=$(echo "$FREERDP_VERSION" | cut -d'.' -f1)
             if [[ $FREERDP_MAJOR_VERSION =~ ^[0-9]+$ ]] && ((FREERDP_MAJOR_VERSION >= 3)); then
                 FREERDP_COMMAND="xfreerdp"
             fi
@@ -541,7 +775,8 @@ function waGetFreeRDPCommand() {
         if [ -z "$FREERDP_COMMAND" ]; then
             if command -v xfreerdp3 &>/dev/null; then
                 # Check FreeRDP major version is 3 or greater.
-                FREERDP_MAJOR_VERSION=$(xfreerdp3 --version | head -n 1 | grep -o -m 1 '\b[0-9]\S*' | head -n 1 | cut -d'.' -f1)
+                FREERDP_VERSION=$(xfreerdp3 --version | head -n 1 | grep -o -m 1 '\b[0-9]\S*' | head -n 1)
+                FREERDP_MAJOR_VERSION=$(echo "$FREERDP_VERSION" | cut -d'.' -f1)
                 if [[ $FREERDP_MAJOR_VERSION =~ ^[0-9]+$ ]] && ((FREERDP_MAJOR_VERSION >= 3)); then
                     FREERDP_COMMAND="xfreerdp3"
                 fi
@@ -553,13 +788,21 @@ function waGetFreeRDPCommand() {
             if command -v flatpak &>/dev/null; then
                 if flatpak list --columns=application | grep -q "^com.freerdp.FreeRDP$"; then
                     # Check FreeRDP major version is 3 or greater.
-                    FREERDP_MAJOR_VERSION=$(flatpak list --columns=application,version | grep "^com.freerdp.FreeRDP" | awk '{print $2}' | cut -d'.' -f1)
+                    FREERDP_VERSION=$(flatpak list --columns=application,version | grep "^com.freerdp.FreeRDP" | awk '{print $2}')
+                    FREERDP_MAJOR_VERSION=$(echo "$FREERDP_VERSION" | cut -d'.' -f1)
                     if [[ $FREERDP_MAJOR_VERSION =~ ^[0-9]+$ ]] && ((FREERDP_MAJOR_VERSION >= 3)); then
                         FREERDP_COMMAND="flatpak run --command=xfreerdp com.freerdp.FreeRDP"
                     fi
                 fi
             fi
         fi
+
+        # Cache the result for the next launches.
+        if [ -n "$FREERDP_COMMAND" ] && [ -n "$CACHE_KEY" ]; then
+            printf '%s\n%s\n%s\n' "$CACHE_KEY" "$FREERDP_COMMAND" "$FREERDP_VERSION" > "${FREERDP_CACHE_PATH}.$$" \
+                && mv -f "${FREERDP_CACHE_PATH}.$$" "$FREERDP_CACHE_PATH"
+            dprint "CACHED FREERDP DETECTION: ${FREERDP_COMMAND} (version ${FREERDP_VERSION})"
+        fi
     fi
 
     if command -v "$FREERDP_COMMAND" &>/dev/null || [ "$FREERDP_COMMAND" = "flatpak run --command=xfreerdp com.freerdp.FreeRDP" ]; then
@@ -570,6 +813,33 @@ function waGetFreeRDPCommand() {
     fi
 }
 
+# Name: 'waContainerState'
+# Role: Print the state of the Windows container ('running', 'paused', 'exited', ..., or 'missing' if there is none).
+# Asks the podman API socket with curl when possible, which is much quicker than starting podman.
+function waContainerState() {
+    local RESPONSE=""
+    # URL encoded {"name":["^LinOffice$"]}
+    local FILTERS="%7B%22name%22%3A%5B%22%5E${CONTAINER_NAME}%24%22%5D%7D"
+
+    if [ -S "$PODMAN_SOCKET" ] && command -v curl &>/dev/null; then
+        if RESPONSE=$(curl -sf --max-time 5 --unix-socket "$PODMAN_SOCKET" \
+            "http://localhost/v4.0.0/libpod/containers/json?all=true&filters=${FILTERS}" 2>/dev/null); then
+            if [[ "$RESPONSE" =~ \"State\":[[:space:]]*\"([a-z]+)\" ]]; then
+                echo "${BASH_REMATCH[1]}"
+            else
+                echo "missing"
+            fi
+            return 0
+        fi
+    fi
+
+    if "$WAFLAVOR" container exists "$CONTAINER_NAME" 2>/dev/null; then
+        "$WAFLAVOR" inspect --format='{{.State.Status}}' "$CONTAINER_NAME" 2>/dev/null
+    else
+        echo "missing"
+    fi
+}
+
 # Name: 'waCheckContainerRunning'
 # Role: Throw an error if the Docker container is not running.
 function waCheckContainerRunning() {
@@ -581,38 +851,42 @@ function waCheckContainerRunning() {
     local TIME_INTERVAL=5
     local MAX_WAIT_TIME=120  # Maximum time to wait for container to be ready
 
+    # Determine the state of the container.
+    waSpanBegin "container_state"
+    CONTAINER_STATE=$(waContainerState)
+    waSpanEnd "container_state"
+
+    waSpanBegin "resume"
     # If the container does not exist at all, (re)create it
-    if ! podman container exists "$CONTAINER_NAME" 2>/dev/null; then
-        dprint "WINDOWS CONTAINER MISSING. RECREATING."
+    if [ "$CONTAINER_STATE" == "missing" ]; then
+        waLog INFO "WINDOWS CONTAINER MISSING. RECREATING."
         echo -e "Creating Windows container."
         $COMPOSE_COMMAND --file "$COMPOSE_PATH" up -d &>/dev/null
         NEEDED_BOOT=true
         # Give podman a moment to register the container before inspecting
         sleep 2
+        CONTAINER_STATE=$(waContainerState)
     fi
 
-    # Determine the state of the container.
-    CONTAINER_STATE=$("$WAFLAVOR" inspect --format='{{.State.Status}}' "$CONTAINER_NAME")
-
     # Check container state.
     # Note: Errors DO NOT result in non-zero exit statuses.
     # Docker: 'created', 'restarting', 'running', 'removing', 'paused', 'exited' or 'dead'.
     # Podman: 'created', 'running', 'paused', 'exited' or 'unknown'.
     case "$CONTAINER_STATE" in
         "created")
-            dprint "WINDOWS CREATED. BOOTING WINDOWS."
+            waLog INFO "WINDOWS CREATED. BOOTING WINDOWS."
             echo -e "Booting Windows."
             $COMPOSE_COMMAND --file "$COMPOSE_PATH" start &>/dev/null
             NEEDED_BOOT=true
             ;;
         "restarting")
-            dprint "WINDOWS RESTARTING. WAITING."
+            waLog INFO "WINDOWS RESTARTING. WAITING."
             echo -e "Windows is currently restarting. Please wait."
             EXIT_STATUS=$EC_RESTART_TIMEOUT
             while (( TIME_ELAPSED < TIME_LIMIT )); do
-                if [[ $("$WAFLAVOR" inspect --format='{{.State.Status}}' "$CONTAINER_NAME") == "running" ]]; then
+                if [[ $(waContainerState) == "running" ]]; then
                     EXIT_STATUS=0
-                    dprint "WINDOWS RESTARTED."
+                    waLog INFO "WINDOWS RESTARTED."
                     echo -e "Restarted Windows."
                     NEEDED_BOOT=true
                     break
@@ -622,27 +896,29 @@ function waCheckContainerRunning() {
             done
             ;;
         "paused")
-            dprint "WINDOWS PAUSED. RESUMING WINDOWS."
+            waLog INFO "WINDOWS PAUSED. RESUMING WINDOWS."
             echo -e "Resuming Windows."
             $COMPOSE_COMMAND --file "$COMPOSE_PATH" unpause &>/dev/null
             ;;
         "exited")
-            dprint "WINDOWS SHUT OFF. BOOTING WINDOWS."
+            waLog INFO "WINDOWS SHUT OFF. BOOTING WINDOWS."
             echo -e "Booting Windows."
             $COMPOSE_COMMAND --file "$COMPOSE_PATH" start &>/dev/null
             NEEDED_BOOT=true
             ;;
         "dead")
-            dprint "WINDOWS DEAD. RECREATING WINDOWS CONTAINER."
+            waLog INFO "WINDOWS DEAD. RECREATING WINDOWS CONTAINER."
             echo -e "Re-creating and booting Windows."
             $COMPOSE_COMMAND --file "$COMPOSE_PATH" down &>/dev/null && $COMPOSE_COMMAND --file "$COMPOSE_PATH" up -d &>/dev/null
             NEEDED_BOOT=true
             ;;
-        "unknown"|"")
+        "unknown"|"missing"|"")
             EXIT_STATUS=$EC_UNKNOWN
             ;;
     esac
 
+    waSpanEnd "resume"
+
     # Handle non-zero exit statuses.
     [ "$EXIT_STATUS" -ne 0 ] && waThrowExit "$EXIT_STATUS"
 
@@ -651,36 +927,17 @@ function waCheckContainerRunning() {
         dprint "WAITING FOR CONTAINER TO BE FULLY READY..."
         echo -e "Waiting for Windows to be ready..."
 
-        TIME_ELAPSED=0
-        
-        while (( TIME_ELAPSED < MAX_WAIT_TIME )); do
-            # Check if container is running
-            if [[ $("$WAFLAVOR" inspect --format='{{.State.Status}}' "$CONTAINER_NAME") == "running" ]]; then
-                # Try to connect to RDP port to verify it's ready
-                if timeout 1 bash -c ">/dev/tcp/$RDP_IP/$RDP_PORT" 2>/dev/null; then
-                    dprint "CONTAINER IS READY"
-                    echo -e "Windows is ready."
-                    # Add a delay after Windows is ready
-                    if [ "$NEEDED_BOOT" = "true" ]; then
-                        echo -e "Waiting for Windows services to initialize..."
-                        sleep 10
-                    fi
-                    break
-                fi
-            fi
-            
-            sleep 5
-            TIME_ELAPSED=$((TIME_ELAPSED + 5))
-            
-            # Show progress every 30 seconds
-            if (( TIME_ELAPSED % 30 == 0 )); then
-                echo -e "Still waiting for Windows to be ready... ($TIME_ELAPSED seconds elapsed)"
-            fi
-        done
-        
-        # If we timed out waiting for the container
-        if (( TIME_ELAPSED >= MAX_WAIT_TIME )); then
-            dprint "TIMEOUT WAITING FOR CONTAINER TO BE READY"
+        # Without the RDP handshake check, give the Windows services some extra time after a boot
+        local settle_time=0
+        [ "$NEEDED_BOOT" = "true" ] && settle_time=10
+
+        waSpanBegin "readiness"
+        if waWaitForWindows "$MAX_WAIT_TIME" "$settle_time"; then
+            waSpanEnd "readiness"
+            dprint "CONTAINER IS READY"
+            echo -e "Windows is ready."
+        else
+            waLog WARN "TIMEOUT WAITING FOR CONTAINER TO BE READY"
             echo -e "Timeout waiting for Windows to be ready. Please try again."
             waThrowExit $EC_FAIL_START
         fi
@@ -688,8 +945,17 @@ function waCheckContainerRunning() {
 }
 
 # Name: 'waTimeSync'  
-# Role: Detect if system went to sleep by comparing uptime progression, then sync time in Windows VM
+# Role: Detect if system went to sleep by comparing uptime progression, then sync time in Windows VM. Skipped while lib/sleepwatch.py does this on resume.
 function waTimeSync() {
+    local WATCHER_PID=""
+    if [ -f "$SLEEPWATCH_PID_PATH" ]; then
+        read -r WATCHER_PID < "$SLEEPWATCH_PID_PATH"
+        if [ -n "$WATCHER_PID" ] && kill -0 "$WATCHER_PID" 2>/dev/null; then
+            dprint "SLEEP DETECTION LEFT TO SLEEPWATCH (PID ${WATCHER_PID})"
+            return 0
+        fi
+    fi
+
     local CURRENT_TIME=$(date +%s)
     local CURRENT_UPTIME="$(awk '{print int($1)}' "/proc/uptime")"
     local STORED_TIME=0
@@ -712,7 +978,7 @@ function waTimeSync() {
         
         # If uptime is significantly less than expected, system likely slept
         if [[ "$UPTIME_DIFF" -gt 30 && ! -f "$SLEEP_MARKER" ]]; then
-            dprint "DETECTED SLEEP/WAKE CYCLE (uptime gap: ${UPTIME_DIFF}s). CREATING SLEEP MARKER TO SYNC WINDOWS TIME."
+            waLog INFO "DETECTED SLEEP/WAKE CYCLE (uptime gap: ${UPTIME_DIFF}s). CREATING SLEEP MARKER TO SYNC WINDOWS TIME."
             echo -e "Detected system sleep/wake cycle. Creating sleep marker to sync Windows time..."
             
             # Create sleep marker which will be monitored by Windows VM to trigger time sync
@@ -734,7 +1000,9 @@ function waTimeSync() {
 function waRunCommand() {
     # Declare variables.
     local ICON=""
+    local FILE=""
     local FILE_PATH=""
+    local FILE_PATHS="" # Windows paths of all files to open, quoted for the /app cmd
     local FILE_DIR="" # Store the directory of the opened file
     declare -a FILE_DIRS=() # Array to store multiple directories
 
@@ -749,12 +1017,16 @@ function waRunCommand() {
         printf "\033[1m./linoffice.sh reset\033[0m -> kills all FreeRDP processes, cleans up Office lock files, and reboots the Windows VM\n"
         printf "\033[1m./linoffice.sh cleanup [--full|--reset]\033[0m -> cleans up Office lock files (such as ~\$file.xlsx) in the home folder and removable media; --full cleans all files regardless of creation date, --reset resets the last cleanup timestamp\n"
         printf "\033[1m./linoffice.sh --startcontainer\033[0m -> will start the Windows container if it is not running and not execute anything else\n"
+        printf "\033[1m./linoffice.sh --startcontainer --no-idle\033[0m -> like above, but exits once Windows is ready instead of waiting to pause it when idle\n"
         printf "\033[1m./linoffice.sh --stopcontainer\033[0m -> shuts down the Windows container completely\n"
+        printf "\033[1m./linoffice.sh --detect-freerdp\033[0m -> prints the FreeRDP command that LinOffice will use\n"
+        printf "\033[1m./linoffice.sh --redetect-freerdp\033[0m -> forgets the cached FreeRDP detection, detects FreeRDP again and prints the command\n"
         exit 0
     fi
 
     if [ "$1" = "cleanup" ]; then
         dprint "CLEANUP COMMAND"
+        waSpanBegin "cleanup"
         if [ "$2" = "--full" ]; then
             dprint "FULL CLEANUP REQUESTED"
             waCheckMasterCleanup "true"
@@ -768,19 +1040,24 @@ function waRunCommand() {
             dprint "STANDARD CLEANUP REQUESTED"
             waCheckMasterCleanup "false"
         fi
+        waSpanEnd "cleanup"
         exit 0
 
     elif [ "$1" = "reset" ]; then
         dprint "SYSTEM RESET REQUESTED"
         waResetSystem
         exit 0
+    fi
 
-    elif [ "$1" = "windows" ]; then
+    # Everything from here until FreeRDP is up
+    waSpanBegin "freerdp_spawn"
+
+    if [ "$1" = "windows" ]; then
         # Update timeout (since there is no 'in-built' 20 second delay for full RDP sessions post-logout).
         AUTOPAUSE_TIME=$((AUTOPAUSE_TIME + 20))
 
         # Open Windows RDP session.
-        dprint "WINDOWS"
+        waLog INFO "WINDOWS"
         podman unshare --rootless-netns "$FREERDP_COMMAND" \
             /u:$RDP_USER \
             /p:$RDP_PASS \
@@ -801,7 +1078,7 @@ function waRunCommand() {
 
     elif [ "$1" = "manual" ]; then
         # Open specified application.
-        dprint "MANUAL: ${2}"
+        waLog INFO "MANUAL: ${2}"
         podman unshare --rootless-netns "$FREERDP_COMMAND" \
             /u:$RDP_USER \
             /p:$RDP_PASS \
@@ -901,7 +1178,7 @@ function waRunCommand() {
         # Check if a file path was specified, and pass this to the application.
         if [ -z "$2" ]; then
             # No file path specified.
-            dprint "LAUNCHING OFFICE APP: $FULL_NAME"
+            waLog INFO "LAUNCHING OFFICE APP: $FULL_NAME"
             podman unshare --rootless-netns "$FREERDP_COMMAND" \
                 /u:$RDP_USER \
                 /p:$RDP_PASS \
@@ -919,20 +1196,26 @@ function waRunCommand() {
             # Capture the process ID.
             FREERDP_PID=$!
         else
-            # Get the directory of the file
-            FILE_DIR=$(dirname "$2")
-            dprint "FILE_DIR: ${FILE_DIR}"    
-            FILE_DIRS+=("$FILE_DIR") # Add directory to array
-
-            # Convert path from UNIX to Windows style.
-            FILE_PATH="$(echo "$2" | sed \
-                -e 's|^'"${HOME}"'|\\\\tsclient\\home|' \
-                -e 's|^'"${REMOVABLE_MEDIA}"'|\\\\tsclient\\media|' \
-                -e 's|/|\\|g')"
-            dprint "UNIX_FILE_PATH: ${2}"
-            dprint "WINDOWS_FILE_PATH: ${FILE_PATH}"
-
-            dprint "LAUNCHING OFFICE APP WITH FILE: $FULL_NAME"
+            # Open all files (the .desktop files pass them with %F) in one RemoteApp session
+            for FILE in "${@:2}"; do
+                [ -n "$FILE" ] || continue
+
+                # Get the directory of the file
+                FILE_DIR=$(dirname "$FILE")
+                dprint "FILE_DIR: ${FILE_DIR}"
+                FILE_DIRS+=("$FILE_DIR") # Add directory to array
+
+                # Convert path from UNIX to Windows style.
+                FILE_PATH="$(echo "$FILE" | sed \
+                    -e 's|^'"${HOME}"'|\\\\tsclient\\home|' \
+                    -e 's|^'"${REMOVABLE_MEDIA}"'|\\\\tsclient\\media|' \
+                    -e 's|/|\\|g')"
+                dprint "UNIX_FILE_PATH: ${FILE}"
+                dprint "WINDOWS_FILE_PATH: ${FILE_PATH}"
+                FILE_PATHS+="${FILE_PATHS:+ }\"${FILE_PATH}\""
+            done
+
+            waLog INFO "LAUNCHING OFFICE APP WITH ${#FILE_DIRS[@]} FILE(S): $FULL_NAME"
             podman unshare --rootless-netns "$FREERDP_COMMAND" \
                 /u:$RDP_USER \
                 /p:$RDP_PASS \
@@ -945,7 +1228,7 @@ function waRunCommand() {
                 $RDP_KBD \
                 $RDP_FLAGS \
                 /wm-class:"$FULL_NAME" \
-                /app:program:"$EXE",hidef:"$HIDEF",icon:"$ICON",name:"$FULL_NAME",cmd:\""$FILE_PATH"\" \
+                /app:program:"$EXE",hidef:"$HIDEF",icon:"$ICON",name:"$FULL_NAME",cmd:"$FILE_PATHS" \
                 /v:"$RDP_IP:$RDP_PORT" &>/dev/null &
 
             # Capture the process ID.
@@ -955,9 +1238,15 @@ function waRunCommand() {
 
     # Handle process cleanup (unified for all commands)
     if [ "$FREERDP_PID" -ne -1 ]; then
-        # Create a file with the process ID and update instance file
-        touch "${APPDATA_PATH}/FreeRDP_Process_${FREERDP_PID}.cproc"
-        sed -i "s/^FREERDP_PID=.*/FREERDP_PID=$FREERDP_PID/" "$INSTANCE_FILE" 2>/dev/null
+        # If the launcher daemon is running, let it supervise the session instead of waiting here
+        if waAdoptSession "$1"; then
+            waSpanEnd "freerdp_spawn"
+            dprint "FREERDP PROCESS $FREERDP_PID HANDED OVER TO LINOFFICED"
+            exit 0
+        fi
+
+        # Record the FreeRDP process in the session registry
+        waWithRegistryLock waRegistrySet
 
         # Wait for the process to start
         local start_timeout=30
@@ -967,6 +1256,7 @@ function waRunCommand() {
         dprint "WAITING FOR FREERDP PROCESS TO START..."
         while [ $start_elapsed -lt $start_timeout ]; do
             if kill -0 "$FREERDP_PID" 2>/dev/null; then
+                waSpanEnd "freerdp_spawn"
                 dprint "FREERDP PROCESS STARTED SUCCESSFULLY"
                 break
             fi
@@ -975,12 +1265,14 @@ function waRunCommand() {
         done
 
         if [ $start_elapsed -ge $start_timeout ]; then
-            dprint "FREERDP PROCESS FAILED TO START"
+            waLog ERROR "FREERDP PROCESS FAILED TO START"
             echo -e "Failed to start application. Please try again."
-            rm -f "${APPDATA_PATH}/FreeRDP_Process_${FREERDP_PID}.cproc" &>/dev/null
             exit 1
         fi
 
+        # Nothing is logged while the app is open
+        waLogFlush
+
         # Wait for the process to terminate with timeout
         local wait_timeout=30
         local wait_elapsed=0
@@ -999,17 +1291,28 @@ function waRunCommand() {
             kill -KILL "$FREERDP_PID" 2>/dev/null
         fi
 
-        # Remove the file with the process ID
-        rm "${APPDATA_PATH}/FreeRDP_Process_${FREERDP_PID}.cproc" &>/dev/null
+        # The session is over, keep only the instance in the registry
+        FREERDP_PID=-1
+        waWithRegistryLock waRegistrySet
 
         # Run cleanup immediately after process termination
+        waSpanBegin "cleanup"
         waCheckMasterCleanup "true"
+        waSpanEnd "cleanup"
         
         # Exit the script
         exit 0
     fi
 }
 
+# Name: 'waAdoptSession'
+# Role: Hand the FreeRDP process over to the launcher daemon (lib/linofficed.py), which then waits for it, runs the cleanup and pauses Windows when idle. Fails if the daemon is not running.
+waAdoptSession() {
+    local command="$1"
+    command -v python3 &>/dev/null || return 1
+    python3 "${SCRIPT_DIR_PATH}/lib/launcher.py" --adopt "$FREERDP_PID" "$command" "$IS_OFFICE_WXP_APP" "$RUNID" &>/dev/null
+}
+
 # Name: 'waCheckIdle'
 # Role: Suspend Windows if idle.
 function waCheckIdle() {
@@ -1018,11 +1321,13 @@ function waCheckIdle() {
     local TIME_ELAPSED=0
     local SUSPEND_WINDOWS=0
 
+    waLogFlush
+
     # Check if there are no LinOffice-related FreeRDP processes running.
-    if ! ls "$APPDATA_PATH"/FreeRDP_Process_*.cproc &>/dev/null; then
+    if [ -z "$(waFreeRDPPids)" ]; then
         SUSPEND_WINDOWS=1
         while (( TIME_ELAPSED < AUTOPAUSE_TIME )); do
-            if ls "$APPDATA_PATH"/FreeRDP_Process_*.cproc &>/dev/null; then
+            if [ -n "$(waFreeRDPPids)" ]; then
                 SUSPEND_WINDOWS=0
                 break
             fi
@@ -1033,7 +1338,7 @@ function waCheckIdle() {
 
     # Hibernate/Pause Windows.
     if [ "$SUSPEND_WINDOWS" -eq 1 ]; then
-        dprint "IDLE FOR ${AUTOPAUSE_TIME} SECONDS. SUSPENDING WINDOWS."
+        waLog INFO "IDLE FOR ${AUTOPAUSE_TIME} SECONDS. SUSPENDING WINDOWS."
         echo -e "Pausing Windows due to inactivity."
         "$COMPOSE_COMMAND" --file "$COMPOSE_PATH" pause &>/dev/null
     fi
@@ -1075,11 +1380,11 @@ use_venv() {
 
 # Handle --stopcontainer command first and exit
 if [[ "$1" == "--stopcontainer" ]]; then
-    dprint "SHUTTING DOWN CONTAINER"
+    waLog INFO "SHUTTING DOWN CONTAINER"
     echo "Attempting graceful shutdown of LinOffice container..."
 
     # Check the current status of the container
-    CONTAINER_STATUS=$(podman inspect --format='{{.State.Status}}' "$CONTAINER_NAME" 2>/dev/null)
+    CONTAINER_STATUS=$(waContainerState)
 
     # If the container is paused, it must be un-paused first to shut down cleanly
     if [[ "$CONTAINER_STATUS" == "paused" ]]; then
@@ -1102,17 +1407,53 @@ if [[ "$1" == "--stopcontainer" ]]; then
     exit 0
 fi
 
-dprint "START"
+waLog INFO "START"
 dprint "SCRIPT_DIR: ${SCRIPT_DIR_PATH}"
-dprint "SCRIPT_ARGS: ${*}"
+waLog INFO "SCRIPT_ARGS: ${*}"
 dprint "HOME_DIR: ${HOME}"
 mkdir -p "$APPDATA_PATH"
 SCRIPT_START_TIME=$(date +%s)
+SCRIPT_ARGS="$*"
+
+# Trace the phases of launches (and of anything the launcher daemon runs on behalf of one)
+case "$1" in
+    ""|cleanup|reset|--detect-freerdp|--redetect-freerdp)
+        [ -n "$LINOFFICE_RUNID" ] && TRACE_COMMAND="$1"
+        ;;
+    *)
+        TRACE_COMMAND="$1"
+        ;;
+esac
+TRACE_COMMAND="${TRACE_COMMAND//[^A-Za-z0-9_.-]/}"
+
 waLastRun
+waSpanBegin "config"
 waLoadConfig
+waSpanEnd "config"
+
+# Lock file cleanup needs neither FreeRDP nor a running container
+if [[ "$1" == "cleanup" ]]; then
+    waRunCommand "$@"
+fi
+
+# Forget the cached FreeRDP detection
+if [[ "$1" == "--redetect-freerdp" ]]; then
+    dprint "FORGETTING CACHED FREERDP DETECTION"
+    rm -f "$FREERDP_CACHE_PATH"
+fi
+
+waSpanBegin "freerdp_detect"
 waGetFreeRDPCommand
+waSpanEnd "freerdp_detect"
+
+# Print the detected FreeRDP command (used by the launcher daemon in lib/linofficed.py) and exit
+if [[ "$1" == "--detect-freerdp" || "$1" == "--redetect-freerdp" ]]; then
+    echo "$FREERDP_COMMAND"
+    exit 0
+fi
 
 # Check for virtual environment
+waSpanBegin "compose"
 echo "Checking for virtual environment..."
 use_venv || echo "Using system Python"
 
@@ -1128,15 +1469,18 @@ else
     echo "ERROR: No working podman-compose found"
     exit 1
 fi
+waSpanEnd "compose"
 
 waCheckContainerRunning
 
-# Check if --startcontainer flag is present
+# Check if the --startcontainer and --no-idle flags are present
 START_CONTAINER=false
+NO_IDLE=false
 for arg in "$@"; do
     if [[ "$arg" == "--startcontainer" ]]; then
         START_CONTAINER=true
-        break
+    elif [[ "$arg" == "--no-idle" ]]; then
+        NO_IDLE=true
     fi
 done
 
@@ -1146,8 +1490,9 @@ if [[ "$START_CONTAINER" != "true" ]]; then
     waRunCommand "$@"
 fi
 
-if [[ "$AUTOPAUSE" == "on" ]]; then
+# --no-idle: the caller (the launcher daemon after a pre-warm) takes care of pausing Windows
+if [[ "$AUTOPAUSE" == "on" && "$NO_IDLE" != "true" ]]; then
     waCheckIdle
 fi
 
-dprint "END"
+waLog INFO "END"
@@ -51,9 +51,56 @@ USE_VENV=0
 
 COMPOSE_COMMAND="podman-compose"
 
+# Structured progress events (JSON lines) for the installer GUI. The GUI sets LINOFFICE_EVENTS to a
+# FIFO it reads from; any other file works too, e.g. to record the timings of a terminal run.
+STEP_COUNT=8
+CURRENT_STEP=""
+EVENT_FD=""
+if [ -n "$LINOFFICE_EVENTS" ]; then
+    { exec {EVENT_FD}>>"$LINOFFICE_EVENTS"; } 2>/dev/null || EVENT_FD=""
+fi
+
+# Name: 'emit_event'
+# Role: Write one progress event to the events file descriptor (no-op without one)
+# Arguments: event name, then key=value pairs; numeric values are written as JSON numbers
+emit_event() {
+    [ -n "$EVENT_FD" ] || return 0
+    local event="$1"
+    shift
+    local now="${EPOCHREALTIME:-$(date +%s)}"
+    local json="{\"event\":\"${event}\",\"time\":${now/,/.}"
+    local pair key value
+    for pair in "$@"; do
+        key="${pair%%=*}"
+        value="${pair#*=}"
+        if [[ "$value" =~ ^-?[0-9]+(\.[0-9]+)?$ ]]; then
+            json+=",\"${key}\":${value}"
+        else
+            value="${value//\\/\\\\}"
+            value="${value//\"/\\\"}"
+            value="${value//$'\n'/\\n}"
+            value="${value//$'\r'/}"
+            value="${value//$'\t'/\\t}"
+            value="${value//$'\033'/\\u001b}"
+            json+=",\"${key}\":\"${value}\""
+        fi
+    done
+    printf '%s}\n' "$json" >&"$EVENT_FD" 2>/dev/null
+}
+
+# Name: 'end_step'
+# Role: Emit the end event of the current step, if one is running
+end_step() {
+    if [ -n "$CURRENT_STEP" ]; then
+        emit_event "step_end" "step=$CURRENT_STEP"
+        CURRENT_STEP=""
+    fi
+}
+
 # Functions to print colored output
 print_error() {
     echo -e "${RED}ERROR:${NC} $1" >&2
+    emit_event "error" "message=$1" "step=${CURRENT_STEP:-0}"
 }
 
 print_success() {
@@ -66,6 +113,9 @@ print_info() {
 
 print_step() {
     echo -e "\n${GREEN}Step $1:${NC} $2"
+    end_step
+    CURRENT_STEP="$1"
+    emit_event "step" "step=$1" "total=$STEP_COUNT" "title=$2"
 }
 
 print_progress() {
@@ -168,6 +218,7 @@ done
 # Function to exit with error
 exit_with_error() {
     print_error "$1"
+    emit_event "failed" "message=$1" "step=${CURRENT_STEP:-0}"
     exit 1
 }
 
@@ -805,6 +856,17 @@ function create_container() {
                     else
                         print_progress "Downloading Windows: ${pct}% | Speed: ${speed}B/s"
                     fi
+                    # wget dot progress lines start with the amount downloaded and end with the ETA
+                    local done_kb eta bytes_done bytes_total=0
+                    done_kb=$(echo "$progress_line" | grep -oE '^ *[0-9]+K' | tr -d ' K')
+                    eta=$(echo "$progress_line" | awk '{print $NF}')
+                    [[ "$eta" =~ ^([0-9]+[dhms])+$ ]] || eta=""
+                    bytes_done=$(( ${done_kb:-0} * 1024 ))
+                    if [ "$pct" -gt 0 ]; then
+                        bytes_total=$(( bytes_done * 100 / pct ))
+                    fi
+                    emit_event "download" "version=${windows_version}" "percent=$pct" "bytes=$bytes_done" \
+                        "total=$bytes_total" "speed=${speed}B/s" "eta=$eta"
                     last_percent=$pct
                 fi
             fi
@@ -850,6 +912,7 @@ function create_container() {
             if [ "$current_boots" -gt "$bootcount" ]; then
                 bootcount=$current_boots
                 print_success "Reboot $bootcount of $required_boots completed"
+                emit_event "boot" "count=$bootcount" "required=$required_boots"
                 if [ "$bootcount" -eq 3 ]; then
                     print_success "Windows installation finished"
                     print_step "6" "Downloading and installing Office (about 3 GB). This will take a while."
@@ -1185,6 +1248,8 @@ function check_available() {
             print_info "After signing out, we can try the connection again."
             echo
             # Machine-readable marker so the GUI can show a dialog and answer the prompt
+            # (the text marker is kept for GUIs that do not read the events)
+            emit_event "prompt" "id=vnc_sign_out_and_retry" "attempts=$max_attempts"
             echo "PROMPT:VNC_SIGN_OUT_AND_RETRY"
             # Interactive prompt for terminal users
             local answer
@@ -1384,6 +1449,11 @@ function desktop_files() {
             continue
         fi
 
+        # If Python is available, launch through the launcher daemon client (falls back to linoffice.sh itself)
+        if command -v python3 &>/dev/null; then
+            sed -i "s|^Exec=$LINOFFICE_DIR/linoffice.sh |Exec=python3 $LINOFFICE_DIR/lib/launcher.py |" "$temp_file"
+        fi
+
         # Copy to user applications directory
         if ! cp "$temp_file" "${USER_APPLICATIONS_DIR}/$app.desktop"; then
             echo "  Error: Failed to copy to applications directory"
@@ -1638,7 +1708,12 @@ else
     print_info "Desktop files already installed, skipping this step. To recreate them, run the script with the --desktop flag."
 fi
 
+# Compile the GUI forms ahead of time, so the windows do not have to parse the .ui files (optional, the GUI falls back to doing that)
+python3 "${SCRIPT_DIR}/gui/uicache.py" >/dev/null 2>&1 || print_info "Could not precompile the GUI forms, they will be compiled on first use."
+
 # Clean up success file
 rm -f "$SUCCESS_FILE"
 
 print_success "LinOffice setup completed successfully!"
+end_step
+emit_event "complete"
@@ -0,0 +1,35 @@
+# This Python file uses the following encoding: utf-8
+"""Shared setup of the tests: lib/ and the repository root on sys.path, and a throwaway HOME.
+
+lib/common.py derives APPDATA_PATH and friends from HOME when it is imported, so HOME is replaced
+before any LinOffice module is loaded; the tests never touch the real ~/.local/share/linoffice.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTS_DIR)
+FAKES_DIR = os.path.join(REPO_DIR, 'benchmarks', 'fakes')
+
+HOME = tempfile.mkdtemp(prefix='linoffice-test-home-')
+os.environ['HOME'] = HOME
+os.environ.pop('XDG_RUNTIME_DIR', None)
+os.environ.pop('XDG_CACHE_HOME', None)
+sys.path.insert(0, os.path.join(REPO_DIR, 'lib'))
+sys.path.insert(0, REPO_DIR)
+
+def pytest_unconfigure(config):
+    shutil.rmtree(HOME, ignore_errors=True)
+
+@pytest.fixture
+def appdata():
+    """An empty ~/.local/share/linoffice for one test."""
+    from common import APPDATA_PATH
+    shutil.rmtree(APPDATA_PATH, ignore_errors=True)
+    os.makedirs(APPDATA_PATH)
+    yield APPDATA_PATH
+    shutil.rmtree(APPDATA_PATH, ignore_errors=True)
@@ -0,0 +1,121 @@
+# This Python file uses the following encoding: utf-8
+"""lib/podman_api.py against a stand-in for the libpod API on a Unix socket (LINOFFICE_PODMAN_SOCKET)."""
+import http.server
+import json
+import os
+import socketserver
+import subprocess
+import sys
+import threading
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import podman_api
+from conftest import REPO_DIR
+
+class LibpodStandIn(http.server.BaseHTTPRequestHandler):
+    """GET /v4.0.0/libpod/containers/json?all=true&filters={"name": ["^NAME$"]} from server.containers."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.requests.append(url.path)
+        if url.path != podman_api.API_PREFIX + '/containers/json':
+            self._send(404, {'message': 'not found'})
+            return
+        name = json.loads(parse_qs(url.query)['filters'][0])['name'][0].strip('^$')
+        self._send(200, [c for c in self.server.containers if name in c['Names']])
+
+    def _send(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        return 'podman.sock'
+
+    def log_message(self, format, *args):
+        pass
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+@pytest.fixture
+def libpod(tmp_path, monkeypatch):
+    path = str(tmp_path / 'podman.sock')
+    server = UnixHTTPServer(path, LibpodStandIn)
+    server.containers = []
+    server.requests = []
+    server.path = path
+    threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+    monkeypatch.setenv('LINOFFICE_PODMAN_SOCKET', path)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def container(state, status):
+    return {'Names': ['LinOffice'], 'State': state, 'Status': status}
+
+def test_socket_path_override(libpod):
+    assert podman_api.socket_path() == libpod.path
+
+def test_running_container(libpod):
+    libpod.containers = [container('running', 'Up 5 minutes')]
+    client = podman_api.PodmanClient()
+
+    assert client.container() == ('running', 'Up 5 minutes')
+    assert client.container_exists()
+
+def test_state_is_lowercased(libpod):
+    libpod.containers = [container('Paused', 'Paused')]
+
+    assert podman_api.PodmanClient().container_state() == 'paused'
+
+def test_missing_container(libpod):
+    libpod.containers = [{'Names': ['Other'], 'State': 'running', 'Status': 'Up'}]
+    client = podman_api.PodmanClient()
+
+    assert client.container() == ('missing', '')
+    assert not client.container_exists()
+
+def test_answers_are_cached_for_the_ttl(libpod):
+    libpod.containers = [container('running', 'Up 5 minutes')]
+    client = podman_api.PodmanClient(ttl=60)
+
+    client.container_state()
+    libpod.containers = [container('paused', 'Paused')]
+    assert client.container_state() == 'running'
+    assert client.container_state(max_age=0) == 'paused'
+    assert len(libpod.requests) == 2
+
+def test_no_socket_is_unavailable(tmp_path):
+    client = podman_api.PodmanClient(path=str(tmp_path / 'missing.sock'))
+
+    with pytest.raises(podman_api.PodmanUnavailable):
+        client.container_state()
+
+@pytest.mark.parametrize('containers, command, status, output', [
+    ([container('exited', 'Exited (0) 2 minutes ago')], 'state', 0, 'exited'),
+    ([], 'state', 0, 'missing'),
+    ([container('running', 'Up 5 minutes')], 'exists', 0, ''),
+    ([], 'exists', 1, ''),
+])
+def test_command_line(libpod, containers, command, status, output):
+    libpod.containers = containers
+    result = subprocess.run([sys.executable, os.path.join(REPO_DIR, 'lib', 'podman_api.py'), command],
+                            capture_output=True, text=True, timeout=30)
+
+    assert result.returncode == status
+    assert result.stdout.strip() == output
+
+def test_command_line_without_socket(tmp_path):
+    env = dict(os.environ, LINOFFICE_PODMAN_SOCKET=str(tmp_path / 'missing.sock'))
+    result = subprocess.run([sys.executable, os.path.join(REPO_DIR, 'lib', 'podman_api.py'), 'state'],
+                            capture_output=True, text=True, env=env, timeout=30)
+
+    assert result.returncode == 2
@@ -0,0 +1,85 @@
+# This Python file uses the following encoding: utf-8
+"""lib/sleepwatch.py: the PrepareForSleep signal (through the gdbus stand-in of the benchmarks) and the uptime check."""
+import os
+import time
+
+import pytest
+
+import sleepwatch
+from conftest import FAKES_DIR
+
+GDBUS_SIGNAL = "/org/freedesktop/login1: org.freedesktop.login1.Manager.PrepareForSleep ({},)\n"
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+def uptime():
+    with open('/proc/uptime') as f:
+        return int(float(f.read().split()[0]))
+
+def test_gdbus_resume_creates_marker(appdata):
+    watcher = sleepwatch.SleepWatcher()
+
+    watcher.handle_line(GDBUS_SIGNAL.format('true'), False)
+    assert not os.path.exists(sleepwatch.SLEEP_MARKER)
+    watcher.handle_line(GDBUS_SIGNAL.format('false'), False)
+    assert os.path.exists(sleepwatch.SLEEP_MARKER)
+
+def test_dbus_monitor_resume_creates_marker(appdata):
+    watcher = sleepwatch.SleepWatcher()
+    header = ("signal time=1700000000.0 sender=:1.2 -> destination=(null destination) serial=42 "
+              "path=/org/freedesktop/login1; interface=org.freedesktop.login1.Manager; member=PrepareForSleep\n")
+
+    expect_value = watcher.handle_line(header, False)
+    assert expect_value
+    # A boolean that does not follow the signal line is not its value
+    watcher.handle_line("   boolean false\n", False)
+    assert not os.path.exists(sleepwatch.SLEEP_MARKER)
+    watcher.handle_line("   boolean false\n", expect_value)
+    assert os.path.exists(sleepwatch.SLEEP_MARKER)
+
+def test_signal_from_listener(appdata, tmp_path, monkeypatch):
+    signals = tmp_path / 'login1_signals'
+    signals.touch()
+    monkeypatch.setenv('PATH', FAKES_DIR + os.pathsep + os.environ.get('PATH', ''))
+    monkeypatch.setenv('LINOFFICE_BENCH_STATE', str(tmp_path))
+    watcher = sleepwatch.SleepWatcher()
+    watcher.start()
+    try:
+        assert wait_for(lambda: os.path.exists(sleepwatch.SLEEPWATCH_PID_PATH))
+        with open(signals, 'a') as f:
+            f.write(GDBUS_SIGNAL.format('true'))
+            f.write(GDBUS_SIGNAL.format('false'))
+        assert wait_for(lambda: os.path.exists(sleepwatch.SLEEP_MARKER))
+    finally:
+        watcher.stop()
+        watcher.join(10)
+    assert not watcher.is_alive()
+    assert not os.path.exists(sleepwatch.SLEEPWATCH_PID_PATH)
+
+def test_uptime_gap(appdata):
+    # The clock moved 100 seconds further than the uptime: the host slept that long
+    with open(sleepwatch.SLEEP_DETECT_PATH, 'w') as f:
+        f.write(f"{int(time.time()) - 100}\n{uptime()}\n")
+
+    assert sleepwatch.check_uptime_gap() >= 99
+    assert sleepwatch.check_uptime_gap() <= 1
+
+def test_uptime_gap_without_previous_check(appdata):
+    assert sleepwatch.check_uptime_gap() == 0
+    assert os.path.exists(sleepwatch.SLEEP_DETECT_PATH)
+
+@pytest.mark.parametrize('slept, marker', [(300, True), (5, False)])
+def test_uptime_fallback_creates_marker(appdata, slept, marker):
+    with open(sleepwatch.SLEEP_DETECT_PATH, 'w') as f:
+        f.write(f"{int(time.time()) - slept}\n{uptime()}\n")
+    watcher = sleepwatch.SleepWatcher()
+
+    watcher._poll_uptime(duration=0)
+
+    assert os.path.exists(sleepwatch.SLEEP_MARKER) == marker
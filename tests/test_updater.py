@@ -0,0 +1,138 @@
+# This Python file uses the following encoding: utf-8
+"""updater.py against a local HTTP stand-in for GitHub: resumed downloads and revalidated release info."""
+import http.server
+import json
+import threading
+
+import pytest
+
+import updater
+
+ASSET = bytes(range(256)) * 4096  # 1 MiB
+ETAG = '"v1"'
+RELEASE = {"tag_name": "v9.9.9", "prerelease": False, "draft": False}
+
+class StandIn(http.server.BaseHTTPRequestHandler):
+    """/asset.zip with Range and If-Range, /releases/latest with ETag and If-None-Match."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        if self.path.endswith('/releases/latest'):
+            if self.headers.get('If-None-Match') == ETAG:
+                self.send_response(304)
+                self.send_header('ETag', ETAG)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self._send(200, json.dumps(RELEASE).encode(), [('ETag', ETAG)])
+            return
+        if self.path == '/asset.zip':
+            asset = self.server.asset
+            start = 0
+            range_header = self.headers.get('Range', '')
+            if range_header.startswith('bytes=') and self.headers.get('If-Range') == self.server.etag:
+                start = int(range_header[len('bytes='):].rstrip('-'))
+            if start:
+                self._send(206, asset[start:], [('ETag', self.server.etag),
+                                                ('Content-Range', f'bytes {start}-{len(asset) - 1}/{len(asset)}')])
+            else:
+                self._send(200, asset, [('ETag', self.server.etag)])
+            return
+        self._send(404, b'', [])
+
+    def _send(self, status, body, headers):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StandIn)
+    httpd.requests = []
+    httpd.asset = ASSET
+    httpd.etag = ETAG
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    threading.Thread(target=httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+def download(url, target):
+    downloader = updater.Downloader()
+    try:
+        return downloader.download(url, target)
+    finally:
+        downloader.close()
+
+def write_partial(target, url, data, validator):
+    target.with_name(target.name + '.part').write_bytes(data)
+    target.with_name(target.name + '.part.json').write_text(json.dumps({"url": url, "validator": validator}))
+
+def test_download_resumes_truncated_part(server, tmp_path):
+    url = f"{server.url}/asset.zip"
+    target = tmp_path / 'asset.zip'
+    write_partial(target, url, ASSET[:300000], ETAG)
+
+    download(url, target)
+
+    assert target.read_bytes() == ASSET
+    assert not target.with_name('asset.zip.part').exists()
+    assert not target.with_name('asset.zip.part.json').exists()
+    headers = server.requests[-1][1]
+    assert headers['Range'] == 'bytes=300000-'
+    assert headers['If-Range'] == ETAG
+
+def test_download_starts_over_when_the_file_changed(server, tmp_path):
+    url = f"{server.url}/asset.zip"
+    target = tmp_path / 'asset.zip'
+    write_partial(target, url, b'x' * 300000, '"old"')
+
+    download(url, target)
+
+    # If-Range did not match, so the server sent the whole file and the stale part was dropped
+    assert target.read_bytes() == ASSET
+
+def test_download_ignores_part_of_another_url(server, tmp_path):
+    url = f"{server.url}/asset.zip"
+    target = tmp_path / 'asset.zip'
+    write_partial(target, f"{server.url}/other.zip", ASSET[:300000], ETAG)
+
+    download(url, target)
+
+    assert target.read_bytes() == ASSET
+    assert 'Range' not in server.requests[-1][1]
+
+@pytest.fixture
+def release_cache(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(updater, 'RELEASE_CACHE_PATH', tmp_path / 'releases.json')
+    monkeypatch.setattr(updater, 'GITHUB_API_URL', f"{server.url}/repos/eylenburg/linoffice/releases")
+    return tmp_path / 'releases.json'
+
+def test_not_modified_reuses_cached_release(server, release_cache):
+    assert updater.get_latest_release(max_age=0) == RELEASE
+    assert 'If-None-Match' not in server.requests[-1][1]
+
+    assert updater.get_latest_release(max_age=0) == RELEASE
+    assert server.requests[-1][1]['If-None-Match'] == ETAG
+    assert len(server.requests) == 2
+
+def test_cached_release_within_ttl_needs_no_request(server, release_cache):
+    updater.get_latest_release(max_age=600)
+    updater.get_latest_release(max_age=600)
+
+    assert len(server.requests) == 1
+    assert json.loads(release_cache.read_text())
+
+def test_invalid_ttl_falls_back_to_default(monkeypatch, capsys):
+    monkeypatch.setenv('LINOFFICE_UPDATE_TTL', 'ten minutes')
+
+    assert updater.release_cache_ttl() == updater.DEFAULT_RELEASE_CACHE_TTL
+    assert 'LINOFFICE_UPDATE_TTL' in capsys.readouterr().out
@@ -40,9 +40,9 @@ show_manual_uninstall() {
   echo "Please run as root (su) and remove the packages manually."
 }
 
-# Find .desktop files containing linoffice.sh in Exec= line
+# Find .desktop files containing linoffice.sh (or the launcher client lib/launcher.py) in Exec= line
 if [[ -n "$USER_APPLICATIONS_DIR" ]]; then
-  DESKTOP_FILES=$(find "$USER_APPLICATIONS_DIR" -type f -name "*.desktop" -exec grep -l "Exec=.*linoffice.sh" {} \;)
+  DESKTOP_FILES=$(find "$USER_APPLICATIONS_DIR" -type f -name "*.desktop" -exec grep -l "Exec=.*\(linoffice\.sh\|lib/launcher\.py\)" {} \;)
   # Also include the GUI launcher if present
   if [[ -f "$USER_APPLICATIONS_DIR/linoffice.desktop" ]]; then
     if [[ -n "$DESKTOP_FILES" ]]; then
@@ -214,6 +214,13 @@ else
   echo "No installed_dependencies record found. Skipping dependency cleanup."
 fi
 
+# Stop the launcher daemon (lib/linofficed.py) if it is running
+for pid_file in "${XDG_RUNTIME_DIR:-/nonexistent}/linoffice/linofficed.pid" "${APPDATA_PATH:-$HOME/.local/share/linoffice}/linofficed.pid"; do
+  if [[ -f "$pid_file" ]]; then
+    kill "$(cat "$pid_file")" 2>/dev/null && echo "Stopped the LinOffice launcher daemon."
+  fi
+done
+
 # Ask to delete the Windows container and its data
 read -p "Do you want to delete the Windows container and all its data as well? (y/n): " confirm
 if [[ "$confirm" == "y" || "$confirm" == "Y" ]]; then
@@ -1,10 +1,17 @@
 import zipfile
-import io
+import ctypes
+import ctypes.util
+import hashlib
 import os
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import shutil
 from pathlib import Path
 import re
+import signal
 import sys
+import time
 import http.client
 import json
 import urllib.parse
@@ -13,37 +20,107 @@ import urllib.parse
 REPO_OWNER = "eylenburg"
 REPO_NAME = "linoffice"
 CURRENT_VERSION = "2.1.2" 
-GITHUB_API_URL = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/releases"
+# The API base can be pointed somewhere else, e.g. a local stand-in server for testing
+GITHUB_API_BASE = os.environ.get("LINOFFICE_UPDATE_API", "https://api.github.com").rstrip("/")
+GITHUB_API_URL = f"{GITHUB_API_BASE}/repos/{REPO_OWNER}/{REPO_NAME}/releases"
 PRESERVE_FILES = {"config/compose.yaml", "config/linoffice.conf", "config/oem/registry/regional_settings.reg"}
 GITHUB_TOKEN = None  # Can replace with GitHub Personal Access Token if hitting API limits
+DOWNLOAD_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "linoffice" / "downloads"
+CHUNK_SIZE = 256 * 1024
+MAX_REDIRECTS = 10
+MAX_RETRIES = 5
+MANIFEST_NAME = ".update-manifest.json"  # content hashes of the files installed by the last update
+STAGING_SUFFIX = ".update-staging"  # the new version is assembled here, next to the installation
+PREVIOUS_SUFFIX = ".previous"  # the version before the last update, for --rollback
+EXTRACT_WORKERS = min(8, os.cpu_count() or 2)
+RELEASE_CACHE_PATH = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "linoffice" / "releases.json"
+DEFAULT_RELEASE_CACHE_TTL = 600
 
-def get_latest_release():
+def release_cache_ttl():
+    """Seconds before the cached release info is revalidated: LINOFFICE_UPDATE_TTL, or the default if that is not a number."""
+    value = os.environ.get("LINOFFICE_UPDATE_TTL")
+    if value is None:
+        return DEFAULT_RELEASE_CACHE_TTL
+    try:
+        return max(int(value), 0)
+    except ValueError:
+        print(f"Warning: ignoring invalid LINOFFICE_UPDATE_TTL '{value}', using {DEFAULT_RELEASE_CACHE_TTL} seconds.")
+        return DEFAULT_RELEASE_CACHE_TTL
+
+RELEASE_CACHE_TTL = release_cache_ttl()
+
+def load_release_cache():
+    try:
+        with open(RELEASE_CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_release_cache(cache):
+    try:
+        RELEASE_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = RELEASE_CACHE_PATH.with_name(RELEASE_CACHE_PATH.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, RELEASE_CACHE_PATH)
+    except OSError as e:
+        print(f"Could not save release cache: {e}")
+
+def fetch_json(downloader, url, cache, max_age=RELEASE_CACHE_TTL):
+    """GET a JSON document from the GitHub API through the cache.
+
+    Within max_age seconds the cached copy is used without a request; after that it is revalidated
+    with If-None-Match, and an unchanged document costs a 304 that does not count against the rate limit.
+    Returns (status, data); status is 200 for cached or fresh data.
+    """
+    entry = cache.get(url)
+    if entry and time.time() - entry.get("fetched", 0) < max_age:
+        return 200, entry["data"]
+
+    headers = {
+        "User-Agent": "LinofficeUpdateScript",
+        "Accept": "application/vnd.github.v3+json"
+    }
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    response = downloader.request(url, headers)
+    body = response.read()
+
+    if response.status == 304 and entry:
+        entry["fetched"] = time.time()
+        return 200, entry["data"]
+    if response.status != 200:
+        return response.status, None
+    data = json.loads(body.decode())
+    cache[url] = {"etag": response.getheader("ETag"), "fetched": time.time(), "data": data}
+    return 200, data
+
+def get_latest_release(max_age=RELEASE_CACHE_TTL):
     """Fetch the latest non-draft, non-prerelease release from GitHub."""
+    cache = load_release_cache()
+    downloader = Downloader()
     try:
-        conn = http.client.HTTPSConnection("api.github.com")
-        headers = {
-            "User-Agent": "LinofficeUpdateScript",
-            "Accept": "application/vnd.github.v3+json"
-        }
-        if GITHUB_TOKEN:
-            headers["Authorization"] = f"token {GITHUB_TOKEN}"
-
-        path = f"/repos/{REPO_OWNER}/{REPO_NAME}/releases"
-        conn.request("GET", path, headers=headers)
-        response = conn.getresponse()
-        
-        if response.status != 200:
-            print(f"Error fetching releases: {response.status} {response.reason}")
-            return None
-        
-        releases = json.loads(response.read().decode())
-        for release in releases:
-            if not release.get("prerelease") and not release.get("draft"):
-                return release
-        return None
+        # 'releases/latest' already skips drafts and prereleases, and is much smaller than the list
+        status, release = fetch_json(downloader, f"{GITHUB_API_URL}/latest", cache, max_age)
+        if status == 404:
+            # No release marked as latest: fall back to the full list
+            status, releases = fetch_json(downloader, GITHUB_API_URL, cache, max_age)
+            release = next((r for r in releases or [] if not r.get("prerelease") and not r.get("draft")), None)
+        if status not in (200, 404):
+            print(f"Error fetching releases: {status}")
+            release = None
+        save_release_cache(cache)
+        return release
     except Exception as e:
         print(f"Error fetching releases: {e}")
+        # Better a slightly old answer than none
+        entry = cache.get(f"{GITHUB_API_URL}/latest")
+        if entry:
+            print("Using cached release information.")
+            return entry["data"]
         return None
+    finally:
+        downloader.close()
 
 def version_tuple(v):
     return tuple(map(int, (v.split("."))))
@@ -52,73 +129,488 @@ def compare_versions(current_version, latest_version):
     """Compare two version strings."""
     return version_tuple(latest_version) > version_tuple(current_version)
 
+class DownloadError(Exception):
+    pass
+
+class Downloader:
+    """Stream files to disk over kept-alive connections (one per host), resuming with HTTP Range."""
+
+    def __init__(self, progress=None):
+        self.progress = progress
+        self._connections = {}
+        self._resolved = {}  # URL -> where it redirected to, so a resume skips the redirect
+
+    def _connection(self, parsed_url):
+        key = (parsed_url.scheme, parsed_url.netloc)
+        if key not in self._connections:
+            connection_class = http.client.HTTPSConnection if parsed_url.scheme == "https" else http.client.HTTPConnection
+            self._connections[key] = connection_class(parsed_url.netloc, timeout=60)
+        return self._connections[key]
+
+    def _drop_connection(self, parsed_url):
+        connection = self._connections.pop((parsed_url.scheme, parsed_url.netloc), None)
+        if connection:
+            connection.close()
+
+    def close(self):
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
+
+    def request(self, url, headers=None):
+        """GET url, following redirects. Returns the response with its body still unread."""
+        original_url = url
+        url = self._resolved.get(url, url)
+        for _ in range(MAX_REDIRECTS):
+            parsed_url = urllib.parse.urlparse(url)
+            request_headers = {"User-Agent": "PythonUpdateScript"}
+            # Only send the token to GitHub itself, not to the CDN it redirects to
+            if GITHUB_TOKEN and parsed_url.netloc.endswith("github.com"):
+                request_headers["Authorization"] = f"token {GITHUB_TOKEN}"
+            request_headers.update(headers or {})
+            path = parsed_url.path + (f"?{parsed_url.query}" if parsed_url.query else "")
+            try:
+                connection = self._connection(parsed_url)
+                connection.request("GET", path, headers=request_headers)
+                response = connection.getresponse()
+            except (http.client.HTTPException, OSError):
+                # A kept-alive connection may have been closed by the server; retry once on a fresh one
+                self._drop_connection(parsed_url)
+                connection = self._connection(parsed_url)
+                connection.request("GET", path, headers=request_headers)
+                response = connection.getresponse()
+
+            # Handle redirects (e.g., GitHub -> AWS)
+            if response.status in (301, 302, 303, 307, 308):
+                redirect_url = response.getheader("Location")
+                response.read()  # drain the body so the connection can be reused
+                if not redirect_url:
+                    raise DownloadError("Redirect without Location header")
+                redirect_url = urllib.parse.urljoin(url, redirect_url)
+                print(f"Redirected to: {redirect_url}")
+                url = redirect_url
+                continue
+            if url != original_url and response.status in (401, 403, 404, 410):
+                # The CDN link we remembered has expired, ask GitHub for a fresh one
+                response.read()
+                if self._resolved.pop(original_url, None):
+                    url = original_url
+                    continue
+            self._resolved[original_url] = url
+            return response
+        raise DownloadError("Too many redirects")
+
+    def download(self, url, target_path):
+        """Download url to target_path through target_path.part, resuming a previous partial download."""
+        target_path = Path(target_path)
+        part_path = target_path.with_name(target_path.name + ".part")
+        meta_path = target_path.with_name(target_path.name + ".part.json")
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Only resume what was downloaded from the same URL, and (via If-Range) only if it did not change
+        validator = None
+        try:
+            meta = json.loads(meta_path.read_text())
+            if meta.get("url") == url:
+                validator = meta.get("validator")
+        except (OSError, ValueError):
+            pass
+        if not validator and part_path.exists():
+            part_path.unlink()
+
+        for attempt in range(MAX_RETRIES):
+            offset = part_path.stat().st_size if part_path.exists() else 0
+            headers = {}
+            if offset and validator:
+                headers["Range"] = f"bytes={offset}-"
+                headers["If-Range"] = validator
+            response = self.request(url, headers)
+
+            if response.status == 416:
+                # Nothing left to fetch: the partial file is already complete
+                response.read()
+                break
+            if response.status == 200:
+                offset = 0
+            elif response.status != 206:
+                response.read()
+                raise DownloadError(f"Error downloading asset: {response.status} {response.reason}")
+            if offset:
+                print(f"Resuming download at {offset} bytes")
+
+            total = None
+            if response.status == 206:
+                content_range = response.getheader("Content-Range", "")
+                total_text = content_range.rpartition("/")[2]
+                total = int(total_text) if total_text.isdigit() else None
+            elif response.getheader("Content-Length", "").isdigit():
+                total = int(response.getheader("Content-Length"))
+
+            validator = response.getheader("ETag") or response.getheader("Last-Modified")
+            meta_path.write_text(json.dumps({"url": url, "validator": validator}))
+
+            done = offset
+            try:
+                with open(part_path, "ab" if offset else "wb") as part_file:
+                    while True:
+                        chunk = response.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        part_file.write(chunk)
+                        done += len(chunk)
+                        if self.progress:
+                            self.progress(done, total)
+            except (http.client.HTTPException, OSError) as e:
+                print(f"Download interrupted at {done} bytes ({e}), retrying...")
+                self.close()
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            if total is not None and done < total:
+                print(f"Download ended early at {done} of {total} bytes, retrying...")
+                continue
+            break
+        else:
+            raise DownloadError("Download failed after several retries")
+
+        os.replace(part_path, target_path)
+        try:
+            meta_path.unlink()
+        except OSError:
+            pass
+        return target_path
+
+class ProgressPrinter:
+    """Report download progress: a bar on a terminal, 'PROGRESS <done> <total>' lines for the GUI otherwise."""
+
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+        self.tty = stream.isatty()
+        self._last_time = 0
+        self._last_percent = None
+
+    def __call__(self, done, total):
+        percent = int(done * 100 / total) if total else None
+        now = time.monotonic()
+        if percent == self._last_percent and now - self._last_time < 0.25:
+            return
+        if percent is None and now - self._last_time < 0.25:
+            return
+        self._last_time, self._last_percent = now, percent
+        if self.tty:
+            if total:
+                bar = "#" * (percent // 4)
+                self.stream.write(f"\r[{bar:<25}] {percent:3d}% {done / 1048576:.1f}/{total / 1048576:.1f} MB")
+            else:
+                self.stream.write(f"\r{done / 1048576:.1f} MB")
+            if total and done >= total:
+                self.stream.write("\n")
+        else:
+            self.stream.write(f"PROGRESS {done} {total or 0}\n")
+        self.stream.flush()
+
+def sha256_of(file_object):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file_object.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(current_dir):
+    """{relative path: {"sha256", "size", "mtime_ns"}} of the files written by the last update."""
+    try:
+        with open(Path(current_dir) / MANIFEST_NAME) as f:
+            return json.load(f).get("files", {})
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+def save_manifest(current_dir, files):
+    manifest_path = Path(current_dir) / MANIFEST_NAME
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"version": 1, "files": files}, f, indent=0, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def installed_sha256(path, cached):
+    """Hash of an installed file, reusing the manifest entry if size and mtime are unchanged."""
+    stat = path.stat()
+    if cached and cached.get("size") == stat.st_size and cached.get("mtime_ns") == stat.st_mtime_ns:
+        return cached["sha256"]
+    with open(path, "rb") as f:
+        return sha256_of(f)
+
+def manifest_entry(path, sha256, file_info):
+    stat = path.stat()
+    return {"sha256": sha256, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "crc": file_info.CRC}
+
+def installed_unchanged(path, file_info, cached):
+    """Whether the installed file is still the one the last update wrote from the same archive member.
+
+    Compares the CRC and size the zip lists for the member and the size and mtime of the file with the
+    manifest, so the member does not have to be decompressed.
+    """
+    if not cached or cached.get("crc") != file_info.CRC or cached.get("size") != file_info.file_size:
+        return False
+    try:
+        stat = path.stat()
+    except OSError:
+        return False
+    return stat.st_size == cached["size"] and stat.st_mtime_ns == cached.get("mtime_ns")
+
+class ReleaseArchive:
+    """Read members of the release zip from several threads, each with its own ZipFile handle."""
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self._local = threading.local()
+        self._handles = []
+        self._lock = threading.Lock()
+
+    def zip_file(self):
+        if not hasattr(self._local, "zip_file"):
+            self._local.zip_file = zipfile.ZipFile(self.archive_path)
+            with self._lock:
+                self._handles.append(self._local.zip_file)
+        return self._local.zip_file
+
+    def sha256(self, file_info):
+        with self.zip_file().open(file_info) as source:
+            return sha256_of(source)
+
+    def extract(self, file_info, target_path, mode):
+        """Write a member to target_path as a new file, so hardlinked copies of the old file stay untouched."""
+        tmp_path = target_path.with_name(f".{target_path.name}.new")
+        with self.zip_file().open(file_info) as source, open(tmp_path, "wb") as target:
+            shutil.copyfileobj(source, target, CHUNK_SIZE)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, target_path)
+
+    def close(self):
+        with self._lock:
+            for handle in self._handles:
+                handle.close()
+            self._handles.clear()
+
+def plan_update(archive, pool, prefix, current_dir, manifest):
+    """Compare the release with the installed files.
+
+    Members that the manifest shows were installed unchanged are skipped; only the others are hashed.
+    Returns (added, changed, unchanged, removed): lists of (relative path, ZipInfo or None, sha256).
+    Only files the previous update installed can be 'removed', anything else in the folder is left alone.
+    """
+    members = []
+    release_paths = set()
+    for file_info in archive.zip_file().infolist():
+        if file_info.is_dir() or file_info.filename == prefix:
+            continue
+        relative_path = file_info.filename[len(prefix):]
+        if not relative_path:
+            continue
+        release_paths.add(relative_path)
+        if relative_path in PRESERVE_FILES:
+            print(f"Preserving {relative_path}")
+            continue
+        members.append((relative_path, file_info))
+
+    def classify(member):
+        relative_path, file_info = member
+        target_path = Path(current_dir) / relative_path
+        if installed_unchanged(target_path, file_info, manifest.get(relative_path)):
+            return "unchanged", manifest[relative_path]["sha256"]
+        new_sha256 = archive.sha256(file_info)
+        if not target_path.is_file():
+            return "added", new_sha256
+        if target_path.stat().st_size != file_info.file_size:
+            return "changed", new_sha256
+        if installed_sha256(target_path, manifest.get(relative_path)) != new_sha256:
+            return "changed", new_sha256
+        return "unchanged", new_sha256
+
+    result = {"added": [], "changed": [], "unchanged": []}
+    for (relative_path, file_info), (kind, sha256) in zip(members, pool.map(classify, members)):
+        result[kind].append((relative_path, file_info, sha256))
+    removed = [(relative_path, None, None) for relative_path in sorted(manifest)
+               if relative_path not in release_paths and relative_path not in PRESERVE_FILES
+               and (Path(current_dir) / relative_path).is_file()]
+    return result["added"], result["changed"], result["unchanged"], removed
+
+def snapshot_tree(source_dir, target_dir):
+    """Recreate source_dir as target_dir with hardlinks, which costs no space and no file copying."""
+    for root, dirs, files in os.walk(source_dir):
+        relative_root = os.path.relpath(root, source_dir)
+        target_root = os.path.join(target_dir, relative_root)
+        os.makedirs(target_root, exist_ok=True)
+        shutil.copymode(root, target_root)
+        for name in dirs + files:
+            source_path = os.path.join(root, name)
+            target_path = os.path.join(target_root, name)
+            if os.path.islink(source_path):
+                os.symlink(os.readlink(source_path), target_path)
+                if name in dirs:
+                    dirs.remove(name)  # os.walk does not follow it anyway, but do not create it as a dir
+            elif name in files:
+                try:
+                    os.link(source_path, target_path)
+                except OSError:
+                    shutil.copy2(source_path, target_path)
+
+def exchange_paths(path_a, path_b):
+    """Atomically swap two paths with renameat2(RENAME_EXCHANGE). Returns False if that is not supported."""
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    if not hasattr(libc, "renameat2"):
+        return False
+    AT_FDCWD, RENAME_EXCHANGE = -100, 2
+    if libc.renameat2(AT_FDCWD, os.fsencode(path_a), AT_FDCWD, os.fsencode(path_b), RENAME_EXCHANGE) == 0:
+        return True
+    errno_value = ctypes.get_errno()
+    if errno_value in (22, 38, 95):  # EINVAL, ENOSYS, EOPNOTSUPP: filesystem or kernel cannot do it
+        return False
+    raise OSError(errno_value, os.strerror(errno_value))
+
+def swap_in(new_dir, current_dir, previous_dir):
+    """Make new_dir the installation and keep the old one as previous_dir."""
+    if previous_dir.exists():
+        shutil.rmtree(previous_dir)
+    if exchange_paths(new_dir, current_dir):
+        os.rename(new_dir, previous_dir)  # new_dir now holds the old version
+    else:
+        os.rename(current_dir, previous_dir)
+        os.rename(new_dir, current_dir)
+
+def stop_daemon():
+    """Stop the launcher daemon (lib/linofficed.py), which keeps running the code it was started from.
+
+    The next launch starts it again from the new installation. Same pid files as uninstall.sh.
+    """
+    pid_paths = [Path.home() / ".local" / "share" / "linoffice" / "linofficed.pid"]
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        pid_paths.insert(0, Path(os.environ["XDG_RUNTIME_DIR"]) / "linoffice" / "linofficed.pid")
+    for pid_path in pid_paths:
+        try:
+            pid = int(pid_path.read_text().split()[0])
+            os.kill(pid, signal.SIGTERM)
+        except (OSError, ValueError, IndexError):
+            continue
+        print("Stopped the LinOffice launcher daemon, it is started again with the next launch.")
+
+def rollback(current_dir):
+    """Go back to the version before the last update (running it again goes forward again)."""
+    current_dir = Path(current_dir).resolve()
+    previous_dir = current_dir.with_name(current_dir.name + PREVIOUS_SUFFIX)
+    if not previous_dir.is_dir():
+        print("No previous version to roll back to.")
+        return False
+    if not exchange_paths(previous_dir, current_dir):
+        tmp_dir = current_dir.with_name(current_dir.name + STAGING_SUFFIX)
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        os.rename(current_dir, tmp_dir)
+        os.rename(previous_dir, current_dir)
+        os.rename(tmp_dir, previous_dir)
+    print("Rolled back to the previous version.")
+    return True
+
 def download_and_update(asset_url, current_dir):
-    """Download and extract the new release, preserving specified files."""
+    """Download and extract the new release, preserving specified files.
+
+    The new version is assembled in a staging folder next to the installation (a hardlink copy of it
+    plus the changed files) and then swapped in with a rename, so a failed or interrupted update
+    never leaves a half-updated installation behind.
+    """
+    current_dir = Path(current_dir).resolve()
+    staging_dir = current_dir.with_name(current_dir.name + STAGING_SUFFIX)
+    previous_dir = current_dir.with_name(current_dir.name + PREVIOUS_SUFFIX)
+    downloader = Downloader(progress=ProgressPrinter())
+    archive_path = DOWNLOAD_DIR / (Path(urllib.parse.urlparse(asset_url).path).name or "linoffice.zip")
+    archive = None
+    swapping = False
     try:
-        parsed_url = urllib.parse.urlparse(asset_url)
-        conn = http.client.HTTPSConnection(parsed_url.netloc)
-        headers = {
-            "User-Agent": "PythonUpdateScript"
-        }
-        if GITHUB_TOKEN:
-            headers["Authorization"] = f"token {GITHUB_TOKEN}"
-        conn.request("GET", parsed_url.path, headers=headers)
-        response = conn.getresponse()
-
-        # Handle redirects (e.g., GitHub -> AWS)
-        if response.status in (301, 302, 303, 307, 308):
-            redirect_url = response.getheader("Location")
-            if not redirect_url:
-                print("Redirect without Location header")
-                return False
-            print(f"Redirected to: {redirect_url}")
-            return download_and_update(redirect_url, current_dir)
-
-        if response.status != 200:
-            print(f"Error downloading asset: {response.status} {response.reason}")
-            return False
+        try:
+            downloader.download(asset_url, archive_path)
+        finally:
+            downloader.close()
 
-        zip_file = zipfile.ZipFile(io.BytesIO(response.read()))
+        archive = ReleaseArchive(archive_path)
 
         # Get the top-level folder name in the zip (e.g., 'linoffice-1.0.7/')
-        top_level_folder = next((name for name in zip_file.namelist() if '/' in name), None)
+        top_level_folder = next((name for name in archive.zip_file().namelist() if '/' in name), None)
         if not top_level_folder:
             print("Error: Could not determine top-level folder in zip.")
             return False
         prefix = top_level_folder.split('/')[0] + '/'
 
-        # Count updated files
-        updated_count = 0
+        with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS) as pool:
+            # Only write what differs from the installed files
+            manifest = load_manifest(current_dir)
+            added, changed, unchanged, removed = plan_update(archive, pool, prefix, current_dir, manifest)
+            new_manifest = {}
 
-        # Extract files, skipping the top-level folder
-        for file_info in zip_file.infolist():
-            if file_info.is_dir() or file_info.filename == prefix:
-                continue
-            relative_path = file_info.filename[len(prefix):]
-            if not relative_path:
-                continue
-            target_path = Path(current_dir) / relative_path
+            for relative_path, file_info, sha256 in unchanged:
+                new_manifest[relative_path] = manifest_entry(current_dir / relative_path, sha256, file_info)
 
-            if relative_path in PRESERVE_FILES:
-                print(f"Preserving {relative_path}")
-                continue
+            if not (added or changed or removed):
+                archive.close()
+                save_manifest(current_dir, new_manifest)
+                archive_path.unlink()
+                print(f"Update completed successfully. All {len(unchanged)} files were already up to date.")
+                return True
+
+            print("Preparing the new version...")
+            if staging_dir.exists():
+                shutil.rmtree(staging_dir)  # left over from an interrupted update
+            snapshot_tree(current_dir, staging_dir)
 
-            target_path.parent.mkdir(parents=True, exist_ok=True)
-            with zip_file.open(file_info) as source, open(target_path, "wb") as target:
-                shutil.copyfileobj(source, target)
-            updated_count += 1
+            def write(item):
+                label, (relative_path, file_info, sha256) = item
+                target_path = staging_dir / relative_path
+                target_path.parent.mkdir(parents=True, exist_ok=True)
+                # Keep the permissions of the file being replaced, new files get those stored in the zip;
+                # executable bits from the zip are always applied (e.g. a script that became executable)
+                zip_mode = (file_info.external_attr >> 16) & 0o7777
+                if target_path.exists():
+                    mode = stat.S_IMODE(target_path.stat().st_mode) | (zip_mode & 0o111)
+                else:
+                    mode = zip_mode or 0o644
+                archive.extract(file_info, target_path, mode)
+                return label, relative_path, manifest_entry(target_path, sha256, file_info)
 
-        zip_file.close()
-        print(f"Update completed successfully. Updated {updated_count} files.")
+            items = [("Adding", f) for f in added] + [("Updating", f) for f in changed]
+            for label, relative_path, entry in pool.map(write, items):
+                print(f"{label} {relative_path}")
+                new_manifest[relative_path] = entry
+
+        for relative_path, _, _ in removed:
+            print(f"Removing {relative_path}")
+            (staging_dir / relative_path).unlink()
+
+        save_manifest(staging_dir, new_manifest)
+        archive.close()
+        swapping = True
+        swap_in(staging_dir, current_dir, previous_dir)
+        archive_path.unlink()
+        print(f"Update completed successfully. {len(added)} files added, {len(changed)} changed, "
+              f"{len(removed)} removed, {len(unchanged)} unchanged.")
+        print(f"The previous version was kept in {previous_dir} (undo with: python3 updater.py --rollback).")
         return True
     except Exception as e:
         print(f"Error during update: {e}")
+        # Before the swap the installation itself was not touched, just drop the half-built staging folder
+        if not swapping and staging_dir.exists():
+            shutil.rmtree(staging_dir, ignore_errors=True)
         return False
+    finally:
+        if archive:
+            archive.close()
 
 def main():
     """Main function to check for updates and apply them."""
+    current_dir = Path(sys.argv[0]).resolve().parent
+    if "--rollback" in sys.argv[1:]:
+        if rollback(current_dir):
+            stop_daemon()
+        return
+
     print("Checking for updates...")
-    release_data = get_latest_release()
+    # --refresh revalidates the cached release information right away
+    release_data = get_latest_release(max_age=0 if "--refresh" in sys.argv[1:] else RELEASE_CACHE_TTL)
     if not release_data:
         print("Failed to fetch release information.")
         return
@@ -143,8 +635,8 @@ def main():
     asset_url = f"https://github.com/{REPO_OWNER}/{REPO_NAME}/archive/refs/tags/v{latest_version}.zip"
     print(f"Using download URL: {asset_url}")
 
-    current_dir = Path(sys.argv[0]).parent
     if download_and_update(asset_url, current_dir):
+        stop_daemon()
         print("Please restart the application to use the new version.")
     else:
         print("Update failed.")